@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# Reproducible benchmarks of the polling stack against the simulator.
+#
+#   python mb_bench.py --out bench.json                   (baseline)
+#   python mb_bench.py --compare bench.json               (exit 1 on regression)
+#   python mb_bench.py --transport pty --quick            (real pymodbus over a pty)
+#
+# Every run drives the same code the GUI uses (AcquisitionWorker.poll_cycle,
+# the request queue behind mb_read_holding, mb_decode) against mb_sim with a
+# fixed seed and fixed slave latency, and measures:
+#   cycle.<group>      full-cycle time for the device/run-time/summary groups
+#   throughput.<baud>  registers/s over whole poll passes at several baud rates
+#   alarms.<n>         bitmap + detail read cost with 0/10/50 active alarms
+#   decode             decode + format cost per value
+#   request            queued single-register read, submit to result
+# Results are written as JSON; --compare flags any metric that got worse by
+# more than --tolerance against an earlier file.
+#
+# The default "loopback" transport hands frames to the simulator in-process
+# (wire time and latency are still applied), so it runs without pymodbus or
+# a serial port; "pty" goes through pymodbus and a pseudo-terminal.
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Dict, List, Sequence
+
+import mb_client
+import mb_decode
+import mb_plan
+import mb_sim
+import mb_worker
+from mb_registers import ALARM_BLOCK, DEVICE_DATA, POLL_SCHEDULE, RUNTIME_DATA, SUMMARY_DATA
+
+SCHEMA = 1
+UNIT = 1
+BAUDS = (9600, 19200, 38400, 115200)
+ALARM_COUNTS = (0, 10, 50)
+GROUPS = {"device": DEVICE_DATA, "runtime": RUNTIME_DATA, "summary": SUMMARY_DATA}
+
+
+def metric(value: float, unit: str, better: str = "lower", **extra) -> dict:
+    return {"value": round(value, 4), "unit": unit, "better": better, **extra}
+
+
+def timing_stats(samples_s: Sequence[float]) -> dict:
+    ms = sorted(1000 * s for s in samples_s)
+    p95 = ms[min(len(ms) - 1, int(0.95 * len(ms)))]
+    return metric(statistics.median(ms), "ms", p95=round(p95, 3), mean=round(statistics.fmean(ms), 3),
+                  n=len(ms))
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self._sims: List[mb_sim.Simulator] = []
+
+    def worker(self, baud: int) -> mb_worker.AcquisitionWorker:
+        """A fresh simulator (one slave) and an unstarted worker talking to it."""
+        a = self.args
+        sim = mb_sim.Simulator([UNIT], a.latency / 1000.0, 0.0, baud=baud, seed=a.seed)
+        self._sims.append(sim)
+        if a.transport == "pty":
+            client = mb_client.make_serial_client(sim.serve_pty(), baud, 8, "N", 1, a.timeout)
+            if not client.connect():
+                raise RuntimeError("could not open the simulator pty")
+        else:
+            client = mb_sim.LoopbackClient(sim, a.timeout)
+            client.connect()
+        mb_client.bind(client)
+        w = mb_worker.AcquisitionWorker(client, POLL_SCHEDULE, [UNIT], post=lambda r: None,
+                                        timing=mb_worker.FrameTiming(baud), timeout_s=a.timeout)
+        w.sim = sim
+        return w
+
+    def close(self):
+        for sim in self._sims:
+            sim.stop()
+
+    def _cycles(self, w: mb_worker.AcquisitionWorker, spans, n: int) -> List[mb_worker.PollResult]:
+        out = []
+        for _ in range(n):
+            r = w.poll_cycle(UNIT, spans)
+            if r.failed:
+                raise RuntimeError(f"benchmark cycle failed: {r.log}")
+            out.append(r)
+        return out
+
+    # ── benchmarks ───────────────────────────────────────────────────────
+    def cycle_groups(self) -> Dict[str, dict]:
+        w = self.worker(self.args.baud)
+        out = {}
+        for name, regs in GROUPS.items():
+            spans = mb_plan.plan_spans(regs, gap_cost=w.gap_cost)
+            results = self._cycles(w, spans, self.args.cycles)
+            out[f"cycle.{name}"] = timing_stats([r.elapsed for r in results])
+            out[f"cycle.{name}"]["reads"] = len(spans)
+        return out
+
+    def throughput(self) -> Dict[str, dict]:
+        out = {}
+        for baud in self.args.bauds:
+            w = self.worker(baud)
+            results = self._cycles(w, w.plan, max(3, self.args.cycles // 4))
+            regs = sum(len(words) for r in results for words in r.words.values())
+            elapsed = sum(r.elapsed for r in results)
+            out[f"throughput.{baud}"] = metric(regs / elapsed, "registers/s", "higher")
+        return out
+
+    def alarms(self) -> Dict[str, dict]:
+        w = self.worker(self.args.baud)
+        spans = mb_plan.plan_spans([ALARM_BLOCK], gap_cost=w.gap_cost)
+        slave = w.sim.slaves[UNIT]
+        out = {}
+        for n in ALARM_COUNTS:
+            # spread over the whole bitmap, like unrelated faults would be
+            ids = [1 + (i * 37) % mb_sim.MAX_ALARM_ID for i in range(n)]
+            slave.alarms = {a: 1 for a in ids}
+            slave._put_alarms()
+            samples, reads = [], 0
+            for _ in range(self.args.cycles):
+                w._alarm_details.pop(UNIT, None)        # every run reads all details again
+                r = w.poll_cycle(UNIT, spans)
+                if r.failed or len(r.alarm_ids or ()) != n:
+                    raise RuntimeError(f"alarm benchmark read {r.alarm_ids} ({r.log})")
+                samples.append(r.elapsed)
+                reads = r.reads
+            out[f"alarms.{n}"] = timing_stats(samples)
+            out[f"alarms.{n}"]["reads"] = reads
+        return out
+
+    def decode(self) -> Dict[str, dict]:
+        w = self.worker(self.args.baud)
+        regs = w.sim.slaves[UNIT].regs
+        spans = [s for s in w.plan if s.regs[0] is not ALARM_BLOCK]
+        payload = [(s, [regs.get(a, 0) for a in range(s.addr, s.addr + s.count)]) for s in spans]
+        values = sum(len(mb_decode.decode_span(s, words)) for s, words in payload)
+        rounds = self.args.decode_rounds
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for s, words in payload:
+                mb_decode.decode_span(s, words)
+        per_value = (time.perf_counter() - t0) / (rounds * values)
+        return {"decode": metric(per_value * 1e6, "us/value", values=values)}
+
+    def request(self) -> Dict[str, dict]:
+        w = self.worker(self.args.baud)
+        w.start()
+        try:
+            samples = []
+            for _ in range(self.args.cycles):
+                t0 = time.perf_counter()
+                w.read_holding(RUNTIME_DATA[0].addr, 1, UNIT).result(timeout=5)
+                samples.append(time.perf_counter() - t0)
+        finally:
+            w.stop(2)
+        return {"request": timing_stats(samples)}
+
+    def run(self) -> dict:
+        results = {}
+        try:
+            for name in ("cycle_groups", "throughput", "alarms", "decode", "request"):
+                t0 = time.perf_counter()
+                results.update(getattr(self, name)())
+                print(f"  {name:<13} {time.perf_counter() - t0:6.1f} s", file=sys.stderr, flush=True)
+        finally:
+            self.close()
+        return results
+
+
+def environment(args) -> dict:
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "transport": args.transport,
+        "baud": args.baud,
+        "latency_ms": args.latency,
+        "cycles": args.cycles,
+        "seed": args.seed,
+    }
+    if args.transport == "pty":
+        env["pymodbus"] = mb_client.pymodbus_version()
+    return env
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Lines describing metrics that regressed by more than `tolerance` (a fraction)."""
+    bad = []
+    for name, new in sorted(results.items()):
+        old = baseline.get(name)
+        if not old or not old["value"]:
+            continue
+        change = (new["value"] - old["value"]) / old["value"]
+        worse = change > tolerance if new["better"] == "lower" else change < -tolerance
+        if worse:
+            bad.append(f"{name}: {old['value']} -> {new['value']} {new['unit']} ({change:+.0%})")
+    return bad
+
+
+def format_results(results: dict) -> List[str]:
+    lines = []
+    for name, m in sorted(results.items()):
+        extra = ", ".join(f"{k} {v}" for k, v in m.items() if k not in ("value", "unit", "better"))
+        lines.append(f"{name:<22} {m['value']:>12} {m['unit']:<12} {extra}")
+    return lines
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the Modbus polling stack against mb_sim.")
+    p.add_argument("--transport", choices=("loopback", "pty"), default="loopback")
+    p.add_argument("--baud", type=int, default=9600, help="line speed for the cycle/alarm/request runs")
+    p.add_argument("--bauds", type=lambda s: [int(b) for b in s.split(",")], default=list(BAUDS),
+                   help="comma-separated line speeds for the throughput run")
+    p.add_argument("--latency", type=float, default=5.0, help="simulated slave turnaround (ms)")
+    p.add_argument("--timeout", type=float, default=1.0)
+    p.add_argument("--cycles", type=int, default=20, help="repetitions per measurement")
+    p.add_argument("--decode-rounds", type=int, default=2000)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--quick", action="store_true", help="fewer repetitions (smoke run)")
+    p.add_argument("--out", metavar="PATH", help="write results as JSON")
+    p.add_argument("--compare", metavar="PATH", help="earlier results to check for regressions")
+    p.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    args = p.parse_args(argv)
+    if args.quick:
+        args.cycles = min(args.cycles, 5)
+        args.decode_rounds = min(args.decode_rounds, 200)
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print("Running benchmarks...", file=sys.stderr, flush=True)
+    results = Bench(args).run()
+    doc = {"schema": SCHEMA, "taken": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+           "environment": environment(args), "results": results}
+    for line in format_results(results):
+        print(line)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+    if baseline is not None:
+        bad = compare(results, baseline, args.tolerance)
+        for line in bad:
+            print(f"REGRESSION {line}")
+        if bad:
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
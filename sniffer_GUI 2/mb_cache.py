@@ -0,0 +1,102 @@
+# Central register value cache.
+#
+# Holds the latest raw words, decoded value and display text for every
+# (bus, unit, address) together with when it was read and how trustworthy it
+# is. The GUI only touches widgets when the text changes, and one-off reads
+# (menu items, config page, Excel export) are answered from here while the
+# value is still fresh instead of going to the bus.
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+GOOD = "good"       # last read succeeded and is within its TTL
+STALE = "stale"     # last read succeeded but is older than its TTL
+BAD = "bad"         # last read attempt failed; value is the last good one
+
+Key = Tuple[str, int, int]      # (bus, unit, address)
+
+
+@dataclass
+class CacheEntry:
+    words: List[int]
+    value: Any = None
+    text: str = ""
+    ts: float = 0.0                 # time.time() of the last good read
+    mono: float = 0.0               # time.monotonic() of the last good read
+    ttl_s: float = float("inf")
+    failed: bool = False
+
+    @property
+    def age_s(self) -> float:
+        return time.monotonic() - self.mono
+
+    @property
+    def quality(self) -> str:
+        if self.failed:
+            return BAD
+        return GOOD if self.age_s <= self.ttl_s else STALE
+
+
+class RegisterCache:
+    def __init__(self, default_ttl_s: float = 2.0):
+        self.default_ttl_s = default_ttl_s
+        self._lock = threading.Lock()
+        self._entries: Dict[Key, CacheEntry] = {}
+
+    def put(self, key: Key, words: List[int], value: Any = None, text: str = "",
+            ttl_s: Optional[float] = None, ts: Optional[float] = None) -> bool:
+        """Store a good read. Returns True if the display text (or quality) changed."""
+        ttl_s = self.default_ttl_s if ttl_s is None else ttl_s
+        with self._lock:
+            old = self._entries.get(key)
+            changed = old is None or old.text != text or old.failed
+            self._entries[key] = CacheEntry(
+                words=list(words), value=value, text=text,
+                ts=ts if ts is not None else time.time(), mono=time.monotonic(),
+                ttl_s=ttl_s,
+            )
+        return changed
+
+    def mark_bad(self, key: Key) -> bool:
+        """Flag a failed read, keeping the last good value. Returns True if quality changed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = CacheEntry(words=[], failed=True, ttl_s=0.0)
+                return True
+            if entry.failed:
+                return False
+            entry.failed = True
+            return True
+
+    def invalidate(self, key: Key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get(self, key: Key) -> Optional[CacheEntry]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def fresh(self, key: Key, max_age_s: Optional[float] = None,
+              min_words: int = 1) -> Optional[CacheEntry]:
+        """The entry if it is good and younger than max_age_s (default: its own TTL)."""
+        entry = self.get(key)
+        if entry is None or entry.failed or len(entry.words) < min_words:
+            return None
+        limit = entry.ttl_s if max_age_s is None else max_age_s
+        return entry if entry.age_s <= limit else None
+
+    def items(self, bus: Optional[str] = None, unit: Optional[int] = None) -> Iterator[Tuple[Key, CacheEntry]]:
+        with self._lock:
+            snapshot = list(self._entries.items())
+        for key, entry in snapshot:
+            if (bus is None or key[0] == bus) and (unit is None or key[1] == unit):
+                yield key, entry
+
+    def clear(self, bus: Optional[str] = None, unit: Optional[int] = None):
+        with self._lock:
+            for key in [k for k in self._entries
+                        if (bus is None or k[0] == bus) and (unit is None or k[1] == unit)]:
+                del self._entries[key]
@@ -0,0 +1,378 @@
+# GUI-free helpers around a pymodbus client.
+#
+# Shared by the wx frame (menu reads, config page) and the acquisition worker
+# so both talk to pymodbus 2.x and 3.x the same way. pymodbus itself is only
+# imported when the first client is built, which keeps it off the startup path.
+#
+# A bus is named by an endpoint: a serial port ("/dev/ttyUSB0", "COM3"), an
+# Ethernet gateway speaking Modbus TCP ("tcp://10.0.0.7:502") or one that
+# tunnels raw RTU frames ("rtu+tcp://10.0.0.7:4001"). Clients for an
+# endpoint come from POOL, which hands the same connection to every user of
+# an (endpoint, lane) and closes it when the last one lets go.
+
+import inspect
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+_pymodbus = None        # (ModbusSerialClient, FramerType or None, version) once loaded
+
+
+def _load_pymodbus():
+    global _pymodbus
+    if _pymodbus is None:
+        import pymodbus
+        from pymodbus.client import ModbusSerialClient
+        try:
+            from pymodbus import FramerType      # pymodbus 3.x
+        except Exception:
+            FramerType = None                    # pymodbus 2.x
+        _pymodbus = (ModbusSerialClient, FramerType, getattr(pymodbus, "__version__", "?"))
+    return _pymodbus
+
+
+def framer_kw() -> str:
+    """How clients are built on the installed pymodbus (for status/help text)."""
+    return "framer=FramerType.RTU" if _load_pymodbus()[1] is not None else 'method="rtu"'
+
+
+def pymodbus_version() -> str:
+    return _load_pymodbus()[2]
+
+
+class ModbusRequestError(Exception):
+    """A queued request failed on the bus (no reply, exception response, ...)."""
+
+
+class RequestExpired(ModbusRequestError):
+    """A queued request passed its deadline before it reached the bus."""
+
+
+def make_serial_client(port, baudrate, bytesize, parity, stopbits, timeout):
+    """Build (but do not connect) an RTU client; parity is 'N'/'E'/'O'."""
+    ModbusSerialClient, FramerType, _ = _load_pymodbus()
+    if FramerType is not None:
+        return ModbusSerialClient(
+            port=port,
+            framer=FramerType.RTU,
+            baudrate=baudrate,
+            bytesize=bytesize,
+            parity=parity,
+            stopbits=stopbits,
+            timeout=timeout or 1.0,
+        )
+    return ModbusSerialClient(
+        method="rtu",
+        port=port,
+        baudrate=baudrate,
+        bytesize=bytesize,
+        parity=parity,
+        stopbits=stopbits,
+        timeout=timeout or 1.0,
+    )
+
+
+def make_tcp_client(host: str, port: int, timeout, rtu: bool = False):
+    """Build (but do not connect) a client for an Ethernet gateway; rtu=True for RTU over TCP."""
+    _, FramerType, _ = _load_pymodbus()
+    from pymodbus.client import ModbusTcpClient
+    if FramerType is not None:
+        framer = FramerType.RTU if rtu else FramerType.SOCKET
+        return ModbusTcpClient(host, port=port, framer=framer, timeout=timeout or 1.0)
+    if rtu:
+        from pymodbus.transaction import ModbusRtuFramer
+        return ModbusTcpClient(host, port=port, framer=ModbusRtuFramer, timeout=timeout or 1.0)
+    return ModbusTcpClient(host, port=port, timeout=timeout or 1.0)
+
+
+# ── endpoints and the connection pool ───────────────────────────────────────
+
+SERIAL, TCP, RTU_OVER_TCP = "serial", "tcp", "rtu+tcp"
+DEFAULT_TCP_PORT = 502
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    kind: str           # SERIAL, TCP or RTU_OVER_TCP
+    address: str        # serial port, or gateway host
+    port: int = 0       # TCP port
+
+    def __str__(self) -> str:
+        return self.address if self.kind == SERIAL else f"{self.kind}://{self.address}:{self.port}"
+
+    @property
+    def is_network(self) -> bool:
+        return self.kind != SERIAL
+
+    @property
+    def multiplexed(self) -> bool:
+        """Several requests may be in flight (MBAP transaction IDs); RTU framing has none."""
+        return self.kind == TCP
+
+    def lane_name(self, lane: int, lanes: int) -> str:
+        """Bus name of one of `lanes` parallel connections."""
+        return str(self) if lanes <= 1 else f"{self}#{lane + 1}"
+
+
+def parse_endpoint(text: str) -> Endpoint:
+    """Parse "COM3", "/dev/ttyUSB0", "tcp://host[:port]" or "rtu+tcp://host[:port]"."""
+    text = text.strip()
+    for kind in (TCP, RTU_OVER_TCP):
+        prefix = kind + "://"
+        if text.lower().startswith(prefix):
+            rest = text[len(prefix):].rstrip("/")
+            host, sep, port = rest.rpartition(":")
+            if not sep or "]" in port:
+                host, port = rest, str(DEFAULT_TCP_PORT)
+            host = host.strip("[]")
+            if not host:
+                raise ValueError(f"no host in {text!r}")
+            try:
+                return Endpoint(kind, host, int(port))
+            except ValueError:
+                raise ValueError(f"bad port in {text!r}") from None
+    if "://" in text:
+        raise ValueError(f"unknown transport in {text!r} (use tcp:// or rtu+tcp://)")
+    if not text:
+        raise ValueError("empty endpoint")
+    return Endpoint(SERIAL, text)
+
+
+def make_client(endpoint: Endpoint, baudrate=9600, bytesize=8, parity="N", stopbits=1, timeout=1.0):
+    if endpoint.kind == SERIAL:
+        return make_serial_client(endpoint.address, baudrate, bytesize, parity, stopbits, timeout)
+    return make_tcp_client(endpoint.address, endpoint.port, timeout, rtu=endpoint.kind == RTU_OVER_TCP)
+
+
+class ClientPool:
+    """
+    Reference-counted clients per (endpoint, lane). acquire() returns the
+    existing connection when there is one, so reconnecting the GUI or
+    adding a second user of a gateway does not open another socket; lanes
+    are separate connections for parallel requests to one gateway.
+    release() closes the client when its last user is gone.
+    """
+    def __init__(self, factory: Callable = make_client):
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[Endpoint, int], list] = {}     # key -> [client, refs]
+
+    def acquire(self, endpoint: Endpoint, lane: int = 0, **settings):
+        with self._lock:
+            entry = self._entries.get((endpoint, lane))
+            if entry is None:
+                entry = self._entries[(endpoint, lane)] = [self.factory(endpoint, **settings), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, client):
+        """Drop one reference; clients that did not come from the pool are just closed."""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry[0] is client:
+                    entry[1] -= 1
+                    if entry[1] > 0:
+                        return
+                    del self._entries[key]
+                    break
+        close_client(client)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+POOL = ClientPool()
+
+
+def set_timeout(client, timeout_s: float):
+    """
+    Change the reply timeout of a connected client. pymodbus keeps it in a
+    different place per version (comm_params 3.x, .params/.timeout 2.x) and
+    the serial port enforces it on reads, so all of them are updated.
+    """
+    comm = getattr(client, "comm_params", None)
+    if comm is not None and hasattr(comm, "timeout_connect"):
+        comm.timeout_connect = timeout_s
+    params = getattr(client, "params", None)
+    if params is not None and hasattr(params, "timeout"):
+        params.timeout = timeout_s
+    if hasattr(client, "timeout"):
+        try:
+            client.timeout = timeout_s
+        except Exception:
+            pass
+    port = getattr(client, "socket", None)
+    if port is not None and hasattr(port, "timeout"):
+        try:
+            port.timeout = timeout_s
+        except Exception:
+            pass
+
+
+def close_client(client):
+    try:
+        if client:
+            try:
+                if getattr(client, "connected", False):
+                    client.close()
+            except Exception:
+                client.close()
+    except Exception:
+        pass
+
+
+# ── failures ────────────────────────────────────────────────────────────────
+# Error strings carry what kind of failure they describe, so callers can
+# retry a lost frame without retrying a slave that explicitly refused.
+
+EXCEPTION_RESPONSE = "exception"    # the slave answered with a Modbus exception
+NO_REPLY = "no_reply"               # timeout / nothing usable came back
+CLIENT_ERROR = "error"              # anything else (port gone, bad call, ...)
+
+
+class Failure(str):
+    """
+    An error message with a .kind (EXCEPTION_RESPONSE, NO_REPLY or
+    CLIENT_ERROR) and, for exception responses, the Modbus exception .code.
+    """
+    def __new__(cls, message: str, kind: str = CLIENT_ERROR, code: Optional[int] = None):
+        obj = super().__new__(cls, message)
+        obj.kind = kind
+        obj.code = code
+        return obj
+
+
+def failure_kind(err) -> str:
+    return getattr(err, "kind", CLIENT_ERROR)
+
+
+def _raised_kind(e: Exception) -> str:
+    name = type(e).__name__
+    if "IO" in name or "Timeout" in name or isinstance(e, TimeoutError):
+        return NO_REPLY
+    return CLIENT_ERROR
+
+
+def _response_failure(rr, what: str) -> Optional[Failure]:
+    if rr is None:
+        return Failure(f"No reply to {what}", NO_REPLY)
+    try:
+        if rr.isError():
+            code = getattr(rr, "exception_code", None)
+            kind = EXCEPTION_RESPONSE if code is not None else NO_REPLY
+            return Failure(f"Modbus error on {what}: {rr}", kind, code)
+    except Exception:
+        pass
+    return None
+
+
+# ── request fast path ──────────────────────────────────────────────────────
+# pymodbus has named the slave address `unit=` (2.x, through **kwargs),
+# `slave=` (3.0-3.9) and `device_id=` (3.10+). Which one the installed client
+# takes is worked out once per client by bind(); every request then goes
+# straight through the bound callables, so a TypeError raised inside pymodbus
+# is reported as an error instead of being mistaken for a signature mismatch.
+
+@dataclass(frozen=True)
+class ClientOps:
+    unit_kw: Optional[str]                  # keyword for the slave address; None if unsupported
+    read_holding: Optional[Callable]        # (address, count, unit) -> response
+    write_register: Optional[Callable]      # (address, value, unit) -> response
+    write_registers: Optional[Callable]     # (address, values, unit) -> response
+
+    def describe(self) -> str:
+        return f"{self.unit_kw}=" if self.unit_kw else "no unit keyword"
+
+
+_bound: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def unit_keyword(fn) -> Optional[str]:
+    """The keyword a pymodbus request method takes for the slave address."""
+    try:
+        params = inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return "slave"
+    for kw in ("device_id", "slave", "unit"):
+        if kw in params:
+            return kw
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values()):
+        return "unit"                       # pymodbus 2.x: unit=... via **kwargs
+    return None
+
+
+def _bind_method(fn, arg_name: str, unit_kw: Optional[str]) -> Optional[Callable]:
+    if fn is None:
+        return None
+    if unit_kw is None:
+        return lambda address, arg, unit: fn(address, **{arg_name: arg})
+    return lambda address, arg, unit: fn(address, **{arg_name: arg, unit_kw: unit})
+
+
+def bind(client) -> ClientOps:
+    """Detect the client's calling convention (once) and cache the fast-path callables."""
+    read_fn = getattr(client, "read_holding_registers", None)
+    write_fn = getattr(client, "write_register", None)
+    unit_kw = unit_keyword(read_fn or write_fn) if (read_fn or write_fn) else None
+    ops = ClientOps(unit_kw, _bind_method(read_fn, "count", unit_kw),
+                    _bind_method(write_fn, "value", unit_kw),
+                    _bind_method(getattr(client, "write_registers", None), "values", unit_kw))
+    _bound[client] = ops
+    return ops
+
+
+def ops_for(client) -> ClientOps:
+    ops = _bound.get(client)
+    return ops if ops is not None else bind(client)
+
+
+def read_holding(client, address, count, unit) -> Tuple[Optional[List[int]], str]:
+    """FC03 read. Returns (registers, "") on success or (None, reason) on failure."""
+    if not client:
+        return None, Failure(f"Read failed (no client) at 0x{address:04X}")
+    read = ops_for(client).read_holding
+    if read is None:
+        return None, Failure("read_holding_registers not available on Modbus client.")
+    try:
+        rr = read(address, count, unit)
+    except Exception as e:
+        return None, Failure(f"Read error at 0x{address:04X}: {e}", _raised_kind(e))
+    failure = _response_failure(rr, f"read at 0x{address:04X}")
+    if failure is not None:
+        return None, failure
+    if getattr(rr, "registers", None) is None:
+        return None, Failure(f"No data returned at 0x{address:04X}: {rr}", NO_REPLY)
+    return list(rr.registers), ""
+
+
+def write_register(client, address, value, unit) -> Tuple[bool, str]:
+    """FC06 write. Returns (True, "") on success or (False, reason) on failure."""
+    value = int(value) & 0xFFFF
+    write = ops_for(client).write_register if client else None
+    if write is None:
+        return False, Failure("write_register not available on Modbus client.")
+    try:
+        rr = write(address, value, unit)
+    except Exception as e:
+        return False, Failure(f"Write error at 0x{address:04X}: {e}", _raised_kind(e))
+    failure = _response_failure(rr, f"write at 0x{address:04X}")
+    if failure is not None:
+        return False, failure
+    return True, ""
+
+
+def write_registers(client, address, values, unit) -> Tuple[bool, str]:
+    """FC16 write of consecutive registers. Returns (True, "") or (False, reason)."""
+    values = [int(v) & 0xFFFF for v in values]
+    write = ops_for(client).write_registers if client else None
+    if write is None:
+        return False, Failure("write_registers not available on Modbus client.")
+    try:
+        rr = write(address, values, unit)
+    except Exception as e:
+        return False, Failure(f"Write error at 0x{address:04X}: {e}", _raised_kind(e))
+    failure = _response_failure(rr, f"write of {len(values)} registers at 0x{address:04X}")
+    if failure is not None:
+        return False, failure
+    return True, ""
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# Headless REON acquisition: poll, decode, store and export without wx.
+#
+#   python mb_daemon.py --port /dev/ttyUSB0 --units 1-3 --once        (cron)
+#   python mb_daemon.py --port /dev/ttyUSB0 --port /dev/ttyUSB1 --json (systemd)
+#   python mb_daemon.py --port COM3 --duration 3600 --export day.parquet
+#   python mb_daemon.py --port tcp://10.0.0.7:502 --port rtu+tcp://10.0.0.8:4001 --units 1-16
+#   python mb_daemon.py --port /dev/ttyUSB0 --units 1-3 --apply-profile site.json
+#
+# Uses the same register tables (mb_registers), acquisition workers and
+# cache/history as the GUI. --once does one full pass over every slave and
+# exits 0 if all of them answered, 1 otherwise. Without it the daemon polls
+# on the register schedule until SIGINT/SIGTERM (or --duration), printing
+# changed values (or one JSON object per slave cycle with --json), and
+# optionally writes the recorded history with --export on the way out.
+# --diag PATH saves the per-transaction bus statistics (mb_diag) as JSON.
+# --apply-profile writes a configuration profile (mb_profile) to every slave,
+# prints the per-field verification and exits 1 if any field did not take;
+# --save-profile reads the current settings of the first slave into a file.
+# --session-log DIR writes the structured JSONL session log (mb_sessionlog).
+
+import argparse
+import json
+import queue
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import mb_cache
+import mb_client
+import mb_decode
+import mb_diag
+import mb_fleet
+import mb_history
+import mb_plan
+import mb_profile
+import mb_sessionlog
+import mb_worker
+from mb_registers import ALL_REGS, CACHE_TTL_S, CONFIG_DATA, POLL_PERIOD_S, POLL_SCHEDULE, alarm_text
+
+ONCE_TIMEOUT_S = 30.0       # give up on a --once pass after this long
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Headless REON Modbus RTU poller.")
+    p.add_argument("--port", action="append", required=True,
+                   help="serial port, tcp://host[:port] or rtu+tcp://host[:port]; repeat for several buses")
+    p.add_argument("--lanes", type=int, default=2,
+                   help="parallel connections per Modbus TCP gateway (slaves are split across them)")
+    p.add_argument("--baud", type=int, default=9600)
+    p.add_argument("--bytesize", type=int, default=8, choices=(7, 8))
+    p.add_argument("--parity", default="N", choices=("N", "E", "O"))
+    p.add_argument("--stopbits", type=float, default=1, choices=(1, 1.5, 2))
+    p.add_argument("--timeout", type=float, default=1.0,
+                   help="maximum reply timeout (s); adapts down to each slave's measured latency")
+    p.add_argument("--retries", type=int, default=mb_worker.RETRIES, help="retries after a lost reply")
+    p.add_argument("--units", default="1", help='slave IDs, e.g. "1-3,7"')
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument("--once", action="store_true", help="read everything once and exit")
+    mode.add_argument("--apply-profile", metavar="PATH",
+                      help="write a configuration profile (JSON) to every slave, verify and exit")
+    mode.add_argument("--save-profile", metavar="PATH",
+                      help="save the first slave's configuration as a profile and exit")
+    p.add_argument("--bridge-gaps", type=int, default=0, metavar="N",
+                   help="with --apply-profile, write through holes of up to N registers to merge FC16s")
+    p.add_argument("--duration", type=float, help="stop after this many seconds")
+    p.add_argument("--json", action="store_true", help="one JSON object per slave cycle on stdout")
+    p.add_argument("--export", metavar="PATH",
+                   help="write recorded history (.csv, .parquet or .xlsx) on exit; needs numpy")
+    p.add_argument("--diag", metavar="PATH",
+                   help="write transaction statistics (JSON) on exit and log a summary")
+    p.add_argument("--session-log", metavar="DIR",
+                   help="write a structured JSONL log of transactions, values and alarms to DIR")
+    p.add_argument("--session-compress", choices=("gzip", "zstd", "none"), default="gzip",
+                   help="compression for closed session log segments")
+    p.add_argument("--session-keep", type=int, metavar="N", help="keep only the newest N closed segments")
+    p.add_argument("--gap-cost", type=int, default=mb_plan.DEFAULT_GAP_COST)
+    p.add_argument("--auto-timing", action="store_true",
+                   help="auto-tune the inter-frame guard from bus behaviour")
+    args = p.parse_args(argv)
+    try:
+        args.unit_ids = mb_fleet.parse_unit_ids(args.units)
+        args.endpoints = [mb_client.parse_endpoint(port) for port in args.port]
+    except ValueError as e:
+        p.error(str(e))
+    if args.apply_profile:
+        try:
+            args.profile = mb_profile.load_profile(args.apply_profile)
+        except (OSError, ValueError) as e:
+            p.error(str(e))
+    if args.session_compress == "none":
+        args.session_compress = None
+    if args.session_compress == "zstd" and mb_sessionlog.zstandard is None:
+        p.error("--session-compress zstd needs the zstandard package (pip install zstandard)")
+    if args.export:
+        if not mb_history.available():
+            p.error("--export needs numpy (pip install numpy)")
+        import mb_export
+        try:
+            mb_export.format_for(args.export)
+        except ValueError as e:
+            p.error(str(e))
+    return args
+
+
+class Daemon:
+    def __init__(self, args):
+        self.args = args
+        self.results: "queue.Queue[mb_worker.PollResult]" = queue.Queue()
+        self.pool = mb_worker.WorkerPool()
+        self.cache = mb_cache.RegisterCache()
+        self.history = mb_history.History() if mb_history.available() else None
+        self.diag = mb_diag.Diagnostics()
+        self.journal: Optional[mb_sessionlog.SessionLog] = None
+        if args.session_log:
+            self.journal = mb_sessionlog.SessionLog(args.session_log, "daemon",
+                                                    compression=args.session_compress, keep=args.session_keep)
+            self.journal.event("session", event="start", app="mb_daemon", argv=sys.argv[1:],
+                               endpoints=[str(ep) for ep in args.endpoints], units=args.unit_ids)
+        self.stop = threading.Event()
+        self.seen: Dict[Tuple[str, int], mb_worker.PollResult] = {}
+        self.alarms: Dict[Tuple[str, int], List[int]] = {}
+
+    # ── setup ────────────────────────────────────────────────────────────
+    def connect(self) -> bool:
+        a = self.args
+        for ep in a.endpoints:
+            lanes = max(1, min(a.lanes, len(a.unit_ids))) if ep.multiplexed else 1
+            clients = []
+            for lane in range(lanes):
+                client = mb_client.POOL.acquire(ep, lane, baudrate=a.baud, bytesize=a.bytesize,
+                                                parity=a.parity, stopbits=a.stopbits, timeout=a.timeout)
+                if not client.connect():
+                    mb_client.POOL.release(client)
+                    break
+                clients.append(client)
+            if len(clients) < lanes:
+                self.log(f"{ep}: could not connect")
+                for client in clients:
+                    mb_client.POOL.release(client)
+                continue
+            for lane, (client, units) in enumerate(zip(clients, mb_worker.split_units(a.unit_ids, lanes))):
+                mb_client.bind(client)
+                self.cache.clear(bus=ep.lane_name(lane, lanes))     # nothing cached survives a (re)connect
+                timing = mb_worker.FrameTiming(a.baud, a.bytesize, a.parity, a.stopbits, auto=a.auto_timing,
+                                               fixed_gap_s=0.0 if ep.is_network else None)
+                self.pool.add(mb_worker.AcquisitionWorker(
+                    client, POLL_SCHEDULE, units, post=self.results.put, gap_cost=a.gap_cost,
+                    timing=timing, bus=ep.lane_name(lane, lanes), timeout_s=a.timeout, retries=a.retries,
+                    diag=self.diag, group=str(ep), journal=self.journal))
+        return len(self.pool) > 0
+
+    def log(self, msg: str):
+        print(msg, file=sys.stderr, flush=True)
+
+    # ── results ──────────────────────────────────────────────────────────
+    def store(self, result: mb_worker.PollResult) -> List[Tuple[str, str]]:
+        """Cache (and record) one cycle; returns [(name, text)] that changed."""
+        changed = []
+        for addr, (value, text) in result.values.items():
+            reg = ALL_REGS.get(addr)
+            if reg is None:
+                continue
+            key = (result.bus, result.unit, addr)
+            if self.cache.put(key, result.words[addr], value, text, CACHE_TTL_S.get(addr), result.started):
+                changed.append((reg.name, text))
+            period = POLL_PERIOD_S.get(addr, mb_plan.ONCE)
+            if self.history is not None and period != mb_plan.ONCE and isinstance(value, (int, float)):
+                self.history.record(key, result.started, value * reg.scale, period)
+        for addr in result.missing:
+            self.cache.mark_bad((result.bus, result.unit, addr))
+        self.seen[(result.bus, result.unit)] = result
+        return changed
+
+    def emit(self, result: mb_worker.PollResult, changed: List[Tuple[str, str]]):
+        if self.args.json:
+            obj = {
+                "ts": round(result.started, 3),
+                "bus": result.bus,
+                "unit": result.unit,
+                "status": result.slave.status if result.slave else "",
+                "elapsed_ms": round(result.elapsed * 1000, 1),
+                "values": {ALL_REGS[a].name: mb_decode.scaled(ALL_REGS[a], v)
+                           for a, (v, _) in result.values.items() if a in ALL_REGS},
+                "text": {ALL_REGS[a].name: t for a, (_, t) in result.values.items() if a in ALL_REGS},
+                "missing": [ALL_REGS[a].name for a in result.missing if a in ALL_REGS],
+                "alarms": result.alarm_ids,
+                "alarm_details": result.alarm_details or None,
+                "errors": result.log,
+            }
+            print(json.dumps(obj, ensure_ascii=False), flush=True)
+            return
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(result.started))
+        prefix = f"{stamp} {result.bus} #{result.unit}"
+        for name, text in changed:
+            print(f"{prefix} {name}: {text}", flush=True)
+        key = (result.bus, result.unit)
+        if result.alarm_ids is not None and result.alarm_ids != self.alarms.get(key):
+            before = set(self.alarms.get(key, []))
+            for a in result.alarm_ids:
+                if a not in before:
+                    print(f"{prefix} ALARM {alarm_text(a, result.alarm_details.get(a))}", flush=True)
+            for a in sorted(before - set(result.alarm_ids)):
+                print(f"{prefix} CLEARED {alarm_text(a)}", flush=True)
+            self.alarms[key] = result.alarm_ids
+        for line in result.log:
+            self.log(f"{prefix} {line}")
+
+    # ── modes ────────────────────────────────────────────────────────────
+    def run_once(self) -> int:
+        expected = set(self.pool.keys())
+        self.pool.poll_once()
+        deadline = time.monotonic() + ONCE_TIMEOUT_S
+        while expected - self.seen.keys() and not self.stop.is_set():
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                result = self.results.get(timeout=min(left, 0.5))
+            except queue.Empty:
+                continue
+            self.emit(result, self.store(result))
+        answered = {k for k, r in self.seen.items() if r.slave and r.slave.online}
+        for bus, unit in sorted(expected - answered):
+            self.log(f"{bus} #{unit}: no reply")
+        return 0 if answered >= expected else 1
+
+    def apply_profile(self) -> int:
+        jobs = [(w, unit, mb_profile.submit(w, self.args.profile, unit, self.args.bridge_gaps))
+                for w in self.pool for unit in w.units]
+        rc = 0
+        for w, unit, fut in jobs:
+            try:
+                result = fut.result(timeout=ONCE_TIMEOUT_S)
+            except Exception as e:
+                self.log(f"{w.bus} #{unit}: {e}")
+                rc = 1
+                continue
+            if self.args.json:
+                print(json.dumps({"bus": w.bus, **result.as_dict()}), flush=True)
+            else:
+                for line in result.lines():
+                    print(f"{w.bus} {line}", flush=True)
+            if not result.ok:
+                rc = 1
+        return rc
+
+    def save_profile(self) -> int:
+        w = next(iter(self.pool))
+        fut = w.submit(lambda client: mb_profile.read_config(client, w.unit, pause_s=w.timing.gap_s,
+                                                             record=lambda *tx: w.record(w.unit, *tx)),
+                       mb_worker.PRIO_READ, addr=CONFIG_DATA[0].addr)
+        try:
+            values, err = fut.result(timeout=ONCE_TIMEOUT_S)
+        except Exception as e:
+            values, err = None, str(e)
+        if values is None:
+            self.log(f"{w.bus} #{w.unit}: {err}")
+            return 1
+        try:
+            mb_profile.save_profile(self.args.save_profile, {r: values[r.addr] for r in CONFIG_DATA
+                                                                if r.addr in values})
+        except OSError as e:
+            self.log(str(e))
+            return 1
+        self.log(f"{w.bus} #{w.unit}: profile saved to {self.args.save_profile}")
+        return 0
+
+    def run_forever(self) -> int:
+        self.pool.set_auto(True)
+        end = time.monotonic() + self.args.duration if self.args.duration else None
+        while not self.stop.is_set():
+            if end is not None and time.monotonic() >= end:
+                break
+            try:
+                result = self.results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.emit(result, self.store(result))
+        return 0
+
+    def export(self) -> int:
+        import mb_export
+        done = threading.Event()
+        outcome: List[Optional[str]] = []
+        job = mb_export.ExportJob(
+            self.history, self.args.export,
+            {key: ALL_REGS[key[2]].name for key in self.history.keys() if key[2] in ALL_REGS},
+            on_progress=lambda d, t: None,
+            on_done=lambda rows, err: (outcome.append(err), self.log(
+                f"exported {rows} rows to {self.args.export}" if err is None else f"export {err}"),
+                done.set()))
+        job.start()
+        done.wait()
+        return 0 if outcome and outcome[0] is None else 1
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    d = Daemon(args)
+
+    def on_signal(signum, _frame):
+        d.stop.set()
+    signal.signal(signal.SIGINT, on_signal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, on_signal)
+
+    if not d.connect():
+        if d.journal is not None:
+            d.journal.event("session", event="stop", rc=2, error="no bus connected")
+            d.journal.close()
+        return 2
+    try:
+        if args.apply_profile:
+            rc = d.apply_profile()
+        elif args.save_profile:
+            rc = d.save_profile()
+        else:
+            rc = d.run_once() if args.once else d.run_forever()
+    finally:
+        for w in d.pool:
+            d.log(f"{w.bus}: {w.timing.report()}")
+            for line in w.latency_report():
+                d.log(f"  {line}")
+        d.pool.stop_all()
+    if args.diag:
+        try:
+            snap = d.diag.write_json(args.diag)
+        except OSError as e:
+            d.log(f"diagnostics: {e}")
+        else:
+            for line in mb_diag.summary_lines(snap):
+                d.log(line)
+    if d.journal is not None:
+        d.journal.event("session", event="stop", rc=rc)
+        d.journal.close()
+        st = d.journal.stats()
+        d.log(f"session log: {st['written']} records, {st['dropped']} dropped, "
+              f"writer CPU {st['cpu_s']} s" + (f", {st['error']}" if st["error"] else ""))
+    if args.export and d.history is not None:
+        rc = d.export() or rc
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# Precompiled register decoders.
+#
+# Each Reg (anything with name/addr/words/codec/scale/unit) is compiled once
+# into a closure around a struct.Struct (or an ASCII slice) and a fixed
+# format string. A coalesced FC03 span is converted to big-endian bytes in
+# one array('H') byteswap, after which every register in it is a single
+# unpack_from() at its offset, so nothing is dispatched on the codec string
+# or re-derived from the scale per value.
+
+import struct
+import sys
+from array import array
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+Decoder = Callable[[bytes, int], Tuple[Any, str]]    # (buf, byte offset) -> (value, text)
+
+_STRUCTS = {
+    "u16": struct.Struct(">H"),
+    "s16": struct.Struct(">h"),
+    "u32": struct.Struct(">I"),     # high word first
+    "s32": struct.Struct(">i"),
+}
+
+_decoders: Dict[object, Decoder] = {}
+_layouts: Dict[object, List[Tuple[object, int, Decoder]]] = {}
+
+
+def words_to_bytes(words: Sequence[int]) -> bytes:
+    """Register words -> big-endian byte string, in one pass."""
+    arr = array("H", words)
+    if sys.byteorder == "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def scale_decimals(scale: float) -> int:
+    """Digits after the point implied by a scale: 0.1 -> 1, 0.01 -> 2, 1 -> 0."""
+    return max(0, -Decimal(str(scale)).as_tuple().exponent)
+
+
+def scaled(reg, value):
+    """Engineering value: raw * scale, rounded to the digits the scale implies."""
+    if not isinstance(value, (int, float)) or reg.scale == 1:
+        return value
+    return round(value * reg.scale, scale_decimals(reg.scale))
+
+
+def compile_reg(reg) -> Decoder:
+    if reg.codec == "ascii":
+        nbytes = 2 * reg.words
+
+        def decode_ascii(buf, off):
+            text = buf[off:off + nbytes].split(b"\x00", 1)[0].decode("ascii", errors="ignore")
+            return text, text
+        return decode_ascii
+
+    st = _STRUCTS.get(reg.codec)
+    if st is None:
+        raise ValueError(f"{reg.name}: unknown codec {reg.codec!r}")
+    if st.size > 2 * reg.words:
+        raise ValueError(f"{reg.name}: {reg.codec} needs {st.size // 2} words, table has {reg.words}")
+    unpack_from = st.unpack_from
+    scale = reg.scale
+    if scale != 1:
+        fmt = f"{{:.{scale_decimals(scale)}f}} {reg.unit}".strip().format
+
+        def decode_scaled(buf, off):
+            v = unpack_from(buf, off)[0]
+            return v, fmt(v * scale)
+        return decode_scaled
+
+    fmt = f"{{:.0f}} {reg.unit}".strip().format
+
+    def decode_int(buf, off):
+        v = unpack_from(buf, off)[0]
+        return v, fmt(v)
+    return decode_int
+
+
+def decoder(reg) -> Decoder:
+    fn = _decoders.get(reg)
+    if fn is None:
+        fn = _decoders[reg] = compile_reg(reg)
+    return fn
+
+
+def compile_table(regs: Iterable):
+    """Compile a register table up front (and fail early on a bad entry)."""
+    for reg in regs:
+        decoder(reg)
+
+
+def decode(reg, words: Sequence[int]) -> Tuple[Any, str]:
+    """Decode one register's words; (None, "") if the reply was short."""
+    if len(words) < reg.words:
+        return None, ""
+    return decoder(reg)(words_to_bytes(words[:reg.words]), 0)
+
+
+def _layout(span) -> List[Tuple[object, int, Decoder]]:
+    layout = _layouts.get(span)
+    if layout is None:
+        layout = _layouts[span] = [
+            (reg, reg.addr - span.addr, decoder(reg) if hasattr(reg, "codec") else None)
+            for reg in span.regs
+        ]
+    return layout
+
+
+def decode_span(span, words: Sequence[int]) -> List[Tuple[object, List[int], Any, str]]:
+    """
+    Split and decode a whole mb_plan.Span reply: [(reg, reg_words, value, text)].
+    Members without a codec (alarm blocks) come back with value None; members
+    a short reply does not fully cover are skipped.
+    """
+    buf = words_to_bytes(words)
+    out = []
+    for reg, off, fn in _layout(span):
+        if off + reg.words > len(words):
+            continue
+        reg_words = list(words[off:off + reg.words])
+        if fn is None:
+            out.append((reg, reg_words, None, ""))
+        else:
+            out.append((reg, reg_words) + fn(buf, 2 * off))
+    return out
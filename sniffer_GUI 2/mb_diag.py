@@ -0,0 +1,185 @@
+# Modbus transaction instrumentation.
+#
+# The acquisition workers report every transaction they put on the bus
+# (request sent, first reply byte, reply complete, outcome) and every poll
+# cycle to a shared Diagnostics object. It keeps counters per (bus, unit,
+# function code) and outcome, a latency histogram per bus, a sliding window
+# for registers/s and bus utilization, and recent cycle times for
+# percentiles. snapshot() turns all of it into plain JSON-able data, which
+# the Diagnostics tab shows and write_json() saves for regression comparisons.
+#
+# pymodbus does not expose when the first reply byte arrived, so it is taken
+# as reply complete minus the reply's time on the wire at the line settings.
+
+import json
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import mb_client
+import mb_fleet
+
+OK = "ok"
+TIMEOUT = "timeout"
+CRC = "crc"
+EXCEPTION = "exception"
+ERROR = "error"
+OUTCOMES = (OK, TIMEOUT, CRC, EXCEPTION, ERROR)
+
+FC_NAMES = {3: "FC03 read holding", 6: "FC06 write single", 16: "FC16 write multiple"}
+
+WINDOW_S = 10.0             # registers/s and utilization are averaged over this
+CYCLE_SAMPLES = 512         # cycle times kept per bus for percentiles
+SCHEMA = 1
+
+
+def classify(err) -> Tuple[str, Optional[int]]:
+    """(outcome, exception code) of a transaction; err is None/"" on success."""
+    if not err:
+        return OK, None
+    kind = mb_client.failure_kind(err)
+    if kind == mb_client.EXCEPTION_RESPONSE:
+        return EXCEPTION, getattr(err, "code", None)
+    if "crc" in str(err).lower():
+        return CRC, None
+    if kind == mb_client.NO_REPLY:
+        return TIMEOUT, None
+    return ERROR, None
+
+
+def percentiles(values, qs=(0.5, 0.95, 0.99)) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    n = len(ordered)
+    out = {f"p{round(q * 100)}": ordered[min(n - 1, int(q * n))] for q in qs}
+    out["max"] = ordered[-1]
+    return out
+
+
+class _BusStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counters: Dict[Tuple[int, int], Counter] = {}     # (unit, fc) -> outcome -> n
+        self.exception_codes: Dict[Tuple[int, int], Counter] = {}
+        self.latency_sum: Dict[Tuple[int, int], float] = {}
+        self.latency = mb_fleet.LatencyHistogram()
+        self.turnaround = mb_fleet.LatencyHistogram()
+        self.window: Deque[Tuple[float, int, float]] = deque()  # (t_done, registers, wire_s)
+        self.cycles: Deque[float] = deque(maxlen=CYCLE_SAMPLES)
+        self.transactions = 0
+        self.registers = 0
+
+
+class Diagnostics:
+    """Thread-safe sink for worker transactions; one instance per app/daemon."""
+    def __init__(self, window_s: float = WINDOW_S):
+        self.window_s = window_s
+        self._lock = threading.Lock()
+        self._buses: Dict[str, _BusStats] = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._buses = {}
+            self.started = time.time()
+
+    def _bus(self, bus: str) -> _BusStats:
+        st = self._buses.get(bus)
+        if st is None:
+            st = self._buses[bus] = _BusStats()
+        return st
+
+    def transaction(self, bus: str, unit: int, fc: int, t_request: float, t_first_byte: float,
+                    t_done: float, err=None, registers: int = 0, wire_s: float = 0.0):
+        """One request/reply; times are time.monotonic(), err as returned by mb_client."""
+        outcome, code = classify(err)
+        key = (unit, fc)
+        with self._lock:
+            st = self._bus(bus)
+            st.counters.setdefault(key, Counter())[outcome] += 1
+            if code is not None:
+                st.exception_codes.setdefault(key, Counter())[code] += 1
+            st.transactions += 1
+            if outcome == OK:
+                st.latency.add(t_done - t_request)
+                st.turnaround.add(max(0.0, t_first_byte - t_request))
+                st.latency_sum[key] = st.latency_sum.get(key, 0.0) + (t_done - t_request)
+                st.registers += registers
+                st.window.append((t_done, registers, wire_s))
+                self._trim(st, t_done)
+
+    def cycle(self, bus: str, unit: int, elapsed_s: float):
+        with self._lock:
+            self._bus(bus).cycles.append(elapsed_s)
+
+    def _trim(self, st: _BusStats, now: float):
+        while st.window and st.window[0][0] < now - self.window_s:
+            st.window.popleft()
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            buses = {bus: self._bus_snapshot(st, now) for bus, st in sorted(self._buses.items())}
+        return {"schema": SCHEMA, "taken": time.time(), "since": self.started,
+                "window_s": self.window_s, "buses": buses}
+
+    def _bus_snapshot(self, st: _BusStats, now: float) -> dict:
+        self._trim(st, now)
+        span = min(self.window_s, max(1e-3, now - st.started))
+        slaves = []
+        for (unit, fc), counts in sorted(st.counters.items()):
+            ok = counts.get(OK, 0)
+            slaves.append({
+                "unit": unit, "fc": fc,
+                **{o: counts.get(o, 0) for o in OUTCOMES},
+                "exception_codes": {str(c): n for c, n in sorted(st.exception_codes.get((unit, fc), {}).items())},
+                "avg_ms": round(1000 * st.latency_sum.get((unit, fc), 0.0) / ok, 2) if ok else None,
+            })
+        return {
+            "transactions": st.transactions,
+            "registers": st.registers,
+            "registers_per_s": round(sum(r for _, r, _ in st.window) / span, 1),
+            "utilization_pct": round(100.0 * sum(w for _, _, w in st.window) / span, 1),
+            "latency_ms": _hist_snapshot(st.latency),
+            "turnaround_ms": _hist_snapshot(st.turnaround),
+            "cycle_ms": {k: round(1000 * v, 1) for k, v in percentiles(list(st.cycles)).items()},
+            "cycles": len(st.cycles),
+            "counters": slaves,
+        }
+
+    def write_json(self, path: str) -> dict:
+        snap = self.snapshot()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snap, f, indent=2)
+        return snap
+
+
+def _hist_snapshot(h: mb_fleet.LatencyHistogram) -> dict:
+    edges = h.EDGES + [float("inf")]
+    buckets = [[round(1000 * e, 3) if e != float("inf") else None, round(c, 1)]
+               for e, c in zip(edges, h.counts) if c]
+    return {
+        "ewma": round(1000 * h.ewma_s, 2),
+        "p50": round(1000 * h.quantile(0.5), 2),
+        "p90": round(1000 * h.quantile(0.9), 2),
+        "p99": round(1000 * h.quantile(0.99), 2),
+        "buckets": buckets,             # [upper edge ms (None = overflow), decayed count]
+    }
+
+
+def summary_lines(snap: dict) -> List[str]:
+    """Short human-readable form of a snapshot (daemon log, terminal)."""
+    lines = []
+    for bus, b in snap["buses"].items():
+        cyc = b["cycle_ms"]
+        lines.append(f"{bus}: {b['transactions']} transactions, {b['registers_per_s']} regs/s, "
+                     f"utilization {b['utilization_pct']} %, latency p50 {b['latency_ms']['p50']} ms "
+                     f"p99 {b['latency_ms']['p99']} ms, cycle p50 {cyc.get('p50', '-')} ms "
+                     f"p95 {cyc.get('p95', '-')} ms")
+        for c in b["counters"]:
+            bad = "".join(f", {o} {c[o]}" for o in OUTCOMES[1:] if c[o])
+            fc = FC_NAMES.get(c["fc"], "FC%02d" % c["fc"])
+            lines.append(f"  #{c['unit']} {fc}: ok {c['ok']}{bad}")
+    return lines
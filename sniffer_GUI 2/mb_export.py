@@ -0,0 +1,217 @@
+# Streaming export of recorded history (mb_history) to CSV, Parquet or xlsx.
+#
+# Rows are produced series by series in bounded chunks and written straight
+# out (csv.writer, a pyarrow ParquetWriter, or an openpyxl write-only
+# workbook), so the export never holds more than one chunk in memory. An
+# ExportJob runs the whole thing on a background thread and reports progress
+# through callbacks; nothing here imports wx.
+
+import csv
+import datetime
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterator, Optional
+
+import numpy as np
+
+CHUNK_ROWS = 65536
+XLSX_MAX_ROWS = 1_048_576           # per sheet, header included
+
+COLUMNS = ("time", "bus", "unit", "register", "value", "min", "max", "resolution")
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".xlsx": "xlsx"}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+@dataclass
+class Chunk:
+    bus: str
+    unit: int
+    register: str
+    resolution: str                 # "raw" or "1min"
+    ts: np.ndarray                  # float64 epoch seconds
+    value: np.ndarray               # raw value, or bucket average
+    vmin: Optional[np.ndarray] = None
+    vmax: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+def format_for(path: str) -> str:
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"unsupported export type: {path} (use {', '.join(FORMATS)})")
+    return fmt
+
+
+def estimate_rows(history, since: Optional[float] = None) -> int:
+    """Upper bound on the rows iter_chunks() will produce (ignores `since`)."""
+    return sum(s.raw.size + s.buckets.size for _, s in history.items())
+
+
+def iter_chunks(history, names: Dict[Hashable, str], since: Optional[float] = None,
+                chunk_rows: int = CHUNK_ROWS) -> Iterator[Chunk]:
+    """
+    Yield every series of `history` (keys (bus, unit, addr)) as chunks of at
+    most `chunk_rows` rows: 1-minute buckets for the time before the raw ring
+    starts, then the raw samples. `names` maps a key to its register name.
+    """
+    for key in sorted(history.keys()):
+        view = history.view(key, since)
+        if view is None:
+            continue
+        (b_ts, b_min, b_avg, b_max), (raw_ts, raw_val) = view
+        bus, unit, addr = key
+        name = names.get(key, f"0x{addr:04X}")
+        for i in range(0, len(b_ts), chunk_rows):
+            sl = slice(i, i + chunk_rows)
+            yield Chunk(bus, unit, name, "1min", b_ts[sl], b_avg[sl], b_min[sl], b_max[sl])
+        for i in range(0, len(raw_ts), chunk_rows):
+            sl = slice(i, i + chunk_rows)
+            yield Chunk(bus, unit, name, "raw", raw_ts[sl], raw_val[sl])
+
+
+def _round(a: Optional[np.ndarray]) -> list:
+    if a is None:
+        return []
+    # float32 -> float64 leaves tails like 12.300000190734863; round them off
+    return np.round(a.astype(np.float64), 6).tolist()
+
+
+def _none_list(n: int) -> list:
+    return [None] * n
+
+
+# ── writers ─────────────────────────────────────────────────────────────────
+# Each takes (path, chunks, step) and calls step(rows_written_in_chunk) after
+# every chunk; step raises ExportCancelled to abort.
+
+def write_csv(path: str, chunks: Iterator[Chunk], step: Callable[[int], None]):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNS)
+        for c in chunks:
+            n = len(c)
+            times = np.datetime_as_string((c.ts * 1000).astype("datetime64[ms]"), unit="ms", timezone="UTC")
+            vmin = _round(c.vmin) or [""] * n
+            vmax = _round(c.vmax) or [""] * n
+            w.writerows(zip(times.tolist(), [c.bus] * n, [c.unit] * n, [c.register] * n,
+                            _round(c.value), vmin, vmax, [c.resolution] * n))
+            step(n)
+
+
+def write_parquet(path: str, chunks: Iterator[Chunk], step: Callable[[int], None]):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("time", pa.timestamp("ms", tz="UTC")),
+        ("bus", pa.string()),
+        ("unit", pa.int16()),
+        ("register", pa.string()),
+        ("value", pa.float32()),
+        ("min", pa.float32()),
+        ("max", pa.float32()),
+        ("resolution", pa.string()),
+    ])
+    with pq.ParquetWriter(path, schema, compression="snappy") as writer:
+        for c in chunks:
+            n = len(c)
+            empty = pa.nulls(n, pa.float32())
+            table = pa.Table.from_arrays([
+                pa.array((c.ts * 1000).astype(np.int64), pa.timestamp("ms", tz="UTC")),
+                pa.array([c.bus] * n, pa.string()),
+                pa.array(np.full(n, c.unit, np.int16)),
+                pa.array([c.register] * n, pa.string()),
+                pa.array(c.value, pa.float32()),
+                pa.array(c.vmin, pa.float32()) if c.vmin is not None else empty,
+                pa.array(c.vmax, pa.float32()) if c.vmax is not None else empty,
+                pa.array([c.resolution] * n, pa.string()),
+            ], schema=schema)
+            writer.write_table(table)
+            step(n)
+
+
+def write_xlsx(path: str, chunks: Iterator[Chunk], step: Callable[[int], None]):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws, rows, sheets = None, XLSX_MAX_ROWS, 0
+    for c in chunks:
+        n = len(c)
+        # Excel shows naive local time
+        times = [datetime.datetime.fromtimestamp(t) for t in c.ts.tolist()]
+        values = _round(c.value)
+        vmin = _round(c.vmin) or _none_list(n)
+        vmax = _round(c.vmax) or _none_list(n)
+        for i in range(n):
+            if rows >= XLSX_MAX_ROWS:
+                sheets += 1
+                ws = wb.create_sheet("History" if sheets == 1 else f"History {sheets}")
+                ws.append(COLUMNS)
+                rows = 1
+            ws.append((times[i], c.bus, c.unit, c.register, values[i], vmin[i], vmax[i], c.resolution))
+            rows += 1
+        step(n)
+    if ws is None:
+        wb.create_sheet("History").append(COLUMNS)
+    wb.save(path)
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "xlsx": write_xlsx}
+
+
+class ExportJob(threading.Thread):
+    """
+    Export `history` to `path` (format from the extension) off the caller's
+    thread. on_progress(done_rows, total_rows) is called after every chunk
+    and on_done(rows, error) once at the end; error is None on success,
+    "cancelled" after cancel(), or the exception text. A cancelled or failed
+    export removes its partial file.
+    """
+    def __init__(self, history, path: str, names: Dict[Hashable, str],
+                 on_progress: Callable[[int, int], None], on_done: Callable[[int, Optional[str]], None],
+                 since: Optional[float] = None, chunk_rows: int = CHUNK_ROWS):
+        super().__init__(name="history-export", daemon=True)
+        self.history = history
+        self.path = path
+        self.fmt = format_for(path)
+        self.names = names
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.since = since
+        self.chunk_rows = chunk_rows
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        total = max(1, estimate_rows(self.history, self.since))
+        done = 0
+
+        def step(n):
+            nonlocal done
+            done += n
+            self.on_progress(min(done, total), total)
+            if self._cancel.is_set():
+                raise ExportCancelled()
+
+        error = None
+        try:
+            WRITERS[self.fmt](self.path, iter_chunks(self.history, self.names, self.since, self.chunk_rows), step)
+        except ExportCancelled:
+            error = "cancelled"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        if error is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        self.on_done(done, error)
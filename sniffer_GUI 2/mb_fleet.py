@@ -0,0 +1,168 @@
+# Fleet (multi-slave) bookkeeping for RS-485 segments with several inverters.
+#
+# The acquisition worker round-robins the poll plan over a list of unit IDs;
+# each slave keeps a SlaveState so the GUI can show a per-slave table and the
+# bus utilization actually achieved.
+#
+# A slave that leaves BREAKER_THRESHOLD whole cycles in a row unanswered
+# (timeouts or connection failures only; a Modbus exception reply is an
+# answer) trips its circuit breaker: the worker stops polling it and only
+# sends a single probe read, first after PROBE_MIN_S and then at doubling
+# intervals up to PROBE_MAX_S, until it answers. The other slaves on the bus keep their cycle
+# time instead of waiting out a timeout per register of a dead inverter.
+
+import bisect
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+MIN_UNIT_ID = 1
+MAX_UNIT_ID = 247
+
+BREAKER_THRESHOLD = 3
+PROBE_MIN_S = 2.0
+PROBE_MAX_S = 120.0
+
+
+def parse_unit_ids(text: str) -> List[int]:
+    """
+    Parse "1,2,5-8" style lists into sorted unique unit IDs.
+    Raises ValueError on anything outside 1..247.
+    """
+    ids = set()
+    for part in text.replace(";", ",").replace(" ", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = (int(x, 0) for x in part.split("-", 1))
+            if lo > hi:
+                lo, hi = hi, lo
+            ids.update(range(lo, hi + 1))
+        else:
+            ids.add(int(part, 0))
+    bad = [u for u in ids if not MIN_UNIT_ID <= u <= MAX_UNIT_ID]
+    if bad:
+        raise ValueError(f"unit IDs must be {MIN_UNIT_ID}..{MAX_UNIT_ID}: {bad}")
+    if not ids:
+        raise ValueError("no unit IDs given")
+    return sorted(ids)
+
+
+def format_unit_ids(ids: List[int]) -> str:
+    """Inverse of parse_unit_ids: [1,2,3,7] -> "1-3,7"."""
+    out, ids = [], sorted(ids)
+    i = 0
+    while i < len(ids):
+        j = i
+        while j + 1 < len(ids) and ids[j + 1] == ids[j] + 1:
+            j += 1
+        out.append(str(ids[i]) if i == j else f"{ids[i]}-{ids[j]}")
+        i = j + 1
+    return ",".join(out)
+
+
+class LatencyHistogram:
+    """
+    Log-spaced histogram of reply latencies (1 ms .. ~20 s, 25% steps) with
+    exponential forgetting: every DECAY_EVERY samples all counts are halved,
+    so the quantiles follow a slave whose behaviour changes.
+    """
+    EDGES = [0.001 * 1.25 ** i for i in range(45)]
+    DECAY_EVERY = 256
+    EWMA_ALPHA = 0.1
+
+    def __init__(self):
+        self.counts = [0.0] * (len(self.EDGES) + 1)
+        self.total = 0.0
+        self.samples = 0
+        self.ewma_s = 0.0
+
+    def add(self, latency_s: float):
+        self.counts[bisect.bisect_left(self.EDGES, latency_s)] += 1
+        self.total += 1
+        self.samples += 1
+        if self.ewma_s:
+            self.ewma_s += self.EWMA_ALPHA * (latency_s - self.ewma_s)
+        else:
+            self.ewma_s = latency_s
+        if self.samples % self.DECAY_EVERY == 0:
+            self.counts = [c / 2 for c in self.counts]
+            self.total /= 2
+
+    def quantile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-quantile (0 with no samples)."""
+        if not self.total:
+            return 0.0
+        want, acc = q * self.total, 0.0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= want:
+                return self.EDGES[min(i, len(self.EDGES) - 1)]
+        return self.EDGES[-1]
+
+
+@dataclass
+class SlaveState:
+    unit: int
+    online: bool = False
+    cycles: int = 0
+    failed_cycles: int = 0          # cycles where no read got any answer
+    consecutive_failures: int = 0
+    last_seen: float = 0.0          # time.time() of the last answered cycle
+    last_cycle_s: float = 0.0
+    avg_cycle_s: float = 0.0        # EWMA of cycle time
+    wire_bytes: int = 0             # total FC03 bytes moved for this slave
+    retries: int = 0                # transactions repeated after a lost reply
+    latency_ewma_s: float = 0.0     # slave turnaround (reply time minus wire time)
+    latency_p99_s: float = 0.0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram, repr=False, compare=False)
+    breaker_open: bool = False
+    probe_interval_s: float = 0.0
+    next_probe: float = 0.0         # time.monotonic() of the next probe while open
+
+    EWMA_ALPHA = 0.2
+
+    def record_latency(self, latency_s: float):
+        self.latency.add(latency_s)
+        self.latency_ewma_s = self.latency.ewma_s
+        self.latency_p99_s = self.latency.quantile(0.99)
+
+    def update(self, result) -> "SlaveState":
+        """Fold one PollResult into the state and return self."""
+        self.cycles += 1
+        self.last_cycle_s = result.elapsed
+        if self.avg_cycle_s:
+            self.avg_cycle_s += self.EWMA_ALPHA * (result.elapsed - self.avg_cycle_s)
+        else:
+            self.avg_cycle_s = result.elapsed
+        self.wire_bytes += result.wire_bytes
+        self.retries += result.retries
+        # Only silence counts against the slave: an exception reply (e.g. an
+        # unmapped register) proves it is alive and resets the failure count.
+        if result.reads and result.no_reply >= result.reads:
+            self.online = False
+            self.failed_cycles += 1
+            self.consecutive_failures += 1
+            if self.breaker_open:
+                self.probe_interval_s = min(PROBE_MAX_S, 2 * self.probe_interval_s)
+            elif self.consecutive_failures >= BREAKER_THRESHOLD:
+                self.breaker_open = True
+                self.probe_interval_s = PROBE_MIN_S
+            if self.breaker_open:
+                self.next_probe = time.monotonic() + self.probe_interval_s
+        else:
+            self.online = True
+            self.consecutive_failures = 0
+            self.last_seen = time.time()
+            self.breaker_open = False
+            self.probe_interval_s = 0.0
+        return self
+
+    @property
+    def status(self) -> str:
+        if not self.cycles:
+            return "pending"
+        if self.breaker_open:
+            return f"offline, probing every {self.probe_interval_s:.0f} s"
+        return "online" if self.online else f"no reply ({self.consecutive_failures})"
@@ -0,0 +1,214 @@
+# Bounded in-memory history per (bus, unit, register).
+#
+# Every series has two preallocated NumPy rings: raw samples (float64 time,
+# float32 value) sized to cover RAW_WINDOW_S at the register's poll period,
+# and 1-minute min/avg/max buckets covering RETENTION_S. Buckets are folded
+# in as samples arrive, so nothing is ever recomputed or reallocated and
+# memory stays flat for as long as the app runs. Series are only created
+# while the total stays inside the memory budget; beyond that, new series
+# are refused (and counted) rather than growing the process.
+
+import math
+import threading
+from typing import Dict, Hashable, Iterator, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:         # history is optional; the GUI runs without it
+    np = None
+
+RAW_WINDOW_S = 3600.0               # keep every sample for the last hour
+BUCKET_S = 60.0                     # then 1-minute min/avg/max
+RETENTION_S = 7 * 86400.0           # how far back the buckets reach
+DEFAULT_BUDGET_BYTES = 128 * 1024 * 1024
+
+RAW_SLACK = 1.25                    # headroom for poll jitter in the raw ring
+MIN_RAW_CAPACITY = 64
+
+RAW_SAMPLE_BYTES = 8 + 4            # float64 ts + float32 value
+BUCKET_BYTES = 8 + 3 * 4            # float64 ts + float32 min/avg/max
+
+
+def available() -> bool:
+    return np is not None
+
+
+class _Ring:
+    """Fixed-capacity columns; the oldest row is overwritten when full."""
+    def __init__(self, capacity: int, **columns):
+        self.capacity = capacity
+        self.cols = {name: np.empty(capacity, dtype) for name, dtype in columns.items()}
+        self.head = 0           # next row to write
+        self.size = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.cols.values())
+
+    def push(self, **row):
+        i = self.head
+        for name, v in row.items():
+            self.cols[name][i] = v
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def ordered(self, name: str):
+        """Column in chronological order (a copy)."""
+        a = self.cols[name]
+        if self.size < self.capacity:
+            return a[:self.size].copy()
+        return np.concatenate((a[self.head:], a[:self.head]))
+
+
+class Series:
+    def __init__(self, period_s: float = 1.0, raw_window_s: float = RAW_WINDOW_S,
+                 bucket_s: float = BUCKET_S, retention_s: float = RETENTION_S):
+        self.bucket_s = bucket_s
+        self.raw_window_s = raw_window_s
+        raw_cap = max(MIN_RAW_CAPACITY, int(math.ceil(raw_window_s / max(period_s, 1e-3) * RAW_SLACK)))
+        self.raw = _Ring(raw_cap, ts=np.float64, value=np.float32)
+        self.buckets = _Ring(int(math.ceil(retention_s / bucket_s)),
+                             ts=np.float64, min=np.float32, avg=np.float32, max=np.float32)
+        self._open: Optional[list] = None       # [bucket start, min, max, sum, n]
+        self.last: Optional[Tuple[float, float]] = None
+
+    @staticmethod
+    def estimate_bytes(period_s: float, raw_window_s: float = RAW_WINDOW_S,
+                       bucket_s: float = BUCKET_S, retention_s: float = RETENTION_S) -> int:
+        raw_cap = max(MIN_RAW_CAPACITY, int(math.ceil(raw_window_s / max(period_s, 1e-3) * RAW_SLACK)))
+        return raw_cap * RAW_SAMPLE_BYTES + int(math.ceil(retention_s / bucket_s)) * BUCKET_BYTES
+
+    @property
+    def nbytes(self) -> int:
+        return self.raw.nbytes + self.buckets.nbytes
+
+    def append(self, ts: float, value: float):
+        self.raw.push(ts=ts, value=value)
+        self.last = (ts, value)
+        start = ts - ts % self.bucket_s
+        b = self._open
+        if b is not None and b[0] != start:
+            self._close()
+            b = None
+        if b is None:
+            self._open = [start, value, value, value, 1]
+        else:
+            b[1] = min(b[1], value)
+            b[2] = max(b[2], value)
+            b[3] += value
+            b[4] += 1
+
+    def _close(self):
+        start, lo, hi, total, n = self._open
+        self.buckets.push(ts=start, min=lo, avg=total / n, max=hi)
+        self._open = None
+
+    def raw_samples(self, since: Optional[float] = None):
+        """(ts, value) arrays of the raw ring, oldest first."""
+        ts, val = self.raw.ordered("ts"), self.raw.ordered("value")
+        if since is not None:
+            i = np.searchsorted(ts, since)
+            ts, val = ts[i:], val[i:]
+        return ts, val
+
+    def rollup(self, since: Optional[float] = None, until: Optional[float] = None):
+        """(ts, min, avg, max) arrays of closed 1-minute buckets, oldest first."""
+        cols = [self.buckets.ordered(c) for c in ("ts", "min", "avg", "max")]
+        ts = cols[0]
+        lo = 0 if since is None else np.searchsorted(ts, since)
+        hi = len(ts) if until is None else np.searchsorted(ts, until)
+        return tuple(c[lo:hi] for c in cols)
+
+    def view(self, since: Optional[float] = None):
+        """
+        The whole history without overlap: (bucket ts, min, avg, max) for the
+        time before the raw ring starts, then (raw ts, value).
+        """
+        raw_ts, raw_val = self.raw_samples(since)
+        cut = raw_ts[0] if len(raw_ts) else None
+        buckets = self.rollup(since, cut)
+        if cut is not None and len(buckets[0]):
+            # the bucket holding the first raw sample is covered by raw data
+            keep = buckets[0] + self.bucket_s <= cut
+            buckets = tuple(c[keep] for c in buckets)
+        return buckets, (raw_ts, raw_val)
+
+    def samples(self, since: Optional[float] = None):
+        """One (ts, value) series: bucket averages, then raw samples."""
+        (b_ts, _, b_avg, _), (raw_ts, raw_val) = self.view(since)
+        return np.concatenate((b_ts, raw_ts)), np.concatenate((b_avg, raw_val))
+
+
+class History:
+    """
+    Thread-safe set of Series keyed by anything hashable (the GUI uses
+    (bus, unit, addr)). record() is cheap enough to call for every decoded
+    value of every poll cycle.
+    """
+    def __init__(self, budget_bytes: int = DEFAULT_BUDGET_BYTES, raw_window_s: float = RAW_WINDOW_S,
+                 bucket_s: float = BUCKET_S, retention_s: float = RETENTION_S):
+        if np is None:
+            raise RuntimeError("numpy is required for history (pip install numpy)")
+        self.budget_bytes = budget_bytes
+        self.raw_window_s = raw_window_s
+        self.bucket_s = bucket_s
+        self.retention_s = retention_s
+        self.nbytes = 0
+        self.refused = 0                     # series not created because of the budget
+        self._lock = threading.Lock()
+        self._series: Dict[Hashable, Series] = {}
+
+    def record(self, key: Hashable, ts: float, value: float, period_s: float = 1.0) -> bool:
+        """Append one sample; False if the series could not be created within the budget."""
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                need = Series.estimate_bytes(period_s, self.raw_window_s, self.bucket_s, self.retention_s)
+                if self.nbytes + need > self.budget_bytes:
+                    self.refused += 1
+                    return False
+                s = self._series[key] = Series(period_s, self.raw_window_s, self.bucket_s, self.retention_s)
+                self.nbytes += s.nbytes
+            s.append(ts, value)
+            return True
+
+    def keys(self):
+        with self._lock:
+            return list(self._series)
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def __contains__(self, key) -> bool:
+        return key in self._series
+
+    def samples(self, key: Hashable, since: Optional[float] = None):
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                return np.empty(0, np.float64), np.empty(0, np.float32)
+            return s.samples(since)
+
+    def rollup(self, key: Hashable, since: Optional[float] = None):
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                return tuple(np.empty(0, t) for t in (np.float64, np.float32, np.float32, np.float32))
+            return s.rollup(since)
+
+    def view(self, key: Hashable, since: Optional[float] = None):
+        """Series.view() taken under the lock; None for an unknown key."""
+        with self._lock:
+            s = self._series.get(key)
+            return None if s is None else s.view(since)
+
+    def items(self) -> Iterator[Tuple[Hashable, Series]]:
+        with self._lock:
+            snapshot = list(self._series.items())
+        return iter(snapshot)
+
+    def drop(self, key: Hashable):
+        with self._lock:
+            s = self._series.pop(key, None)
+            if s is not None:
+                self.nbytes -= s.nbytes
@@ -0,0 +1,176 @@
+# Coalesced FC03 poll planning for the REON register tables.
+#
+# Instead of one read_holding_registers per Reg, neighbouring registers are
+# merged into as few spans as possible. Each span is read once and sliced
+# back into per-Reg word lists for decoding.
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Modbus spec limit for a single FC03 request
+MAX_READ_WORDS = 125
+
+# How many unused padding registers one extra round-trip is "worth".
+# At 9600 baud a FC03 frame pair plus RTU silences and slave turnaround costs
+# roughly the same as 30+ extra registers in the reply, so gaps up to this
+# size are cheaper to read through than to split on.
+DEFAULT_GAP_COST = 32
+
+# Period for data that only needs reading once per connection
+ONCE = float("inf")
+
+# Retry backoff for a register whose read failed: RETRY_FRACTION of its
+# period (at least RETRY_MIN_S), doubling per consecutive failure up to the
+# period; read-once data is retried up to every RETRY_MAX_S.
+RETRY_FRACTION = 0.25
+RETRY_MIN_S = 0.5
+RETRY_MAX_S = 60.0
+
+
+@dataclass(frozen=True)
+class Span:
+    addr: int
+    count: int
+    regs: Tuple            # the Reg objects covered by this span, by address
+
+    @property
+    def end(self) -> int:
+        return self.addr + self.count
+
+    def slice(self, words: Sequence[int], reg) -> List[int]:
+        off = reg.addr - self.addr
+        return list(words[off:off + reg.words])
+
+    def split(self, words: Sequence[int]) -> List[Tuple[object, List[int]]]:
+        """Return [(reg, reg_words), ...]; regs not fully covered by a short reply are skipped."""
+        out = []
+        for reg in self.regs:
+            w = self.slice(words, reg)
+            if len(w) == reg.words:
+                out.append((reg, w))
+        return out
+
+
+def plan_spans(regs: Iterable, max_words: int = MAX_READ_WORDS,
+               gap_cost: int = DEFAULT_GAP_COST) -> List[Span]:
+    """
+    Merge registers (anything with .addr and .words) into FC03 spans.
+
+    A register joins the current span when the hole in front of it is at most
+    `gap_cost` words and the span stays within `max_words`. Overlapping
+    registers (e.g. Serial # covering 0xC780..0xC78E) share a span for free.
+    Greedy left-to-right packing gives the minimum number of spans for these
+    constraints.
+    """
+    ordered = sorted(regs, key=lambda r: (r.addr, -r.words))
+    spans: List[Span] = []
+    start = end = None
+    members: List = []
+
+    for r in ordered:
+        if r.words > max_words:
+            raise ValueError(f"{getattr(r, 'name', hex(r.addr))}: {r.words} words exceeds {max_words}")
+        r_end = r.addr + r.words
+        if start is not None:
+            gap = r.addr - end
+            new_end = max(end, r_end)
+            if gap <= gap_cost and new_end - start <= max_words:
+                end = new_end
+                members.append(r)
+                continue
+            spans.append(Span(start, end - start, tuple(members)))
+        start, end, members = r.addr, r_end, [r]
+
+    if start is not None:
+        spans.append(Span(start, end - start, tuple(members)))
+    return spans
+
+
+def describe(spans: Sequence[Span]) -> str:
+    return ", ".join(f"0x{s.addr:04X}+{s.count}" for s in spans)
+
+
+class PollScheduler:
+    """
+    Earliest-deadline-first scheduling of periodic register reads.
+
+    `items` is [(reg, period_s), ...] with period ONCE for read-once data.
+    due_spans() packs everything that is due into coalesced spans, lets
+    registers that are nearly due (within `early_fraction` of their period)
+    ride along when they fall into one of those spans anyway, and orders the
+    spans by their earliest deadline. mark_read() schedules a register one
+    period ahead; mark_failed() retries it after a backoff that starts at
+    RETRY_FRACTION of its period and doubles up to the period itself, so a
+    register the slave keeps rejecting does not make every cycle due at once.
+    """
+    def __init__(self, items: Sequence[Tuple[object, float]], max_words: int = MAX_READ_WORDS,
+                 gap_cost: int = DEFAULT_GAP_COST, early_fraction: float = 0.5):
+        self.periods: Dict[object, float] = dict(items)
+        self.max_words = max_words
+        self.gap_cost = gap_cost
+        self.early_fraction = early_fraction
+        self._next: Dict[object, float] = {}
+        self._failures: Dict[object, int] = {}
+        self.reset()
+
+    def reset(self, now: float = 0.0):
+        """Make every register due (e.g. after a reconnect)."""
+        self._next = {r: now for r in self.periods}
+        self._failures = {}
+
+    def next_due(self) -> float:
+        return min(self._next.values(), default=ONCE)
+
+    def due_spans(self, now: float) -> List[Span]:
+        due = {r for r, t in self._next.items() if t <= now}
+        if not due:
+            return []
+        soon = [r for r, t in self._next.items()
+                if r not in due and self.periods[r] != ONCE
+                and t - now <= self.early_fraction * self.periods[r]]
+        spans = [s for s in plan_spans(list(due) + soon, self.max_words, self.gap_cost)
+                 if any(r in due for r in s.regs)]
+        spans.sort(key=lambda s: (min(self._next[r] for r in s.regs), s.addr))
+        return spans
+
+    def mark_read(self, reg, now: float):
+        period = self.periods.get(reg)
+        if period is not None:
+            self._next[reg] = now + period
+            self._failures.pop(reg, None)
+
+    def mark_failed(self, reg, now: float):
+        period = self.periods.get(reg)
+        if period is None:
+            return
+        n = self._failures.get(reg, 0)
+        self._failures[reg] = n + 1
+        cap = RETRY_MAX_S if period == ONCE else period
+        self._next[reg] = now + min(cap, max(RETRY_MIN_S, RETRY_FRACTION * cap) * 2 ** n)
+
+
+# ── Wire cost model ─────────────────────────────────────────────────────────
+# FC03 request: unit, fc, addr(2), count(2), crc(2) = 8 bytes
+# FC03 reply:   unit, fc, byte count, data(2*n), crc(2) = 5 + 2n bytes
+
+def fc03_wire_bytes(count: int) -> int:
+    return 8 + 5 + 2 * count
+
+
+def bits_per_char(bytesize: int = 8, parity: str = "N", stopbits: float = 1) -> float:
+    return 1 + bytesize + (0 if str(parity).upper().startswith("N") else 1) + stopbits
+
+
+def wire_time_s(nbytes: int, baudrate: int, char_bits: float = 10) -> float:
+    return nbytes * char_bits / float(baudrate or 9600)
+
+
+# RTU framing: a frame ends after 3.5 character times of silence. Above
+# 19200 baud the spec fixes the silence at 1.75 ms instead.
+RTU_FIXED_T35_S = 0.00175
+
+
+def rtu_t35_s(baudrate: int, char_bits: float = 11) -> float:
+    if (baudrate or 9600) > 19200:
+        return RTU_FIXED_T35_S
+    return 3.5 * char_bits / float(baudrate or 9600)
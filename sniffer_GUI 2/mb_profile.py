@@ -0,0 +1,315 @@
+# Batched writes of the Machine Configuration settings ("profiles").
+#
+# A profile maps settings from mb_registers.CONFIG_DATA to raw values, e.g.
+#   {"ECO Mode": 1, "gen": 2, "soc_stop": 20}
+# (full names or the short CONFIG_KEYS, as in a saved profile file).
+# Applying one writes each run of adjacent registers with a single FC16 (a
+# lone register with FC06), then reads the config range back with one
+# coalesced FC03 and compares field by field. Firmware that refuses the
+# unmapped words in that range (exception 02) gets the settings read in
+# smaller pieces instead. Writing the five settings one at a time took a
+# write and a read-back each, ten transactions.
+#
+# The REON settings are not adjacent, so by default every field is its own
+# write. bridge_gaps=N lets holes of up to N registers be written through
+# with the values a read just before the write found there, so A02B..A033
+# becomes one FC16. Only use it on firmware that accepts writes to the
+# registers in between.
+#
+# apply_profile() runs on whatever thread owns the client; submit() queues
+# it on an acquisition worker like any other operator write. `record`, if
+# given, is told about every FC03/FC06/FC16 sent, so the worker's diagnostics
+# and session log count each with the function code it used.
+
+import json
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import mb_client
+import mb_plan
+import mb_worker
+from mb_registers import CONFIG_DATA, CONFIG_KEYS, CONFIG_LIMITS, Reg
+
+MAX_WRITE_WORDS = 123       # Modbus spec limit for a single FC16 request
+
+_BY_NAME: Dict[str, Reg] = {r.name.lower(): r for r in CONFIG_DATA}
+_BY_NAME.update(CONFIG_KEYS)
+
+
+def parse_profile(obj: Dict[str, Any]) -> Dict[Reg, int]:
+    """Validate {name or key: value}; raises ValueError naming the bad entry."""
+    if not isinstance(obj, dict):
+        raise ValueError("a profile is a JSON object of setting: value")
+    profile: Dict[Reg, int] = {}
+    for name, value in obj.items():
+        reg = _BY_NAME.get(str(name).strip().lower())
+        if reg is None:
+            raise ValueError(f"unknown setting {name!r} (known: {', '.join(sorted(CONFIG_KEYS))})")
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"{reg.name}: {value!r} is not an integer")
+        lo, hi = CONFIG_LIMITS.get(reg.addr, (0, 0xFFFF))
+        if not lo <= value <= hi:
+            raise ValueError(f"{reg.name}: {value} outside {lo}..{hi}")
+        profile[reg] = value
+    if not profile:
+        raise ValueError("profile is empty")
+    return profile
+
+
+def load_profile(path: str) -> Dict[Reg, int]:
+    with open(path, encoding="utf-8") as f:
+        try:
+            obj = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: {e}") from None
+    return parse_profile(obj)
+
+
+def save_profile(path: str, values: Dict[Reg, int]):
+    keys = {reg: key for key, reg in CONFIG_KEYS.items()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({keys.get(r, r.name): v for r, v in sorted(values.items(), key=lambda i: i[0].addr)},
+                  f, indent=2)
+
+
+def plan_writes(values: Dict[int, int], fill: Optional[Dict[int, int]] = None,
+                max_words: int = MAX_WRITE_WORDS) -> List[Tuple[int, List[int]]]:
+    """
+    Group {address: value} into [(start, words)] runs of consecutive registers.
+    Holes are bridged only where `fill` has a value for every address in them.
+    """
+    fill = fill or {}
+    runs: List[Tuple[int, List[int]]] = []
+    for addr in sorted(values):
+        if runs:
+            start, words = runs[-1]
+            end = start + len(words)
+            hole = range(end, addr)
+            if addr - start < max_words and all(a in fill for a in hole):
+                words.extend(fill[a] for a in hole)
+                words.append(values[addr])
+                continue
+        runs.append((addr, [values[addr]]))
+    return runs
+
+
+@dataclass
+class FieldResult:
+    reg: Reg
+    wanted: int
+    actual: Optional[int]           # read back after the write; None if the read failed
+    before: Optional[int] = None    # only known when the old values were read first
+
+    @property
+    def ok(self) -> bool:
+        return self.actual == self.wanted
+
+    def describe(self) -> str:
+        unit = f" {self.reg.unit}" if self.reg.unit else ""
+        was = f" (was {self.before})" if self.before is not None and self.before != self.wanted else ""
+        if self.ok:
+            return f"{self.reg.name}: {self.wanted}{unit}{was}"
+        got = "not read back" if self.actual is None else f"reads {self.actual}{unit}"
+        return f"{self.reg.name}: wanted {self.wanted}{unit}, {got}{was}"
+
+
+@dataclass
+class ProfileResult:
+    unit: int
+    fields: List[FieldResult] = field(default_factory=list)
+    writes: List[Tuple[int, int]] = field(default_factory=list)    # (start, count) sent
+    reads: int = 0
+    error: str = ""
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and all(f.ok for f in self.fields)
+
+    @property
+    def transactions(self) -> int:
+        return len(self.writes) + self.reads
+
+    def diffs(self) -> List[FieldResult]:
+        return [f for f in self.fields if not f.ok]
+
+    def values(self) -> Dict[int, int]:
+        """{address: value} as read back, for refreshing displays."""
+        return {f.reg.addr: f.actual for f in self.fields if f.actual is not None}
+
+    def as_dict(self) -> dict:
+        return {"unit": self.unit, "ok": self.ok, "error": self.error or None,
+                "writes": len(self.writes), "reads": self.reads,
+                "fields": {f.reg.name: {"wanted": f.wanted, "actual": f.actual} for f in self.fields}}
+
+    def lines(self) -> List[str]:
+        head = "verified" if self.ok else "MISMATCH" if not self.error else "FAILED"
+        out = [f"#{self.unit} profile {head}: {len(self.writes)} write(s) + {self.reads} read(s) "
+               f"in {self.elapsed * 1000:.0f} ms"]
+        if self.error:
+            out.append(f"  {self.error}")
+        out += [f"  {'ok ' if f.ok else '!! '}{f.describe()}" for f in self.fields]
+        return out
+
+
+class _Word:
+    """One register, in the shape mb_plan.plan_spans expects."""
+    __slots__ = ("addr", "words")
+
+    def __init__(self, addr: int):
+        self.addr, self.words = addr, 1
+
+
+def read_spans(addrs, gap_cost: int = mb_plan.MAX_READ_WORDS) -> List[mb_plan.Span]:
+    """The FC03s covering `addrs`: one read whenever they fit in 125 words."""
+    return mb_plan.plan_spans([_Word(a) for a in set(addrs)], gap_cost=gap_cost)
+
+
+def _call(record, fc: int, addr: int, count: int, fn, *args):
+    """fn(*args) -> (result, err), reported to record(fc, addr, count, t0, t_done, err)."""
+    t0 = time.monotonic()
+    result, err = fn(*args)
+    if record is not None:
+        failed = result is None or result is False
+        record(fc, addr, count, t0, time.monotonic(), err if failed else None)
+    return result, err
+
+
+def read_config(client, unit: int, addrs=None, pause_s: float = 0.0,
+                record=None) -> Tuple[Optional[Dict[int, int]], str]:
+    """
+    Read the config registers (default: all of CONFIG_DATA): ({address: word}, "")
+    or (None, reason). Registers the slave refuses are left out of the dict.
+    """
+    words, err, _ = _read_words(client, unit, addrs or [r.addr for r in CONFIG_DATA], pause_s, record)
+    return words, err
+
+
+def _read_words(client, unit: int, addrs, pause_s: float,
+                record=None) -> Tuple[Optional[Dict[int, int]], str, int]:
+    """
+    read_config plus the number of FC03s sent. The coalesced span also covers
+    the unmapped words between settings; firmware that answers that with an
+    exception gets each run of adjacent settings read on its own, and a run it
+    still refuses one register at a time (like the worker's _read_span).
+    """
+    wanted = set(addrs)
+    words: Dict[int, int] = {}
+    reads = 0
+    refused = ""
+
+    def attempt(start: int, count: int):
+        """None once stored; the Failure if the slave refused; raises _Lost if it did not answer."""
+        nonlocal reads
+        if reads and pause_s:
+            time.sleep(pause_s)
+        reads += 1
+        got, err = _call(record, 3, start, count, mb_client.read_holding, client, start, count, unit)
+        if got is not None:
+            words.update((a, w) for a, w in zip(range(start, start + len(got)), got) if a in wanted)
+            return None
+        if mb_client.failure_kind(err) != mb_client.EXCEPTION_RESPONSE:
+            raise _Lost(err)
+        return err
+
+    def fetch(start: int, count: int) -> str:
+        err = attempt(start, count)
+        if err is None:
+            return ""
+        members = [a for a in sorted(wanted) if start <= a < start + count]
+        runs = read_spans(members, gap_cost=0)
+        if len(runs) > 1:
+            parts = [(run.addr, run.count) for run in runs]
+        elif count > 1:
+            parts = [(a, 1) for a in members]
+        else:
+            return err
+        return next((e for e in [fetch(*p) for p in parts] if e), "")
+
+    try:
+        for span in read_spans(wanted):
+            refused = fetch(span.addr, span.count) or refused
+    except _Lost as lost:
+        return None, lost.args[0], reads
+    if not words and refused:
+        return None, refused, reads
+    return words, "", reads
+
+
+class _Lost(Exception):
+    """A config read got no reply (or a client error): give up on the rest."""
+
+
+def apply_profile(client, unit: int, profile: Dict[Reg, int], bridge_gaps: int = 0,
+                  pause_s: float = 0.0, record=None) -> ProfileResult:
+    """Write `profile` to one slave and verify it; never raises for bus errors."""
+    t0 = time.monotonic()
+    result = ProfileResult(unit)
+    values = {reg.addr: value for reg, value in profile.items()}
+
+    def pause():
+        if pause_s:
+            time.sleep(pause_s)
+
+    before: Dict[int, int] = {}
+    if bridge_gaps > 0:
+        holes = _holes(values, bridge_gaps)
+        got, err, reads = _read_words(client, unit, list(values) + holes, pause_s, record)
+        result.reads += reads
+        pause()
+        if got is None:
+            result.error = err
+        else:
+            before = got
+
+    if not result.error:
+        for start, words in plan_writes(values, {a: before[a] for a in _holes(values, bridge_gaps)
+                                                 if a in before}):
+            if len(words) == 1:
+                ok, err = _call(record, 6, start, 1, mb_client.write_register, client, start, words[0], unit)
+            else:
+                ok, err = _call(record, 16, start, len(words), mb_client.write_registers,
+                                client, start, words, unit)
+            result.writes.append((start, len(words)))
+            pause()
+            if not ok:
+                result.error = err
+                break
+
+    # read back even after a refused write, so the report shows what did land;
+    # a slave that did not answer at all is not asked again
+    got = {}
+    if mb_client.failure_kind(result.error) != mb_client.NO_REPLY:
+        got, err, reads = _read_words(client, unit, list(values), pause_s, record)
+        result.reads += reads
+        if got is None:
+            result.error = result.error or f"read-back failed: {err}"
+            got = {}
+    result.fields = [FieldResult(r, profile[r], got.get(r.addr), before.get(r.addr))
+                     for r in sorted(profile, key=lambda r: r.addr)]
+    result.elapsed = time.monotonic() - t0
+    return result
+
+
+def _holes(values: Dict[int, int], max_gap: int) -> List[int]:
+    """Addresses in the gaps of at most `max_gap` registers between written ones."""
+    addrs = sorted(values)
+    return [h for a, b in zip(addrs, addrs[1:]) if b - a - 1 <= max_gap for h in range(a + 1, b)]
+
+
+def submit(worker: mb_worker.AcquisitionWorker, profile: Dict[Reg, int], unit: Optional[int] = None,
+           bridge_gaps: int = 0, deadline_s: Optional[float] = None) -> Future:
+    """Queue apply_profile on the worker that owns the slave's bus; Future[ProfileResult]."""
+    unit = unit or worker.unit
+
+    def fn(client):
+        result = apply_profile(client, unit, profile, bridge_gaps, pause_s=worker.timing.gap_s,
+                               record=lambda *tx: worker.record(unit, *tx))
+        if worker.journal is not None:
+            worker.journal.event("profile", bus=worker.bus, **result.as_dict())
+        return result
+    # fc=0: each write and read is reported on its own, not the batch as one FC16
+    return worker.submit(fn, mb_worker.PRIO_WRITE, deadline_s, unit=unit,
+                         addr=min(r.addr for r in profile))
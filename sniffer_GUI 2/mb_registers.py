@@ -0,0 +1,166 @@
+# REON inverter register map, shared by the GUI and the headless daemon.
+#
+# Nothing in here (or in what it imports) touches wx, so mb_daemon can poll,
+# decode and export with exactly the tables the GUI shows.
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import mb_decode
+import mb_plan
+
+
+@dataclass(frozen=True)
+class Reg:
+    name: str
+    addr: int
+    words: int
+    codec: str      # ascii | u16 | s16 | u32 | s32
+    scale: float
+    unit: str
+    period: Optional[float] = None   # poll period (s); None => the group's period
+
+@dataclass(frozen=True)
+class Block:
+    """A schedulable register range that is not a decoded Reg."""
+    name: str
+    addr: int
+    words: int
+
+
+# Active alarm block: 8x16 bits at 0x75A5 => alarms 1..128,
+# one detail word per alarm starting at 0x9A4C.
+ALARM_BITMAP_ADDR = 0x75A5
+ALARM_BITMAP_WORDS = 8
+ALARM_DETAIL_BASE = 0x9A4C
+ALARM_BLOCK = Block("Active alarms", ALARM_BITMAP_ADDR, ALARM_BITMAP_WORDS)
+
+DEVICE_DATA: List[Reg] = [
+    Reg("Serial #",         0xC780, 15, "ascii", 1,     ""),
+    Reg("Inverter SN",      0xC78F, 10, "ascii", 1,     ""),
+    Reg("Production Date",  0xC7A0,  4, "ascii", 1,     ""),
+    Reg("Firmware Version", 0xC783,  1, "u16",   1,     ""),
+    Reg("HW Version",       0xC784,  1, "u16",   1,     ""),
+    Reg("Model Number",     0xC785,  1, "u16",   1,     ""),
+    Reg("Manufacturer",     0xC786,  1, "u16",   1,     ""),
+]
+
+RUNTIME_DATA: List[Reg] = [
+    Reg("AC Input Voltage",    0x756A, 1, "u16",  0.1,   "V"),
+    Reg("AC Input Current",    0x756B, 1, "s16",  0.1,   "A"),
+    Reg("AC Input Power",      0x7571, 1, "s16",  1,     "VA"),
+    Reg("Output Active Power", 0x755E, 1, "u16",  1,     "W"),
+    Reg("PV1 Input Power",     0x7540, 1, "u16",  1,     "W"),
+    Reg("PV2 Input Power",     0x753D, 1, "u16",  1,     "W"),
+    Reg("Battery Voltage",     0x7530, 1, "u16",  0.1,   "V"),
+    Reg("Battery SOC",         0x7532, 1, "u16",  1,     "%"),
+    Reg("Output Frequency",    0x754A, 1, "u16",  0.01,  "Hz"),
+    Reg("Device Temperature",  0x7579, 1, "s16",  0.1,   "°C"),
+]
+
+SUMMARY_DATA: List[Reg] = [
+    Reg("Line Charge Total",        0xCB61, 2, "u32", 0.0001, "kWh"),
+    Reg("PV Generation Total",      0xCB56, 2, "u32", 0.0001, "kWh"),
+    Reg("Load Consumption Total",   0xCB58, 2, "u32", 0.0001, "kWh"),
+    Reg("Battery Charge Total",     0xCB52, 2, "u32", 0.0001, "kWh"),
+    Reg("Battery Discharge Total",  0xCB54, 2, "u32", 0.0001, "kWh"),
+    Reg("From Grid To Load",        0xCB63, 2, "u32", 0.0001, "kWh"),
+    Reg("Operation Hours",          0xCBB0, 1, "u16", 1,      "h"),
+]
+
+# Poll periods per group (s). DEVICE data is identity info read once per connect.
+DEVICE_PERIOD_S  = mb_plan.ONCE
+RUNTIME_PERIOD_S = 1.0
+SUMMARY_PERIOD_S = 60.0
+ALARM_PERIOD_S   = RUNTIME_PERIOD_S
+
+def _with_period(regs: List[Reg], default: float):
+    return [(r, r.period if r.period is not None else default) for r in regs]
+
+POLL_SCHEDULE = (
+    _with_period(DEVICE_DATA, DEVICE_PERIOD_S)
+    + _with_period(RUNTIME_DATA, RUNTIME_PERIOD_S)
+    + _with_period(SUMMARY_DATA, SUMMARY_PERIOD_S)
+    + [(ALARM_BLOCK, ALARM_PERIOD_S)]
+)
+
+POLL_PERIOD_S: Dict[int, float] = {item.addr: period for item, period in POLL_SCHEDULE}
+
+# Cached values count as fresh for two poll periods (device data: for the whole connection)
+CACHE_TTL_S: Dict[int, float] = {addr: 2 * period for addr, period in POLL_PERIOD_S.items()}
+
+ALL_REGS: Dict[int, Reg] = {r.addr: r for r in DEVICE_DATA + RUNTIME_DATA + SUMMARY_DATA}
+REG_BY_NAME: Dict[str, Reg] = {r.name: r for r in DEVICE_DATA + RUNTIME_DATA + SUMMARY_DATA}
+mb_decode.compile_table(ALL_REGS.values())
+
+# Machine Configuration settings (read/write). They are not polled: the config
+# page reads them on demand and mb_profile writes them as a batch.
+CONFIG_DATA: List[Reg] = [
+    Reg("Line Range",        0xA02B, 1, "u16", 1, ""),     # 0:UPS 1:APL 2:GEN
+    Reg("ECO Mode",          0xA02D, 1, "u16", 1, ""),     # 0:OFF 1:ON
+    Reg("Buzzer Mute",       0xA033, 1, "u16", 1, ""),     # 0:OFF 1:ON
+    Reg("Low Shutdown SOC",  0xA09B, 1, "u16", 1, "%"),
+    Reg("Full SOC Judgment", 0xA09D, 1, "u16", 1, "%"),
+]
+CONFIG_LIMITS: Dict[int, Tuple[int, int]] = {
+    0xA02B: (0, 2), 0xA02D: (0, 1), 0xA033: (0, 1), 0xA09B: (0, 100), 0xA09D: (0, 100),
+}
+# Short names used by the config page and in profile files
+CONFIG_KEYS: Dict[str, Reg] = dict(zip(("gen", "eco", "mute", "soc_stop", "soc_full"), CONFIG_DATA))
+
+
+# Alarm descriptions (partial)
+FAULT_DESC: Dict[int, str] = {
+    1: "Battery under voltage warning",
+    2: "Battery under voltage protection ",
+    3: "Average battery discharge current over current protection",
+    4: "Instantaneous battery discharge over current protection",
+    5: "Battery not connected ",
+    6: "Battery over voltage ",
+    7: "BMS low battery alarm",
+    8: "BMS low battery protection",
+    9: "Bypass overload protection",
+    10: "Battery output overload protection",
+    11: "Battery inverter output short circuit",
+    12: "The AC output of the battery inverter over circuit",
+    13: "The DC component of the battery inverter voltage is abnormal",
+    14: "Bus over voltage software sampling protection",
+    15: "Bus over voltage hardware sampling protection",
+    16: "Bus under voltage protection",
+    17: "Bus short circuit protection",
+    18: "The PV input voltage is over voltage",
+    20: "PV over current protection",
+    22: "The PV heat sink is overheated",
+    23: "The AC heat sink is overheated.",
+    24: "The temperature of the main transformer is overheated",
+    25: "Ac input relay short circuit",
+    27: "Fan Failure",
+    30: "Type detection error",
+    33: "Parallel control can communication is faulty",
+    34: "Parallel control can communication is faulty",
+    35: "Parallel mode is faulty ",
+    36: "Parallel current sharing fault",
+    37: "Parallel ID setting error",
+    38: "Inconsistent Battery in parallel mode",
+    39: "Inconsistent AC input source in parallel mode",
+    40: "The parallel mode synchronization fails",
+    41: "Inconsistent system firmware version in parallel mode",
+    42: "The parallel communication cable is faulty",
+    43: "Serial number error",
+    49: "BMS communication error",
+    50: "BMS other alarm",
+    51: "BMS battery over temperature",
+    52: "BMS battery over current",
+    53: "BMS battery over voltage",
+    54: "BMS battery low voltage",
+    55: "BMS battery low temperature",
+    56: "PD communication error",
+    58: "BMS pack number mismatch",
+}
+
+
+def alarm_text(alarm_id: int, detail: Optional[int] = None) -> str:
+    label = FAULT_DESC.get(alarm_id, f"Alarm {alarm_id}")
+    if detail:
+        label += f" (detail={detail})"
+    return f"[{alarm_id:02d}] {label}"
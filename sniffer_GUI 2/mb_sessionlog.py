@@ -0,0 +1,298 @@
+# Structured session log: one JSON object per line (JSONL).
+#
+# The acquisition workers hand every transaction and poll cycle to a shared
+# SessionLog (like mb_diag), and the GUI/daemon add operator events. A
+# producer only appends a tuple to a bounded list under a lock; a
+# background thread wakes every FLUSH_S (or once BATCH records are
+# waiting), turns the batch into JSON and writes it with one call. If the
+# writer falls behind by more than MAX_PENDING records, new ones are
+# dropped and counted instead of blocking or growing.
+#
+# Records ("t" is the kind, "ts" epoch seconds):
+#   segment   first line of every file (schema, sequence number)
+#   session   start/stop and whatever the app passes along
+#   tx        one Modbus transaction: bus, unit, fc, addr, n, ms, outcome
+#   poll      one poll cycle: timing, status and the decoded values that
+#             changed since that slave's previous cycle ("full": true when
+#             all of them are there, which is the first cycle in a file)
+#   alarm     alarms raised/cleared on a slave, plus the full "active" list
+#             (the first one for a slave in each file raises all of them)
+#   <other>   anything passed to event(), e.g. "profile"
+#   dropped   records lost to an overflowing queue
+#
+# Files rotate when they reach max_bytes or max_age_s; closed segments are
+# compressed with gzip (or zstd when the optional zstandard package is
+# installed) on the writer thread, and beyond `keep` closed segments the
+# oldest this log wrote are deleted.
+
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional
+
+import mb_decode
+import mb_diag
+from mb_registers import ALL_REGS, alarm_text
+
+SCHEMA = 1
+FLUSH_S = 1.0                   # longest a record waits before it is written
+BATCH = 500                     # ... unless this many are waiting
+MAX_PENDING = 100000            # beyond this, records are dropped (and counted)
+MAX_BYTES = 16 * 1024 * 1024    # rotate at this size ...
+MAX_AGE_S = 3600.0              # ... or this age
+COMPRESSIONS = ("gzip", "zstd", None)
+
+_UNSEEN = object()
+
+try:
+    import zstandard
+except ImportError:             # zstd is optional; gzip always works
+    zstandard = None
+
+
+def compressed_suffix(compression: Optional[str]) -> str:
+    return {"gzip": ".gz", "zstd": ".zst"}.get(compression, "")
+
+
+def _compress(path: str, compression: Optional[str]) -> str:
+    if compression is None:
+        return path
+    dst = path + compressed_suffix(compression)
+    with open(path, "rb") as src:
+        if compression == "zstd":
+            with open(dst, "wb") as out:
+                zstandard.ZstdCompressor(level=6).copy_stream(src, out)
+        else:
+            with gzip.open(dst, "wb", compresslevel=6) as out:
+                shutil.copyfileobj(src, out, 1024 * 1024)
+    os.remove(path)
+    return dst
+
+
+class SessionLog(threading.Thread):
+    """Background JSONL writer; every producer method is safe from any thread."""
+    def __init__(self, directory: str, prefix: str = "session", max_bytes: int = MAX_BYTES,
+                 max_age_s: float = MAX_AGE_S, compression: Optional[str] = "gzip",
+                 keep: Optional[int] = None, flush_s: float = FLUSH_S, batch: int = BATCH,
+                 max_pending: int = MAX_PENDING):
+        super().__init__(name=f"session-log {prefix}", daemon=True)
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {COMPRESSIONS}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package (pip install zstandard)")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.compression = compression
+        self.keep = keep
+        self.flush_s = flush_s
+        self.batch = batch
+        self.max_pending = max_pending
+
+        self._cv = threading.Condition()
+        self._pending: List[tuple] = []
+        self._closing = False
+        self.dropped = 0
+        self.written = 0
+        self.segments = 0
+        self.error: Optional[str] = None    # last write/compress failure
+        self.cpu_s = 0.0                    # writer thread CPU time, for the overhead budget
+
+        self._file = None
+        self.path: Optional[str] = None
+        self._opened = 0.0
+        self._size = 0
+        self._closed_segments: List[str] = []
+        self._values: Dict[tuple, Dict[str, object]] = {}      # (bus, unit) -> last values this segment
+        self._alarms: Dict[tuple, List[int]] = {}
+        self._reported_drops = 0
+        self.start()
+
+    # ── producers (any thread) ───────────────────────────────────────────
+    def _put(self, item: tuple):
+        with self._cv:
+            if self._closing or len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append(item)
+            if len(self._pending) >= self.batch:
+                self._cv.notify()
+
+    def event(self, kind: str, **fields):
+        """A free-form record; fields must be JSON-serializable."""
+        self._put(("event", time.time(), kind, fields))
+
+    def transaction(self, bus: str, unit: int, fc: int, addr: Optional[int], count: int,
+                    elapsed_s: float, err=None):
+        self._put(("tx", time.time(), bus, unit, fc, addr, count, elapsed_s, err))
+
+    def poll(self, result):
+        """An mb_worker.PollResult; it is read later, on the writer thread."""
+        self._put(("poll", result))
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Write what is queued, close (and compress) the last segment."""
+        with self._cv:
+            self._closing = True
+            self._cv.notify()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def stats(self) -> dict:
+        return {"path": self.path, "written": self.written, "dropped": self.dropped,
+                "segments": self.segments, "cpu_s": round(self.cpu_s, 3), "error": self.error}
+
+    # ── writer thread ────────────────────────────────────────────────────
+    def run(self):
+        while True:
+            with self._cv:
+                if len(self._pending) < self.batch and not self._closing:
+                    self._cv.wait(self.flush_s)
+                items, self._pending = self._pending, []
+                closing = self._closing
+            t0 = time.thread_time()
+            if items:
+                self._write(items)
+            if self._file is not None and (closing or self._size >= self.max_bytes
+                                           or time.time() - self._opened >= self.max_age_s):
+                self._rotate()
+            self.cpu_s += time.thread_time() - t0
+            if closing:
+                return
+
+    def _write(self, items: List[tuple]):
+        if self._file is None:
+            self._open()
+            if self._file is None:
+                self.dropped += len(items)
+                return
+        lines = []
+        for item in items:
+            try:
+                lines.extend(self._records(item))
+            except Exception as e:          # a bad record must not stop the log
+                self.error = f"record skipped: {e}"
+        if self.dropped != self._reported_drops:
+            lines.append(self._dump({"ts": round(time.time(), 3), "t": "dropped",
+                                     "n": self.dropped - self._reported_drops}))
+            self._reported_drops = self.dropped
+        data = "".join(lines).encode("utf-8")     # max_bytes counts bytes, not characters
+        try:
+            self._file.write(data)
+            self._file.flush()
+        except OSError as e:
+            self.error = str(e)
+            self.dropped += len(items)
+            return
+        self._size += len(data)
+        self.written += len(lines)
+
+    @staticmethod
+    def _dump(rec: dict) -> str:
+        return json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def _records(self, item: tuple) -> List[str]:
+        kind = item[0]
+        if kind == "poll":
+            return self._poll_records(item[1])
+        if kind == "tx":
+            _, ts, bus, unit, fc, addr, count, elapsed_s, err = item
+            outcome, code = mb_diag.classify(err)
+            rec = {"ts": round(ts, 3), "t": "tx", "bus": bus, "unit": unit, "fc": fc, "addr": addr,
+                   "n": count, "ms": round(elapsed_s * 1000, 2), "outcome": outcome}
+            if err:
+                rec["err"] = str(err)
+            if code is not None:
+                rec["code"] = code
+            return [self._dump(rec)]
+        _, ts, name, fields = item
+        return [self._dump({"ts": round(ts, 3), "t": name, **fields})]
+
+    def _poll_records(self, r) -> List[str]:
+        key = (r.bus, r.unit)
+        values = {ALL_REGS[a].name: mb_decode.scaled(ALL_REGS[a], v)
+                  for a, (v, _) in r.values.items() if a in ALL_REGS}
+        last = self._values.get(key)
+        rec = {"ts": round(r.started, 3), "t": "poll", "bus": r.bus, "unit": r.unit,
+               "ms": round(r.elapsed * 1000, 1), "reads": r.reads, "failed": r.failed,
+               "status": r.slave.status if r.slave else ""}
+        if r.retries:
+            rec["retries"] = r.retries
+        if last is None:
+            rec["full"] = True
+            rec["values"] = values
+            self._values[key] = dict(values)
+        else:
+            rec["values"] = {k: v for k, v in values.items() if last.get(k, _UNSEEN) != v}
+            last.update(values)
+        if r.missing:
+            rec["missing"] = [ALL_REGS[a].name for a in r.missing if a in ALL_REGS]
+        if r.log:
+            rec["errors"] = list(r.log)
+        out = [self._dump(rec)]
+        if r.alarm_ids is not None and r.alarm_ids != self._alarms.get(key, []):
+            before = set(self._alarms.get(key, []))
+            out.append(self._dump({
+                "ts": rec["ts"], "t": "alarm", "bus": r.bus, "unit": r.unit,
+                "raised": [{"id": a, "text": alarm_text(a, r.alarm_details.get(a)),
+                            "detail": r.alarm_details.get(a)} for a in r.alarm_ids if a not in before],
+                "cleared": [{"id": a, "text": alarm_text(a)} for a in sorted(before - set(r.alarm_ids))],
+                "active": list(r.alarm_ids)}))
+            self._alarms[key] = list(r.alarm_ids)
+        return out
+
+    def _open(self):
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        base = os.path.join(self.directory, f"{self.prefix}-{stamp}")
+        path, n = base + ".jsonl", 1
+        while os.path.exists(path) or os.path.exists(path + compressed_suffix(self.compression)):
+            n += 1
+            path = f"{base}-{n}.jsonl"
+        try:
+            self._file = open(path, "wb")
+        except OSError as e:
+            self.error = str(e)
+            return
+        self.path = path
+        self._opened = time.time()
+        self._size = 0
+        self._values.clear()                # every segment starts with full values
+        self._alarms.clear()                # ... and the alarms active on each slave
+        self.segments += 1
+        head = self._dump({"ts": round(self._opened, 3), "t": "segment", "schema": SCHEMA,
+                           "seq": self.segments, "prefix": self.prefix}).encode("utf-8")
+        try:
+            self._file.write(head)
+        except OSError as e:
+            self.error = str(e)
+            self._close_file()
+            return
+        self._size += len(head)
+
+    def _close_file(self):
+        try:
+            self._file.close()
+        except OSError as e:
+            self.error = str(e)
+        self._file = None
+
+    def _rotate(self):
+        self._close_file()
+        path = self.path
+        try:
+            self._closed_segments.append(_compress(path, self.compression))
+        except (OSError, RuntimeError) as e:
+            self.error = f"compress {path}: {e}"
+            self._closed_segments.append(path)
+        if self.keep is not None:
+            while len(self._closed_segments) > self.keep:
+                old = self._closed_segments.pop(0)
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+# Virtual REON inverter(s) for hardware-free testing of the polling stack.
+#
+#   python mb_sim.py --pty --units 1-8 --latency 20 --drop 0.01
+#       -> prints a /dev/pts/N path; point the GUI or mb_daemon --port at it
+#   python mb_sim.py --tcp 5020 --units 1-32 --corrupt 0.005
+#   python mb_sim.py --rtu-over-tcp 5021 --alarms 2
+#
+# Serves FC03/FC06/FC16 for every unit ID given: the register map from
+# mb_registers.ALL_REGS (identity strings, drifting run-time values, growing
+# energy counters), the 0x75A5 alarm bitmap with its 0x9A4C detail words and
+# the A0xx configuration block. Replies are delayed by a configurable slave
+# latency (plus the frame's wire time at --baud on a pty), and a fraction of
+# them can be dropped or sent with a broken CRC. Unknown unit IDs stay silent
+# like on a real RS-485 segment.
+#
+# The Modbus slave side is a small RTU/MBAP codec of its own rather than a
+# pymodbus server, so latency, drops and corruption can be injected per
+# frame the same way on every pymodbus version (and without pymodbus).
+
+import argparse
+import os
+import random
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import mb_fleet
+import mb_plan
+from mb_registers import ALARM_BITMAP_ADDR, ALARM_BITMAP_WORDS, ALARM_DETAIL_BASE, ALL_REGS
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_ADDRESS = 2
+ILLEGAL_VALUE = 3
+
+MAX_ALARM_ID = 16 * ALARM_BITMAP_WORDS
+CONFIG_FIRST, CONFIG_LAST = 0xA000, 0xA0FF
+CONFIG_DEFAULTS = {
+    0xA02B: 0,      # line range: 0 UPS, 2 generator
+    0xA02D: 0,      # ECO mode
+    0xA033: 0,      # buzzer mute
+    0xA09B: 20,     # battery SOC low shutdown (%)
+    0xA09D: 100,    # battery full SOC judgment (%)
+}
+
+# name -> (typical engineering value, relative random-walk step per tick)
+PROFILE = {
+    "AC Input Voltage": (230.0, 0.005),
+    "AC Input Current": (2.1, 0.05),
+    "AC Input Power": (480, 0.05),
+    "Output Active Power": (350, 0.05),
+    "PV1 Input Power": (1200, 0.03),
+    "PV2 Input Power": (900, 0.03),
+    "Battery Voltage": (52.4, 0.002),
+    "Battery SOC": (76, 0.01),
+    "Output Frequency": (50.0, 0.0005),
+    "Device Temperature": (35.5, 0.01),
+    "Line Charge Total": (812.5, 0.0),
+    "PV Generation Total": (15234.2, 0.0),
+    "Load Consumption Total": (9876.1, 0.0),
+    "Battery Charge Total": (4321.0, 0.0),
+    "Battery Discharge Total": (4012.7, 0.0),
+    "From Grid To Load": (2345.6, 0.0),
+    "Operation Hours": (8123, 0.0),
+    "Firmware Version": (1203, 0.0),
+    "HW Version": (101, 0.0),
+    "Model Number": (5048, 0.0),
+    "Manufacturer": (1, 0.0),
+}
+COUNTER_GROWTH = 0.0005     # energy counters, in engineering units per tick
+
+
+# ── Modbus RTU helpers ──────────────────────────────────────────────────────
+
+def _crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data: bytes) -> int:
+    crc = 0xFFFF
+    for b in data:
+        crc = (crc >> 8) ^ _CRC_TABLE[(crc ^ b) & 0xFF]
+    return crc
+
+
+def with_crc(frame: bytes) -> bytes:
+    return frame + struct.pack("<H", crc16(frame))
+
+
+def rtu_request_length(buf: bytes) -> Optional[int]:
+    """Length of the RTU request at the start of buf, None until it is known."""
+    if len(buf) < 2:
+        return None
+    fc = buf[1]
+    if fc == 16:
+        return 9 + buf[6] if len(buf) >= 7 else None
+    return 8                # FC03, FC06 and anything unsupported we answer with an exception
+
+
+# ── Slaves ──────────────────────────────────────────────────────────────────
+
+class SimSlave:
+    """One inverter's register space."""
+    def __init__(self, unit: int, rng: random.Random, strict: bool = False):
+        self.unit = unit
+        self.rng = rng
+        self.strict = strict
+        self.regs: Dict[int, int] = {}
+        self.live: Dict[int, float] = {}        # addr -> current engineering value
+        self.alarms: Dict[int, int] = {}        # alarm id -> detail word
+        for addr in range(CONFIG_FIRST, CONFIG_LAST + 1):
+            self.regs[addr] = CONFIG_DEFAULTS.get(addr, 0)
+        for w in range(ALARM_BITMAP_WORDS):
+            self.regs[ALARM_BITMAP_ADDR + w] = 0
+        for a in range(MAX_ALARM_ID):
+            self.regs[ALARM_DETAIL_BASE + a] = 0
+        for reg in ALL_REGS.values():
+            if reg.codec == "ascii":
+                self._put_ascii(reg, self._identity(reg.name))
+            else:
+                base, step = PROFILE.get(reg.name, (0, 0.0))
+                self.live[reg.addr] = base * (1 + 0.02 * rng.uniform(-1, 1)) if step else base
+                self._put_number(reg, self.live[reg.addr])
+
+    def _identity(self, name: str) -> str:
+        if name == "Production Date":
+            return "20260115"
+        if name == "Inverter SN":
+            return f"REONSIM{self.unit:03d}"
+        return f"SIM-{self.unit:04d}-{name[:3].upper()}"
+
+    def _put_ascii(self, reg, text: str):
+        raw = text.encode("ascii")[:2 * reg.words].ljust(2 * reg.words, b"\x00")
+        for i in range(reg.words):
+            self.regs[reg.addr + i] = (raw[2 * i] << 8) | raw[2 * i + 1]
+
+    def _put_number(self, reg, value: float):
+        raw = int(round(value / reg.scale))
+        bits = 16 * reg.words
+        raw &= (1 << bits) - 1          # two's complement for the signed codecs
+        for i in range(reg.words):
+            self.regs[reg.addr + i] = (raw >> (16 * (reg.words - 1 - i))) & 0xFFFF
+
+    def tick(self, alarm_rate: float = 0.0):
+        """Advance the simulated plant one step (called about once a second)."""
+        for addr, value in self.live.items():
+            reg = ALL_REGS[addr]
+            base, step = PROFILE.get(reg.name, (0, 0.0))
+            if reg.codec == "u32":
+                value += COUNTER_GROWTH * (1 + self.rng.random())
+            elif step:
+                value += base * step * self.rng.uniform(-1, 1)
+                value += 0.05 * (base - value)          # stay near the typical value
+            self.live[addr] = value
+            self._put_number(reg, value)
+        if alarm_rate and self.rng.random() < alarm_rate:
+            alarm_id = self.rng.randrange(1, MAX_ALARM_ID + 1)
+            if alarm_id in self.alarms:
+                del self.alarms[alarm_id]
+            else:
+                self.alarms[alarm_id] = self.rng.randrange(1, 0x100)
+            self._put_alarms()
+
+    def _put_alarms(self):
+        for w in range(ALARM_BITMAP_WORDS):
+            self.regs[ALARM_BITMAP_ADDR + w] = 0
+        for a in range(1, MAX_ALARM_ID + 1):
+            detail = self.alarms.get(a, 0)
+            self.regs[ALARM_DETAIL_BASE + a - 1] = detail
+            if a in self.alarms:
+                self.regs[ALARM_BITMAP_ADDR + (a - 1) // 16] |= 1 << ((a - 1) % 16)
+
+    def read(self, addr: int, count: int):
+        """Words, or an exception code."""
+        if not 1 <= count <= mb_plan.MAX_READ_WORDS:
+            return ILLEGAL_VALUE
+        if self.strict and any(a not in self.regs for a in range(addr, addr + count)):
+            return ILLEGAL_ADDRESS
+        return [self.regs.get(a, 0) for a in range(addr, addr + count)]
+
+    def write(self, addr: int, values: Sequence[int]) -> int:
+        """0 on success, or an exception code; only the config block is writable."""
+        if not all(CONFIG_FIRST <= a <= CONFIG_LAST for a in range(addr, addr + len(values))):
+            return ILLEGAL_ADDRESS
+        for i, v in enumerate(values):
+            self.regs[addr + i] = v & 0xFFFF
+        return 0
+
+
+# ── Simulator ───────────────────────────────────────────────────────────────
+
+class Simulator:
+    """
+    A set of SimSlaves behind RTU (pty, RTU-over-TCP) and Modbus TCP
+    transports. latency_s/jitter_s shape the slave turnaround, drop_rate and
+    corrupt_rate the fraction of replies that are swallowed or sent with a
+    bad CRC. `baud` (pty only) also delays each exchange by its wire time.
+    """
+    TICK_S = 1.0
+
+    def __init__(self, units: Sequence[int], latency_s: float = 0.02, jitter_s: float = 0.005,
+                 drop_rate: float = 0.0, corrupt_rate: float = 0.0, strict: bool = False,
+                 alarm_rate: float = 0.0, baud: int = 9600, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.slaves = {u: SimSlave(u, self.rng, strict) for u in units}
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.alarm_rate = alarm_rate
+        self.baud = baud
+        self.stats = {"requests": 0, "replies": 0, "dropped": 0, "corrupted": 0, "exceptions": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._closers = []
+        self._spawn(self._ticker, "sim-tick")
+
+    # ── protocol ─────────────────────────────────────────────────────────
+    def handle_pdu(self, unit: int, pdu: bytes) -> Optional[bytes]:
+        """Reply PDU for a request PDU, or None when the slave stays silent."""
+        slave = self.slaves.get(unit)
+        if slave is None or not pdu:
+            return None
+        fc = pdu[0]
+        with self._lock:
+            self.stats["requests"] += 1
+            if fc == 3 and len(pdu) >= 5:
+                addr, count = struct.unpack(">HH", pdu[1:5])
+                words = slave.read(addr, count)
+                if isinstance(words, list):
+                    return struct.pack(f">BB{len(words)}H", fc, 2 * len(words), *words)
+                code = words
+            elif fc == 6 and len(pdu) >= 5:
+                addr, value = struct.unpack(">HH", pdu[1:5])
+                code = slave.write(addr, [value])
+                if not code:
+                    return pdu[:5]
+            elif fc == 16 and len(pdu) >= 6:
+                addr, count, nbytes = struct.unpack(">HHB", pdu[1:6])
+                if nbytes != 2 * count or len(pdu) < 6 + nbytes:
+                    code = ILLEGAL_VALUE
+                else:
+                    code = slave.write(addr, struct.unpack(f">{count}H", pdu[6:6 + nbytes]))
+                    if not code:
+                        return pdu[:5]
+            else:
+                code = ILLEGAL_FUNCTION
+            self.stats["exceptions"] += 1
+            return bytes((fc | 0x80, code))
+
+    def _fate(self) -> str:
+        r = self.rng.random()
+        if r < self.drop_rate:
+            return "dropped"
+        if r < self.drop_rate + self.corrupt_rate:
+            return "corrupted"
+        return "replies"
+
+    def _delay(self, nbytes: int = 0):
+        delay = max(0.0, self.rng.gauss(self.latency_s, self.jitter_s)) if self.jitter_s else self.latency_s
+        if self.baud and nbytes:
+            delay += mb_plan.wire_time_s(nbytes, self.baud, 10)
+        if delay:
+            time.sleep(delay)
+
+    def handle_rtu(self, frame: bytes, emulate_wire: bool = False) -> Optional[bytes]:
+        """Full RTU request frame in, reply frame (or None) out, with latency and faults applied."""
+        if len(frame) < 4 or crc16(frame[:-2]) != struct.unpack("<H", frame[-2:])[0]:
+            return None                     # a real slave ignores frames with a bad CRC
+        reply = self.handle_pdu(frame[0], frame[1:-2])
+        if reply is None:
+            return None
+        out = with_crc(bytes((frame[0],)) + reply)
+        fate = self._fate()
+        with self._lock:
+            self.stats[fate] += 1
+        self._delay(len(frame) + len(out) if emulate_wire else 0)
+        if fate == "dropped":
+            return None
+        if fate == "corrupted":
+            out = out[:-1] + bytes((out[-1] ^ 0xFF,))
+        return out
+
+    # ── transports ───────────────────────────────────────────────────────
+    def serve_pty(self, link: Optional[str] = None) -> str:
+        """Serve RTU on a new pseudo-terminal; returns the path clients open."""
+        import tty
+        master, slave_fd = os.openpty()
+        tty.setraw(slave_fd)
+        path = os.ttyname(slave_fd)
+        if link:
+            if os.path.islink(link):
+                os.unlink(link)
+            os.symlink(path, link)
+        # keep our end of the slave open so the pty survives clients reconnecting
+        self._closers += [lambda: os.close(master), lambda: os.close(slave_fd)]
+        self._spawn(lambda: self._rtu_loop(lambda n: os.read(master, n),
+                                           lambda b: os.write(master, b), master, True), "sim-pty")
+        return path
+
+    def serve_tcp(self, port: int, host: str = "127.0.0.1", rtu: bool = False) -> int:
+        """Serve Modbus TCP (MBAP), or RTU frames over TCP with rtu=True; returns the bound port."""
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind((host, port))
+        srv.listen(16)
+        self._closers.append(srv.close)
+        self._spawn(lambda: self._accept_loop(srv, rtu), "sim-tcp")
+        return srv.getsockname()[1]
+
+    def _accept_loop(self, srv: socket.socket, rtu: bool):
+        while not self._stop.is_set():
+            r, _, _ = select.select([srv], [], [], 0.2)
+            if not r:
+                continue
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if rtu:
+                target = lambda c=conn: self._rtu_loop(c.recv, c.sendall, c, False, c.close)
+            else:
+                target = lambda c=conn: self._mbap_loop(c)
+            self._spawn(target, "sim-conn")
+
+    def _rtu_loop(self, read, write, fd, emulate_wire: bool, on_close=None):
+        buf = b""
+        while not self._stop.is_set():
+            r, _, _ = select.select([fd], [], [], 0.2)
+            if not r:
+                buf = b""                   # silence ends any partial frame
+                continue
+            try:
+                chunk = read(512)
+            except OSError:
+                chunk = b""
+            if not chunk:
+                break
+            buf += chunk
+            while True:
+                n = rtu_request_length(buf)
+                if n is None or len(buf) < n:
+                    break
+                frame, buf = buf[:n], buf[n:]
+                reply = self.handle_rtu(frame, emulate_wire)
+                if reply is None and crc16(frame[:-2]) != struct.unpack("<H", frame[-2:])[0]:
+                    buf = b""               # lost sync; wait for the next silence
+                    break
+                if reply is not None:
+                    try:
+                        write(reply)
+                    except OSError:
+                        return
+        if on_close:
+            on_close()
+
+    def _mbap_loop(self, conn: socket.socket):
+        def recv_exact(n):
+            data = b""
+            while len(data) < n:
+                chunk = conn.recv(n - len(data))
+                if not chunk:
+                    return None
+                data += chunk
+            return data
+
+        try:
+            while not self._stop.is_set():
+                head = recv_exact(7)
+                if head is None:
+                    break
+                tid, proto, length, unit = struct.unpack(">HHHB", head)
+                pdu = recv_exact(length - 1)
+                if pdu is None:
+                    break
+                reply = self.handle_pdu(unit, pdu)
+                if reply is None:
+                    continue
+                fate = self._fate()
+                with self._lock:
+                    self.stats[fate] += 1
+                self._delay()
+                if fate == "dropped":
+                    continue
+                out = struct.pack(">HHHB", tid, proto, len(reply) + 1, unit) + reply
+                if fate == "corrupted":
+                    out = out[:7] + bytes((out[7] ^ 0x40,)) + out[8:]     # mangle the function code
+                conn.sendall(out)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    # ── lifecycle ────────────────────────────────────────────────────────
+    def _spawn(self, target, name: str):
+        t = threading.Thread(target=target, name=name, daemon=True)
+        self._threads.append(t)
+        t.start()
+
+    def _ticker(self):
+        while not self._stop.wait(self.TICK_S):
+            with self._lock:
+                for slave in self.slaves.values():
+                    slave.tick(self.alarm_rate * self.TICK_S / 60.0)
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(1.0)
+        for close in self._closers:
+            try:
+                close()
+            except OSError:
+                pass
+
+    def report(self) -> str:
+        with self._lock:
+            s = dict(self.stats)
+        return (f"{s['requests']} requests, {s['replies']} replies, {s['dropped']} dropped, "
+                f"{s['corrupted']} corrupted, {s['exceptions']} exceptions")
+
+
+class _Reply:
+    """Just enough of a pymodbus response for mb_client."""
+    def __init__(self, registers=None, exception_code=None):
+        self.registers = registers
+        if exception_code is not None:
+            self.exception_code = exception_code
+
+    def isError(self) -> bool:
+        return hasattr(self, "exception_code")
+
+    def __repr__(self):
+        if self.isError():
+            return f"ExceptionResponse(exception_code={self.exception_code})"
+        return f"Reply({self.registers})"
+
+
+class LoopbackClient:
+    """
+    pymodbus-shaped client that hands RTU frames straight to a Simulator, no
+    port in between. The simulator still applies latency, wire time, drops
+    and CRC damage; a lost reply costs `timeout` like on a real line.
+    Used by the benchmarks and anything else that wants the polling stack
+    without pymodbus or a pty.
+    """
+    def __init__(self, sim: Simulator, timeout: float = 1.0):
+        self.sim = sim
+        self.timeout = timeout
+        self.connected = False
+
+    def connect(self) -> bool:
+        self.connected = True
+        return True
+
+    def close(self):
+        self.connected = False
+
+    def _call(self, unit: int, pdu: bytes) -> Optional[bytes]:
+        reply = self.sim.handle_rtu(with_crc(bytes((unit,)) + pdu), emulate_wire=True)
+        if reply is None or crc16(reply[:-2]) != struct.unpack("<H", reply[-2:])[0]:
+            time.sleep(self.timeout)
+            return None
+        return reply[1:-2]
+
+    def _reply(self, pdu: Optional[bytes], registers=None):
+        if pdu is None:
+            return None
+        if pdu[0] & 0x80:
+            return _Reply(exception_code=pdu[1])
+        return _Reply(registers)
+
+    def read_holding_registers(self, address, count=1, slave=1):
+        pdu = self._call(slave, struct.pack(">BHH", 3, address, count))
+        if pdu is not None and not pdu[0] & 0x80:
+            return _Reply(list(struct.unpack(f">{pdu[1] // 2}H", pdu[2:2 + pdu[1]])))
+        return self._reply(pdu)
+
+    def write_register(self, address, value, slave=1):
+        return self._reply(self._call(slave, struct.pack(">BHH", 6, address, value)), [])
+
+    def write_registers(self, address, values, slave=1):
+        values = list(values)
+        pdu = struct.pack(f">BHHB{len(values)}H", 16, address, len(values), 2 * len(values), *values)
+        return self._reply(self._call(slave, pdu), [])
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Simulated REON inverters (Modbus RTU/TCP slaves).")
+    p.add_argument("--pty", action="store_true", help="serve RTU on a pseudo-terminal")
+    p.add_argument("--link", metavar="PATH", help="also symlink the pty to PATH (e.g. /tmp/reon-sim)")
+    p.add_argument("--tcp", type=int, metavar="PORT", help="serve Modbus TCP on PORT")
+    p.add_argument("--rtu-over-tcp", type=int, metavar="PORT", help="serve RTU frames over TCP on PORT")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--units", default="1", help='slave IDs, e.g. "1-8,12"')
+    p.add_argument("--latency", type=float, default=20.0, help="slave turnaround (ms)")
+    p.add_argument("--jitter", type=float, default=5.0, help="turnaround standard deviation (ms)")
+    p.add_argument("--drop", type=float, default=0.0, help="fraction of replies never sent")
+    p.add_argument("--corrupt", type=float, default=0.0, help="fraction of replies with a broken CRC")
+    p.add_argument("--strict", action="store_true",
+                   help="answer reads of unmapped registers with exception 02 instead of zeros")
+    p.add_argument("--alarms", type=float, default=0.0, help="random alarm raise/clear events per minute")
+    p.add_argument("--baud", type=int, default=9600, help="emulated line speed on the pty (0: none)")
+    p.add_argument("--seed", type=int)
+    p.add_argument("--stats-every", type=float, default=10.0, help="print counters every N s (0: never)")
+    args = p.parse_args(argv)
+    if not (args.pty or args.tcp or args.rtu_over_tcp):
+        p.error("choose at least one of --pty, --tcp, --rtu-over-tcp")
+    try:
+        args.unit_ids = mb_fleet.parse_unit_ids(args.units)
+    except ValueError as e:
+        p.error(str(e))
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sim = Simulator(args.unit_ids, args.latency / 1000.0, args.jitter / 1000.0, args.drop, args.corrupt,
+                    args.strict, args.alarms, args.baud, args.seed)
+    units = mb_fleet.format_unit_ids(args.unit_ids)
+    if args.pty:
+        print(f"RTU on {sim.serve_pty(args.link)} (units {units})", flush=True)
+    if args.tcp:
+        print(f"Modbus TCP on {args.host}:{sim.serve_tcp(args.tcp, args.host)} (units {units})", flush=True)
+    if args.rtu_over_tcp:
+        port = sim.serve_tcp(args.rtu_over_tcp, args.host, rtu=True)
+        print(f"RTU over TCP on {args.host}:{port} (units {units})", flush=True)
+    try:
+        while True:
+            time.sleep(args.stats_every or 3600)
+            if args.stats_every:
+                print(sim.report(), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+        print(sim.report(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# Bounded line buffer behind the Terminal View.
+#
+# Status lines are written from anywhere (GUI thread, wx.CallAfter from the
+# workers) and only queued; the view calls flush() from a timer at most
+# FLUSH_HZ times a second, which moves them into a fixed-size ring that a
+# virtual list control reads row by row. Memory stays at `capacity` lines
+# however long the app runs, and an append costs the same on day one as on
+# day thirty. Lines pushed out of the ring can optionally be spilled to a
+# size-rotated log file so nothing is lost.
+#
+# No wx in here; the view is PageTerminalView in seWSNView.
+
+import logging
+import logging.handlers
+import threading
+from typing import List, Optional
+
+DEFAULT_CAPACITY = 20000    # lines kept on screen
+FLUSH_HZ = 10               # view refreshes per second, at most
+SPILL_BYTES = 5 * 1024 * 1024
+SPILL_BACKUPS = 5
+
+
+class TerminalBuffer:
+    """Ring of the last `capacity` complete lines, fed by write(text)."""
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, spill_path: Optional[str] = None,
+                 spill_bytes: int = SPILL_BYTES, spill_backups: int = SPILL_BACKUPS):
+        self.capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._partial = ""                  # text after the last newline written
+        self._ring: List[str] = []
+        self._head = 0                      # index of the oldest line once the ring is full
+        self.evicted = 0                    # lines pushed out of the ring so far
+        self._spill: Optional[logging.Handler] = None
+        if spill_path:
+            self._spill = logging.handlers.RotatingFileHandler(
+                spill_path, maxBytes=spill_bytes, backupCount=spill_backups, encoding="utf-8", delay=True)
+            self._spill.setFormatter(logging.Formatter("%(message)s"))
+
+    # ── any thread ───────────────────────────────────────────────────────
+    def write(self, text: str):
+        """Queue text; like a TextCtrl, a line without "\\n" is continued by the next write."""
+        if not text:
+            return
+        with self._lock:
+            parts = (self._partial + text).split("\n")
+            self._partial = parts.pop()
+            self._pending.extend(parts)
+
+    # ── view thread ──────────────────────────────────────────────────────
+    def flush(self) -> int:
+        """Move queued lines into the ring; returns how many were added."""
+        with self._lock:
+            lines, self._pending = self._pending, []
+        if not lines:
+            return 0
+        if len(lines) >= self.capacity:                 # a burst bigger than the ring
+            self._evict(self._in_order())
+            self._evict(lines[:-self.capacity])
+            self._ring, self._head = lines[-self.capacity:], 0
+            return len(lines)
+        room = self.capacity - len(self._ring)
+        self._ring.extend(lines[:room])
+        for line in lines[room:]:
+            self._evict([self._ring[self._head]])
+            self._ring[self._head] = line
+            self._head = (self._head + 1) % self.capacity
+        return len(lines)
+
+    def _evict(self, lines: List[str]):
+        self.evicted += len(lines)
+        if self._spill is not None:
+            for line in lines:
+                self._spill.emit(logging.makeLogRecord({"msg": line}))
+
+    def _in_order(self) -> List[str]:
+        return self._ring[self._head:] + self._ring[:self._head]
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def __getitem__(self, i: int) -> str:
+        """Line i, oldest first."""
+        n = len(self._ring)
+        if not -n <= i < n:
+            raise IndexError(i)
+        return self._ring[(self._head + i) % n]
+
+    def lines(self, first: int = 0, last: Optional[int] = None) -> List[str]:
+        return self._in_order()[first:last]
+
+    def clear(self):
+        """Drop what is on screen (spilling it first, if spilling)."""
+        self.flush()
+        self._evict(self._in_order())
+        self._ring, self._head = [], 0
+
+    def close(self):
+        self.clear()
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
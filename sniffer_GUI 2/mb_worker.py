@@ -0,0 +1,655 @@
+# Acquisition worker: runs Modbus poll cycles off the GUI thread.
+#
+# The worker is the only thread that touches the client. Poll cycles read
+# whatever the per-slave mb_plan.PollScheduler says is due (registers and the
+# alarm block, coalesced into spans) and hand one PollResult per cycle to a
+# `post` callback (the GUI passes a wx.CallAfter
+# wrapper, so nothing here imports wx). Operator reads and writes are
+# submitted as prioritized requests and answered through futures; they are
+# served between poll transactions, so a write never waits for a full cycle.
+
+import dataclasses
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import mb_client
+import mb_decode
+import mb_fleet
+import mb_plan
+from mb_registers import ALARM_BLOCK, ALARM_DETAIL_BASE, Block
+
+# What every transaction used to sleep regardless of baud rate; FrameTiming
+# reports the bus time saved against it.
+LEGACY_INTER_FRAME_S = 0.02
+
+# Adaptive reply timeouts: once a slave has MIN_LATENCY_SAMPLES answers, a
+# read waits its wire time plus TIMEOUT_P99_FACTOR x the slave's p99
+# turnaround, clamped to [MIN_TIMEOUT_S, the configured timeout]. Lost
+# replies from a slave that is online are retried up to RETRIES times after a
+# jittered, doubling backoff; exception responses are never retried.
+MIN_TIMEOUT_S = 0.05
+TIMEOUT_P99_FACTOR = 3.0
+MIN_LATENCY_SAMPLES = 20
+RETRIES = 2
+RETRY_BACKOFF_S = 0.01
+
+# A cycle is cut short once this many spans in a row got no reply at all
+# (after one when the slave's circuit breaker is open, see mb_fleet); the
+# rest of the cycle is reported missing instead of timing out one by one.
+LOST_SPANS_ABORT = 2
+
+# Request priorities (lower runs first). Poll transactions rank below all of them.
+PRIO_WRITE = 0      # operator writes (ECO/GEN/mute/SOC)
+PRIO_READ = 1       # operator reads (menu items, config page)
+PRIO_POLL = 2
+
+
+def alarm_ids_from_bitmap(words: Sequence[int]) -> List[int]:
+    ids: List[int] = []
+    for w_idx, w in enumerate(words):
+        for bit in range(16):
+            if w & (1 << bit):
+                ids.append(w_idx * 16 + bit + 1)
+    return ids
+
+
+class FrameTiming:
+    """
+    Silence inserted after each transaction: the RTU t3.5 for the line
+    settings plus a turnaround guard for slaves that need a moment before
+    they listen again.
+
+    With auto=True the guard adapts: a failure right after a good reply
+    (the pattern of a slave that was not ready yet) doubles it, and every
+    PROBE_AFTER clean transactions it is halved again, but never below a
+    fraction of the measured slave response latency. Dead slaves (which
+    never answer) do not move it. `fixed_gap_s` disables all of this.
+    """
+    PROBE_AFTER = 50
+    LATENCY_GUARD_FRACTION = 0.1
+    EWMA_ALPHA = 0.1
+
+    def __init__(self, baudrate: int = 9600, bytesize: int = 8, parity: str = "N", stopbits: float = 1,
+                 auto: bool = False, guard_s: float = 0.0005, fixed_gap_s: Optional[float] = None):
+        self.baudrate = baudrate
+        self.char_bits = mb_plan.bits_per_char(bytesize, parity, stopbits)
+        self.t35_s = mb_plan.rtu_t35_s(baudrate, self.char_bits)
+        self.auto = auto
+        self.guard_s = guard_s
+        self.fixed_gap_s = fixed_gap_s
+        self.max_guard_s = LEGACY_INTER_FRAME_S
+        self.latency_s = 0.0            # EWMA of reply time minus wire time
+        self.transactions = 0
+        self.failures = 0
+        self.busy_s = 0.0               # bus time incl. gaps
+        self.gap_total_s = 0.0
+        self._last_ok = False
+        self._streak = 0
+
+    @property
+    def gap_s(self) -> float:
+        if self.fixed_gap_s is not None:
+            return self.fixed_gap_s
+        return self.t35_s + self.guard_s
+
+    def after(self, ok: bool, elapsed_s: float, nbytes: int = 0) -> float:
+        """Record one transaction; returns the silence to keep before the next one."""
+        self.transactions += 1
+        if ok:
+            if nbytes:
+                wire = mb_plan.wire_time_s(nbytes, self.baudrate, self.char_bits)
+                latency = max(0.0, elapsed_s - wire)
+                if self.latency_s:
+                    self.latency_s += self.EWMA_ALPHA * (latency - self.latency_s)
+                else:
+                    self.latency_s = latency
+            self._streak += 1
+            if self.auto and self._streak >= self.PROBE_AFTER:
+                self._streak = 0
+                self.guard_s = max(self.LATENCY_GUARD_FRACTION * self.latency_s, self.guard_s / 2)
+        else:
+            self.failures += 1
+            self._streak = 0
+            if self.auto and self._last_ok:
+                self.guard_s = min(self.max_guard_s, max(2 * self.guard_s, self.t35_s))
+        self._last_ok = ok
+        gap = self.gap_s
+        self.busy_s += elapsed_s + gap
+        self.gap_total_s += gap
+        return gap
+
+    @property
+    def saved_s(self) -> float:
+        return self.transactions * LEGACY_INTER_FRAME_S - self.gap_total_s
+
+    def report(self) -> str:
+        gain = 100.0 * self.saved_s / self.busy_s if self.busy_s else 0.0
+        mode = "fixed" if self.fixed_gap_s is not None else ("auto" if self.auto else "baud-derived")
+        return (f"inter-frame {self.gap_s * 1000:.2f} ms ({mode}; t3.5 {self.t35_s * 1000:.2f} ms"
+                f" + guard {self.guard_s * 1000:.2f} ms), slave latency {self.latency_s * 1000:.1f} ms; "
+                f"{self.transactions} frames, saved {self.saved_s:.2f} s vs fixed "
+                f"{LEGACY_INTER_FRAME_S * 1000:.0f} ms ({gain:+.0f}% throughput)")
+
+
+@dataclass(order=True)
+class _Request:
+    prio: int
+    seq: int
+    fn: Callable[[Any], Any] = field(compare=False)
+    future: Future = field(compare=False)
+    deadline: Optional[float] = field(compare=False)    # time.monotonic() or None
+    fc: int = field(default=0, compare=False)           # function code, for diagnostics
+    unit: int = field(default=0, compare=False)
+    addr: Optional[int] = field(default=None, compare=False)
+
+
+@dataclass
+class PollResult:
+    unit: int
+    started: float                                     # time.time() at cycle start
+    elapsed: float = 0.0                               # seconds spent on the bus
+    words: Dict[int, List[int]] = field(default_factory=dict)      # reg.addr -> raw words
+    values: Dict[int, tuple] = field(default_factory=dict)         # reg.addr -> (value, text)
+    missing: List[int] = field(default_factory=list)   # reg.addr attempted but not answered
+    alarm_ids: Optional[List[int]] = None              # None if the bitmap read failed
+    alarm_details: Dict[int, int] = field(default_factory=dict)    # alarm id -> detail word
+    log: List[str] = field(default_factory=list)       # terminal lines (errors, fallbacks)
+    reads: int = 0
+    failed: int = 0
+    no_reply: int = 0                                  # failed reads that got no answer at all
+    retries: int = 0                                   # repeated transactions after lost replies
+    wire_bytes: int = 0                                # FC03 request+reply bytes that got answers
+    slave: Optional[mb_fleet.SlaveState] = None        # snapshot after this cycle
+    bus: str = ""                                      # port/adapter the slave sits on
+
+
+class AcquisitionWorker(threading.Thread):
+    """
+    Background poller and request executor for one client and its slaves.
+
+    `schedule` is [(reg_or_block, period_s), ...]; every slave gets its own
+    PollScheduler over it. With auto-poll on (set_auto(True)) the worker
+    sleeps until the earliest deadline of any slave, then visits the slaves
+    in deadline order and reads only what is due, posting one PollResult per
+    slave. poll_once() reads the full table from every slave regardless of
+    deadlines. submit()/read_holding()/write_register() queue a request and
+    return a concurrent.futures.Future; requests without an explicit unit
+    go to `unit` (the first slave unless changed). stop() ends the thread
+    and cancels whatever is still queued.
+    """
+    def __init__(self, client, schedule: Sequence, units: Sequence[int],
+                 post: Callable[[PollResult], None], gap_cost: int = mb_plan.DEFAULT_GAP_COST,
+                 timing: Optional[FrameTiming] = None, bus: str = "",
+                 timeout_s: float = 1.0, adaptive_timeout: bool = True, retries: int = RETRIES,
+                 diag=None, group: str = "", journal=None):
+        super().__init__(name=f"modbus-acquisition {bus}".strip(), daemon=True)
+        self.client = client
+        self.bus = bus
+        self.group = group or bus           # lanes to one gateway share a group
+        self.schedule = list(schedule)
+        self.gap_cost = gap_cost
+        self.plan = mb_plan.plan_spans([item for item, _ in self.schedule], gap_cost=gap_cost)
+        self.units: List[int] = []
+        self.slaves: Dict[int, mb_fleet.SlaveState] = {}
+        self.schedulers: Dict[int, mb_plan.PollScheduler] = {}
+        self._alarm_details: Dict[int, Dict[int, int]] = {}    # unit -> alarm id -> detail word
+        self.unit = units[0]
+        self.set_units(units)
+        self.post = post
+        self.timing = timing or FrameTiming()
+        self.timeout_s = timeout_s
+        self.adaptive_timeout = adaptive_timeout
+        self.retries = retries
+        self._client_timeout = timeout_s
+        self._last_error: Optional[str] = None
+        self.diag = diag                    # mb_diag.Diagnostics, or None
+        self.journal = journal              # mb_sessionlog.SessionLog, or None
+
+        self._cv = threading.Condition()
+        self._halt = False
+        self._once = False
+        self._auto = False
+        self._queue: List[_Request] = []
+        self._seq = itertools.count()
+
+    # ── control (any thread) ─────────────────────────────────────────────
+    def poll_once(self):
+        with self._cv:
+            self._once = True
+            self._cv.notify()
+
+    def set_auto(self, on: bool):
+        with self._cv:
+            self._auto = bool(on)
+            self._cv.notify()
+
+    @property
+    def auto(self) -> bool:
+        return self._auto
+
+    def set_units(self, units: Sequence[int]):
+        """Change the polled slaves; takes effect from the next pass."""
+        units = list(units)
+        for u in units:
+            self.slaves.setdefault(u, mb_fleet.SlaveState(u))
+            if u not in self.schedulers:
+                self.schedulers[u] = mb_plan.PollScheduler(self.schedule, gap_cost=self.gap_cost)
+        self.units = units
+        if self.unit not in units and units:
+            self.unit = units[0]
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._cv:
+            self._halt = True
+            pending, self._queue = self._queue, []
+            self._cv.notify()
+        for req in pending:
+            req.future.cancel()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    # ── requests (any thread) ────────────────────────────────────────────
+    def submit(self, fn: Callable[[Any], Any], prio: int = PRIO_READ,
+               deadline_s: Optional[float] = None, fc: int = 0, unit: Optional[int] = None,
+               addr: Optional[int] = None) -> Future:
+        """
+        Queue fn(client) to run on the worker thread. The future is failed
+        with RequestExpired if it is still queued `deadline_s` seconds from
+        now; cancelling it before it starts keeps it off the bus.
+        """
+        fut: Future = Future()
+        deadline = time.monotonic() + deadline_s if deadline_s is not None else None
+        with self._cv:
+            if self._halt:
+                fut.cancel()
+                return fut
+            heapq.heappush(self._queue, _Request(prio, next(self._seq), fn, fut, deadline, fc,
+                                                 unit or self.unit, addr))
+            self._cv.notify()
+        return fut
+
+    def read_holding(self, address: int, count: int = 1, unit: Optional[int] = None,
+                     prio: int = PRIO_READ, deadline_s: Optional[float] = None) -> Future:
+        """Future resolving to the register list, or raising ModbusRequestError."""
+        unit = unit or self.unit
+
+        def fn(client):
+            words, err = mb_client.read_holding(client, address, count, unit)
+            if words is None:
+                raise mb_client.ModbusRequestError(err)
+            return words
+        return self.submit(fn, prio, deadline_s, fc=3, unit=unit, addr=address)
+
+    def write_register(self, address: int, value: int, unit: Optional[int] = None,
+                       prio: int = PRIO_WRITE, deadline_s: Optional[float] = None) -> Future:
+        """Future resolving to True, or raising ModbusRequestError."""
+        unit = unit or self.unit
+
+        def fn(client):
+            ok, err = mb_client.write_register(client, address, value, unit)
+            if not ok:
+                raise mb_client.ModbusRequestError(err)
+            return True
+        return self.submit(fn, prio, deadline_s, fc=6, unit=unit, addr=address)
+
+    # ── thread body ──────────────────────────────────────────────────────
+    def _next_due(self, unit: int) -> float:
+        state = self.slaves[unit]
+        if state.breaker_open:
+            return state.next_probe
+        return self.schedulers[unit].next_due()
+
+    def _earliest_due(self) -> float:
+        return min((self._next_due(u) for u in self.units), default=mb_plan.ONCE)
+
+    def _due(self) -> bool:
+        return self._auto and time.monotonic() >= self._earliest_due()
+
+    def _wait_s(self) -> Optional[float]:
+        if not self._auto:
+            return None
+        earliest = self._earliest_due()
+        if earliest == mb_plan.ONCE:
+            return None
+        return max(0.0, earliest - time.monotonic())
+
+    def run(self):
+        while True:
+            with self._cv:
+                while not (self._halt or self._queue or self._once or self._due()):
+                    self._cv.wait(self._wait_s())
+                if self._halt:
+                    return
+                req = heapq.heappop(self._queue) if self._queue else None
+                full = self._once and req is None
+                if full:
+                    self._once = False
+            if req is not None:
+                self._execute(req)
+                continue
+            for unit in sorted(self.units, key=self._next_due):
+                if self._halt:
+                    break
+                if full:
+                    spans = self.plan
+                    self._alarm_details.pop(unit, None)     # explicit refresh re-reads details
+                elif self.slaves[unit].breaker_open:
+                    if time.monotonic() < self.slaves[unit].next_probe:
+                        continue
+                    spans = self.schedulers[unit].due_spans(time.monotonic()) or self.plan
+                else:
+                    spans = self.schedulers[unit].due_spans(time.monotonic())
+                    if not spans:
+                        continue
+                result = self.poll_cycle(unit, spans)
+                if not self._halt:
+                    self.post(result)
+
+    def _execute(self, req: _Request):
+        if not req.future.set_running_or_notify_cancel():
+            return                                  # cancelled while queued
+        if req.deadline is not None and time.monotonic() > req.deadline:
+            req.future.set_exception(mb_client.RequestExpired("request expired before it was sent"))
+            return
+        self._set_timeout(self.timeout_s)
+        t0 = time.monotonic()
+        err = None
+        try:
+            value = req.fn(self.client)
+        except Exception as e:
+            ok = False
+            err = e.args[0] if e.args and isinstance(e.args[0], str) else mb_client.Failure(str(e))
+            req.future.set_exception(e)
+        else:
+            ok = True
+            req.future.set_result(value)
+        t_done = time.monotonic()
+        if req.fc:
+            self.record(req.unit, req.fc, req.addr, len(value) if ok and isinstance(value, list) else int(ok),
+                        t0, t_done, err)
+        gap = self.timing.after(ok, t_done - t0)
+        if gap:
+            time.sleep(gap)
+
+    def record(self, unit: int, fc: int, addr: Optional[int], count: int, t0: float, t_done: float,
+               err=None):
+        """
+        Report one transaction to diagnostics and the session log. Requests
+        that send several (submit() with fc=0) call this once per transaction.
+        """
+        if self.diag is not None:
+            self.diag.transaction(self.bus, unit, fc, t0, t_done, t_done, err, count)
+        if self.journal is not None:
+            self.journal.transaction(self.bus, unit, fc, addr, count, t_done - t0, err)
+
+    def _serve_requests(self):
+        """Run queued operator requests ahead of the next poll transaction."""
+        while True:
+            with self._cv:
+                if self._halt or not self._queue or self._queue[0].prio >= PRIO_POLL:
+                    return
+                req = heapq.heappop(self._queue)
+            self._execute(req)
+
+    # ── one cycle ────────────────────────────────────────────────────────
+    def _set_timeout(self, timeout_s: float):
+        # only touch the port when it really changes; pyserial reconfigures on every set
+        if abs(timeout_s - self._client_timeout) > 0.1 * self._client_timeout:
+            mb_client.set_timeout(self.client, timeout_s)
+            self._client_timeout = timeout_s
+
+    def timeout_for(self, unit: int, nbytes: int) -> float:
+        state = self.slaves.get(unit)
+        if (not self.adaptive_timeout or state is None
+                or state.latency.samples < MIN_LATENCY_SAMPLES):
+            return self.timeout_s
+        wire = mb_plan.wire_time_s(nbytes, self.timing.baudrate, self.timing.char_bits)
+        return min(self.timeout_s, max(MIN_TIMEOUT_S, wire + TIMEOUT_P99_FACTOR * state.latency_p99_s))
+
+    def latency_report(self) -> List[str]:
+        """One line per slave: turnaround EWMA/p99, the timeout in use and retries so far."""
+        nbytes = mb_plan.fc03_wire_bytes(mb_plan.MAX_READ_WORDS)
+        return [f"#{u}: latency {s.latency_ewma_s * 1000:.1f} ms (p99 {s.latency_p99_s * 1000:.1f} ms, "
+                f"{s.latency.samples} replies), timeout {self.timeout_for(u, nbytes) * 1000:.0f} ms, "
+                f"{s.retries} retries"
+                for u, s in sorted(self.slaves.items()) if u in self.units]
+
+    def _read(self, result: PollResult, address: int, count: int) -> Optional[List[int]]:
+        self._serve_requests()
+        result.reads += 1
+        nbytes = mb_plan.fc03_wire_bytes(count)
+        state = self.slaves.setdefault(result.unit, mb_fleet.SlaveState(result.unit))
+        attempt = 0
+        while True:
+            self._set_timeout(self.timeout_for(result.unit, nbytes))
+            t0 = time.monotonic()
+            try:
+                words, err = mb_client.read_holding(self.client, address, count, result.unit)
+            except Exception as e:
+                words, err = None, mb_client.Failure(f"Read error at 0x{address:04X}: {e}")
+            t_done = time.monotonic()
+            elapsed = t_done - t0
+            gap = self.timing.after(words is not None, elapsed, nbytes)
+            wire = mb_plan.wire_time_s(nbytes, self.timing.baudrate, self.timing.char_bits)
+            if self.diag is not None:
+                reply = mb_plan.wire_time_s(nbytes - 8, self.timing.baudrate, self.timing.char_bits)
+                self.diag.transaction(self.bus, result.unit, 3, t0, t_done - reply if words else t_done,
+                                      t_done, err if words is None else None, count, wire)
+            if self.journal is not None:
+                self.journal.transaction(self.bus, result.unit, 3, address, count, elapsed,
+                                         err if words is None else None)
+            if words is not None:
+                state.record_latency(max(0.0, elapsed - wire))
+                result.wire_bytes += nbytes
+            retry = (words is None and attempt < self.retries and not self._halt
+                     and state.consecutive_failures == 0
+                     and mb_client.failure_kind(err) == mb_client.NO_REPLY)
+            if not retry:
+                break
+            attempt += 1
+            result.retries += 1
+            backoff = RETRY_BACKOFF_S * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            time.sleep(gap + backoff)
+        if words is None:
+            self._last_error = err
+            result.failed += 1
+            if mb_client.failure_kind(err) == mb_client.NO_REPLY:
+                result.no_reply += 1
+            result.log.append(err if not attempt else f"{err} (after {attempt} retries)")
+        elif gap:
+            time.sleep(gap)
+        return words
+
+    def _store(self, result: PollResult, sched: mb_plan.PollScheduler, now: float, reg, words,
+               decoded=None):
+        sched.mark_read(reg, now)
+        if reg is ALARM_BLOCK:
+            self._read_alarm_details(result, words)
+        else:
+            result.words[reg.addr] = words
+            if not isinstance(reg, Block):
+                result.values[reg.addr] = decoded or mb_decode.decode(reg, words)
+
+    def _read_span(self, result: PollResult, sched: mb_plan.PollScheduler, now: float,
+                   span: mb_plan.Span):
+        words = self._read(result, span.addr, span.count)
+        if words is not None:
+            for reg, reg_words, value, text in mb_decode.decode_span(span, words):
+                self._store(result, sched, now, reg, reg_words, (value, text))
+            return
+        # The slave may reject padding words it does not implement; fall back
+        # to one read per register so a single hole does not blank the span.
+        # A lost reply says nothing about the layout, so that only marks the
+        # span missing (retrying it register by register would multiply the
+        # timeouts).
+        if (len(span.regs) == 1
+                or mb_client.failure_kind(self._last_error) != mb_client.EXCEPTION_RESPONSE):
+            for reg in span.regs:
+                self._missing(result, sched, now, reg)
+            return
+        for reg in span.regs:
+            if self._halt:
+                return
+            reg_words = self._read(result, reg.addr, reg.words)
+            if reg_words is not None:
+                self._store(result, sched, now, reg, reg_words)
+            else:
+                self._missing(result, sched, now, reg)
+
+    def _missing(self, result: PollResult, sched: mb_plan.PollScheduler, now: float, reg):
+        sched.mark_failed(reg, now)
+        if not isinstance(reg, Block):
+            result.missing.append(reg.addr)
+
+    def _read_alarm_details(self, result: PollResult, bitmap: List[int]):
+        """
+        Diff the bitmap against the previous cycle and read detail words only
+        for alarms that just appeared, coalesced into as few spans as the
+        detail table allows. Details of alarms that stay active are carried
+        over; a detail that failed to read is retried on the next cycle.
+        """
+        result.alarm_ids = alarm_ids_from_bitmap(bitmap)
+        known = self._alarm_details.get(result.unit, {})
+        details = {a: known[a] for a in result.alarm_ids if a in known}
+        new = [Block(f"Alarm {a} detail", ALARM_DETAIL_BASE + (a - 1), 1)
+               for a in result.alarm_ids if a not in known]
+        for span in mb_plan.plan_spans(new, gap_cost=self.gap_cost):
+            if self._halt:
+                break
+            words = self._read(result, span.addr, span.count)
+            if words is None:
+                continue
+            for block, w in span.split(words):
+                details[block.addr - ALARM_DETAIL_BASE + 1] = w[0]
+        self._alarm_details[result.unit] = details
+        result.alarm_details = dict(details)
+
+    def poll_cycle(self, unit: int, spans: Sequence[mb_plan.Span]) -> PollResult:
+        result = PollResult(unit=unit, started=time.time(), bus=self.bus)
+        sched = self.schedulers[unit]
+        state = self.slaves.setdefault(unit, mb_fleet.SlaveState(unit))
+        abort_after = 1 if state.breaker_open else LOST_SPANS_ABORT
+        t0 = time.monotonic()
+        for i, span in enumerate(spans):
+            if self._halt:
+                break
+            self._read_span(result, sched, t0, span)
+            if (result.failed >= abort_after and result.failed == result.reads
+                    and mb_client.failure_kind(self._last_error) == mb_client.NO_REPLY):
+                for rest in spans[i + 1:]:
+                    for reg in rest.regs:
+                        self._missing(result, sched, t0, reg)
+                break
+        result.elapsed = time.monotonic() - t0
+        if self.diag is not None:
+            self.diag.cycle(self.bus, unit, result.elapsed)
+        result.slave = dataclasses.replace(state.update(result))
+        if self.journal is not None:
+            self.journal.poll(result)
+        return result
+
+
+def split_units(units: Sequence[int], lanes: int) -> List[List[int]]:
+    """Deal unit IDs round-robin over `lanes` workers."""
+    return [list(units[i::lanes]) for i in range(lanes)]
+
+
+class WorkerPool:
+    """
+    One AcquisitionWorker per bus (USB-RS485 adapter), keyed by port name.
+
+    Buses run in parallel threads; pyserial releases the GIL while it waits
+    on the port, so total throughput scales with the number of adapters.
+    All workers post into the same sink, which keeps one merged view.
+
+    A Modbus TCP gateway can be driven by several workers ("lanes", one
+    connection each) that share a group; set_units() deals the slave IDs
+    out across the lanes of a group so each slave is polled by one of them.
+    Clients are handed back to mb_client.POOL when a worker goes away.
+    """
+    def __init__(self):
+        self._workers: Dict[str, AcquisitionWorker] = {}
+
+    def add(self, worker: AcquisitionWorker) -> AcquisitionWorker:
+        self.remove(worker.bus)
+        self._workers[worker.bus] = worker
+        worker.start()
+        return worker
+
+    def get(self, bus: str) -> Optional[AcquisitionWorker]:
+        return self._workers.get(bus)
+
+    def remove(self, bus: str, timeout: Optional[float] = 2.0):
+        """Stop the bus worker and close its client."""
+        worker = self._workers.pop(bus, None)
+        if worker:
+            worker.stop(timeout)
+            mb_client.POOL.release(worker.client)
+
+    def remove_group(self, group: str, timeout: Optional[float] = 2.0):
+        self.retire(self.detach_group(group), timeout)
+
+    def detach_group(self, group: str) -> List[AcquisitionWorker]:
+        """
+        Take a group's workers out of the pool and signal them to stop without
+        waiting; pass them to retire() on a thread that may block.
+        """
+        workers = [w for w in self._workers.values() if w.group == group]
+        for w in workers:
+            del self._workers[w.bus]
+            w.stop(0)
+        return workers
+
+    @staticmethod
+    def retire(workers: Sequence[AcquisitionWorker], timeout: Optional[float] = 2.0):
+        """Wait for detached workers to end and hand their clients back."""
+        for w in workers:
+            w.stop(timeout)
+            mb_client.POOL.release(w.client)
+
+    def stop_all(self, timeout: Optional[float] = 2.0):
+        workers, self._workers = list(self._workers.values()), {}
+        for w in workers:                   # signal everyone first, then wait
+            w.stop(0)
+        for w in workers:
+            w.stop(timeout)
+            mb_client.POOL.release(w.client)
+
+    def buses(self) -> List[str]:
+        return list(self._workers)
+
+    def poll_once(self):
+        for w in self._workers.values():
+            w.poll_once()
+
+    def set_auto(self, on: bool):
+        for w in self._workers.values():
+            w.set_auto(on)
+
+    def set_units(self, units: Sequence[int]):
+        groups: Dict[str, List[AcquisitionWorker]] = {}
+        for w in self._workers.values():
+            groups.setdefault(w.group, []).append(w)
+        for lanes in groups.values():
+            lanes.sort(key=lambda w: w.bus)
+            for w, share in zip(lanes, split_units(units, len(lanes))):
+                w.set_units(share)
+
+    def keys(self) -> List[tuple]:
+        """(bus, unit) for every slave polled by any worker."""
+        return [(w.bus, u) for w in self._workers.values() for u in w.units]
+
+    def __len__(self):
+        return len(self._workers)
+
+    def __contains__(self, bus):
+        return bus in self._workers
+
+    def __iter__(self):
+        return iter(list(self._workers.values()))
@@ -1,82 +1,86 @@
 #!/usr/bin/env python3
 # REON Modbus GUI (Modbus RTU)
 # pip install wxPython pymodbus pyserial openpyxl
+# optional: numpy (in-memory history)
+#
+# Startup only imports what the first window needs. pymodbus, numpy/history,
+# openpyxl, list_ports and the serial settings dialog are imported on first
+# use, and the Machine Configuration page is built when its tab is opened.
+# `python seWSNView.py --profile-startup` prints where the time goes.
+
+import time
+_STARTUP_MARKS = [("start", time.perf_counter())]
 
 import os
-import wx
-import wxSerialConfigDialog
-import serial
+import sys
 import threading
-import time
-from dataclasses import dataclass
+from concurrent.futures import Future
 from typing import List, Dict, Optional
-from serial.tools import list_ports
-
-import pymodbus
-from pymodbus.client import ModbusSerialClient
 
-try:
-    from pymodbus import FramerType      # pymodbus 3.x
-    _HAS_FRAMER = True
-    _FRAMER_KW = "framer=FramerType.RTU"
-except Exception:
-    _HAS_FRAMER = False                   # pymodbus 2.x
-    _FRAMER_KW = 'method="rtu"'
+import wx
+_STARTUP_MARKS.append(("import wx", time.perf_counter()))
+import serial
+_STARTUP_MARKS.append(("import pyserial", time.perf_counter()))
+
+import mb_cache
+import mb_client
+import mb_decode
+import mb_diag
+import mb_fleet
+import mb_plan
+import mb_profile
+import mb_registers
+import mb_sessionlog
+import mb_terminal
+import mb_worker
+from mb_registers import (
+    Reg, DEVICE_DATA, RUNTIME_DATA, SUMMARY_DATA, POLL_SCHEDULE, POLL_PERIOD_S, CACHE_TTL_S,
+    ALL_REGS, REG_BY_NAME, RUNTIME_PERIOD_S, SUMMARY_PERIOD_S,
+)
+_STARTUP_MARKS.append(("import mb_* core + register tables", time.perf_counter()))
+
+STARTUP_TARGET_S = 0.5
+
+
+def _startup_mark(label: str):
+    _STARTUP_MARKS.append((label, time.perf_counter()))
+
+
+def startup_report() -> str:
+    t0 = _STARTUP_MARKS[0][1]
+    lines = ["Startup profile (ms since seWSNView began importing):"]
+    prev = t0
+    for label, t in _STARTUP_MARKS[1:]:
+        lines.append(f"  {label:<40} {1000 * (t - t0):8.1f}  (+{1000 * (t - prev):.1f})")
+        prev = t
+    total = prev - t0
+    verdict = "OK" if total <= STARTUP_TARGET_S else "over"
+    lines.append(f"  target {1000 * STARTUP_TARGET_S:.0f} ms: {verdict}")
+    heavy = ("pymodbus", "numpy", "openpyxl", "pyarrow", "wxSerialConfigDialog", "serial.tools.list_ports")
+    loaded = [m for m in heavy if m in sys.modules]
+    lines.append(f"  deferred modules already loaded: {', '.join(loaded) or 'none'}")
+    return "\n".join(lines) + "\n"
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Register table (decoders, scales, units)
-
-@dataclass(frozen=True)
-class Reg:
-    name: str
-    addr: int
-    words: int
-    codec: str      # ascii | u16 | s16 | u32 | s32
-    scale: float
-    unit: str
-
-DEVICE_DATA: List[Reg] = [
-    Reg("Serial #",         0xC780, 15, "ascii", 1,     ""),
-    Reg("Inverter SN",      0xC78F, 10, "ascii", 1,     ""),
-    Reg("Production Date",  0xC7A0,  4, "ascii", 1,     ""),
-    Reg("Firmware Version", 0xC783,  1, "u16",   1,     ""),
-    Reg("HW Version",       0xC784,  1, "u16",   1,     ""),
-    Reg("Model Number",     0xC785,  1, "u16",   1,     ""),
-    Reg("Manufacturer",     0xC786,  1, "u16",   1,     ""),
-]
+# Register tables live in mb_registers (shared with the headless mb_daemon)
 
-RUNTIME_DATA: List[Reg] = [
-    Reg("AC Input Voltage",    0x756A, 1, "u16",  0.1,   "V"),
-    Reg("AC Input Current",    0x756B, 1, "s16",  0.1,   "A"),
-    Reg("AC Input Power",      0x7571, 1, "s16",  1,     "VA"),
-    Reg("Output Active Power", 0x755E, 1, "u16",  1,     "W"),
-    Reg("PV1 Input Power",     0x7540, 1, "u16",  1,     "W"),
-    Reg("PV2 Input Power",     0x753D, 1, "u16",  1,     "W"),
-    Reg("Battery Voltage",     0x7530, 1, "u16",  0.1,   "V"),
-    Reg("Battery SOC",         0x7532, 1, "u16",  1,     "%"),
-    Reg("Output Frequency",    0x754A, 1, "u16",  0.01,  "Hz"),
-    Reg("Device Temperature",  0x7579, 1, "s16",  0.1,   "°C"),
+# Per-slave values shown in the fleet table
+FLEET_COLUMNS: List[str] = [
+    "Battery Voltage", "Battery SOC", "PV1 Input Power", "PV2 Input Power",
+    "Output Active Power", "AC Input Voltage", "Device Temperature",
 ]
 
-SUMMARY_DATA: List[Reg] = [
-    Reg("Line Charge Total",        0xCB61, 2, "u32", 0.0001, "kWh"),
-    Reg("PV Generation Total",      0xCB56, 2, "u32", 0.0001, "kWh"),
-    Reg("Load Consumption Total",   0xCB58, 2, "u32", 0.0001, "kWh"),
-    Reg("Battery Charge Total",     0xCB52, 2, "u32", 0.0001, "kWh"),
-    Reg("Battery Discharge Total",  0xCB54, 2, "u32", 0.0001, "kWh"),
-    Reg("From Grid To Load",        0xCB63, 2, "u32", 0.0001, "kWh"),
-    Reg("Operation Hours",          0xCBB0, 1, "u16", 1,      "h"),
-]
-
-ALL_REGS: Dict[int, Reg] = {r.addr: r for r in DEVICE_DATA + RUNTIME_DATA + SUMMARY_DATA}
-REG_BY_NAME: Dict[str, Reg] = {r.name: r for r in DEVICE_DATA + RUNTIME_DATA + SUMMARY_DATA}
-
 # ──────────────────────────────────────────────────────────────────────────────
 # IDs
 
 ID_EXIT                     = wx.NewId()
 ID_SETTINGS                 = wx.NewId()
 ID_TERM                     = wx.NewId()
+ID_SLAVES                   = wx.NewId()
+ID_CONNECT_ALL_USB          = wx.NewId()
+ID_ADD_GATEWAY              = wx.NewId()
+ID_AUTO_TIMING              = wx.NewId()
+ID_TIMING_REPORT            = wx.NewId()
 ID_HELP                     = wx.NewId()
 
 ID_PULL_ALL                 = wx.NewId()
@@ -84,6 +88,7 @@ ID_PULL_START               = wx.NewId()
 ID_PULL_STOP                = wx.NewId()
 ID_PULL_CLEAR               = wx.NewId()
 ID_PULL_EXPORT              = wx.NewId()
+ID_PULL_EXPORT_HISTORY      = wx.NewId()
 
 # Keep “Send” menu items
 ID_READ_SERIAL_NUMBER       = wx.NewId()
@@ -180,8 +185,19 @@ class seWSNMenubar(wx.Frame):
         config_menu = wx.Menu()
         config_menu.Append(ID_SETTINGS, "&Port Settings...", "")
         config_menu.Append(ID_TERM, "&Terminal Settings...", "")
+        config_menu.Append(ID_SLAVES, "&Slave IDs...", "")
+        config_menu.Append(ID_CONNECT_ALL_USB, "Connect &all USB adapters", "")
+        config_menu.Append(ID_ADD_GATEWAY, "Add &Ethernet gateway...", "")
+        config_menu.AppendSeparator()
+        config_menu.AppendCheckItem(ID_AUTO_TIMING, "Auto-tune frame timing", "")
+        config_menu.Append(ID_TIMING_REPORT, "Bus timing report", "")
         parent.Bind(wx.EVT_MENU, parent.OnPortSettings, id=ID_SETTINGS)
         parent.Bind(wx.EVT_MENU, parent.OnTermSettings, id=ID_TERM)
+        parent.Bind(wx.EVT_MENU, parent.OnSlaveIds, id=ID_SLAVES)
+        parent.Bind(wx.EVT_MENU, parent.OnConnectAllUsb, id=ID_CONNECT_ALL_USB)
+        parent.Bind(wx.EVT_MENU, parent.OnAddGateway, id=ID_ADD_GATEWAY)
+        parent.Bind(wx.EVT_MENU, parent.OnAutoTiming, id=ID_AUTO_TIMING)
+        parent.Bind(wx.EVT_MENU, parent.OnTimingReport, id=ID_TIMING_REPORT)
         parent.seWSNView_menubar.Append(config_menu, "&Config")
 
         send_menu = wx.Menu()
@@ -226,22 +242,128 @@ class seWSNMenubar(wx.Frame):
         pull_menu.Append(ID_PULL_CLEAR,  "Clear", "")
         pull_menu.AppendSeparator()
         pull_menu.Append(ID_PULL_EXPORT, "Export data", "")
+        pull_menu.Append(ID_PULL_EXPORT_HISTORY, "Export history...", "")
         parent.Bind(wx.EVT_MENU, parent.OnPullAll,     id=ID_PULL_ALL)
         parent.Bind(wx.EVT_MENU, parent.OnStartAuto,   id=ID_PULL_START)
         parent.Bind(wx.EVT_MENU, parent.OnStopAuto,    id=ID_PULL_STOP)
         parent.Bind(wx.EVT_MENU, parent.OnClearAll,    id=ID_PULL_CLEAR)
         parent.Bind(wx.EVT_MENU, parent.OnExportData,  id=ID_PULL_EXPORT)
+        parent.Bind(wx.EVT_MENU, parent.OnExportHistory, id=ID_PULL_EXPORT_HISTORY)
         parent.seWSNView_menubar.Append(pull_menu, "Pull data")
 
 # Pages
+class LazyPage(wx.Panel):
+    """
+    Notebook placeholder that builds the real page, factory(self), on first show.
+    A page with an on_shown() method has it called every time its tab is selected.
+    """
+    def __init__(self, parent, factory):
+        super().__init__(parent)
+        self._factory = factory
+        self.page = None
+        self.SetSizer(wx.BoxSizer(wx.VERTICAL))
+
+    def ensure(self):
+        if self.page is None:
+            self.page = self._factory(self)
+            self.GetSizer().Add(self.page, 1, wx.EXPAND)
+            self.Layout()
+        return self.page
+
+    def shown(self):
+        page = self.ensure()
+        if hasattr(page, "on_shown"):
+            page.on_shown()
+
+class TerminalList(wx.ListCtrl):
+    """Virtual one-column list over a TerminalBuffer; only visible rows are ever built."""
+    def __init__(self, parent, buffer: mb_terminal.TerminalBuffer):
+        super().__init__(parent, wx.ID_ANY, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_NO_HEADER)
+        self.buffer = buffer
+        self.InsertColumn(0, "")
+        self.SetFont(wx.Font(wx.FontInfo(self.GetFont().GetPointSize()).Family(wx.FONTFAMILY_TELETYPE)))
+        self.Bind(wx.EVT_SIZE, self._on_size)
+
+    def OnGetItemText(self, item, col):
+        try:
+            return self.buffer[item]
+        except IndexError:
+            return ""
+
+    def _on_size(self, evt):
+        self.SetColumnWidth(0, max(200, self.GetClientSize().width))
+        evt.Skip()
+
+    def selected_text(self) -> str:
+        rows, i = [], self.GetFirstSelected()
+        while i != -1:
+            rows.append(self.OnGetItemText(i, 0))
+            i = self.GetNextSelected(i)
+        return "\n".join(rows)
+
+
 class PageTerminalView(wx.Panel):
-    def __init__(self, parent):
+    """Status log; lines are queued by UpdatePageTerminal and flushed here on a timer."""
+    def __init__(self, parent, buffer: mb_terminal.TerminalBuffer):
         super().__init__(parent=parent, id=wx.ID_ANY)
-        self.text_ctrl_output = wx.TextCtrl(self, wx.ID_ANY, "", style=wx.TE_MULTILINE | wx.TE_READONLY)
+        self.buffer = buffer
+        self.output = TerminalList(self, buffer)
+        self.count = wx.StaticText(self, wx.ID_ANY, "")
+        self.follow = wx.CheckBox(self, wx.ID_ANY, "Auto-scroll")
+        self.follow.SetValue(True)
+        btn_copy = wx.Button(self, wx.ID_ANY, "Copy")
+        btn_clear = wx.Button(self, wx.ID_ANY, "Clear")
+        btn_copy.Bind(wx.EVT_BUTTON, lambda _e: self.copy())
+        btn_clear.Bind(wx.EVT_BUTTON, lambda _e: self.clear())
+        self.output.Bind(wx.EVT_KEY_DOWN, self._on_key)
+
+        bar = wx.BoxSizer(wx.HORIZONTAL)
+        bar.Add(self.count, 1, wx.ALIGN_CENTER_VERTICAL)
+        bar.Add(self.follow, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 6)
+        bar.Add(btn_copy, 0, wx.LEFT, 6)
+        bar.Add(btn_clear, 0, wx.LEFT, 6)
         s = wx.BoxSizer(wx.VERTICAL)
-        s.Add(self.text_ctrl_output, 1, wx.EXPAND, 0)
+        s.Add(bar, 0, wx.EXPAND | wx.ALL, 4)
+        s.Add(self.output, 1, wx.EXPAND, 0)
         self.SetSizer(s)
 
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda _: self.flush(), self.timer)
+        self.timer.Start(1000 // mb_terminal.FLUSH_HZ)
+
+    def flush(self):
+        if not self.buffer.flush():
+            return
+        n = len(self.buffer)
+        self.output.SetItemCount(n)
+        if self.output.IsShownOnScreen():
+            self.output.Refresh()
+            if self.follow.GetValue():
+                self.output.EnsureVisible(n - 1)
+        older = f", {self.buffer.evicted} older" if self.buffer.evicted else ""
+        self.count.SetLabel(f"{n} lines{older}")
+
+    def clear(self):
+        self.buffer.clear()
+        self.output.SetItemCount(0)
+        self.output.Refresh()
+        self.count.SetLabel("")
+
+    def copy(self):
+        text = self.output.selected_text()
+        if text and wx.TheClipboard.Open():
+            wx.TheClipboard.SetData(wx.TextDataObject(text))
+            wx.TheClipboard.Close()
+
+    def _on_key(self, evt):
+        if evt.ControlDown() and evt.GetKeyCode() == ord("C"):
+            self.copy()
+        elif evt.ControlDown() and evt.GetKeyCode() == ord("A"):
+            for i in range(self.output.GetItemCount()):
+                self.output.Select(i)
+        else:
+            evt.Skip()
+
 class PageNetworkMonitor(wx.Panel):
     """Three clean columns at top; alarms box spans full width below."""
     def __init__(self, parent):
@@ -311,6 +433,163 @@ class PageNetworkMonitor(wx.Panel):
 
         self.SetSizer(root)
 
+class PageFleetMonitor(wx.Panel):
+    """One row per (bus, slave); shown when more than one slave is polled."""
+    def __init__(self, parent):
+        super().__init__(parent=parent, id=wx.ID_ANY)
+        self.summary = wx.StaticText(self, wx.ID_ANY, "")
+        self.list = wx.ListCtrl(self, wx.ID_ANY, style=wx.LC_REPORT | wx.LC_SINGLE_SEL | wx.LC_HRULES)
+        columns = [("Bus", 110), ("Unit", 60), ("State", 130), ("Cycle", 90), ("Cycles", 70), ("Failed", 70)]
+        columns += [(name, 140) for name in FLEET_COLUMNS]
+        columns += [("Alarms", 220)]
+        for i, (title, width) in enumerate(columns):
+            self.list.InsertColumn(i, title, width=width)
+        self.row_by_key: Dict[tuple, int] = {}
+
+        s = wx.BoxSizer(wx.VERTICAL)
+        s.Add(self.summary, 0, wx.ALL, 6)
+        s.Add(self.list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 6)
+        self.SetSizer(s)
+
+    def set_rows(self, keys: List[tuple]):
+        """keys: [(bus, unit), ...]"""
+        self.list.DeleteAllItems()
+        self.row_by_key.clear()
+        for bus, unit in keys:
+            idx = self.list.InsertItem(self.list.GetItemCount(), bus)
+            self.list.SetItem(idx, 1, str(unit))
+            self.list.SetItem(idx, 2, "pending")
+            self.row_by_key[(bus, unit)] = idx
+
+    def key_at(self, idx: int) -> Optional[tuple]:
+        for key, i in self.row_by_key.items():
+            if i == idx:
+                return key
+        return None
+
+    def update_row(self, key: tuple, cells: List[str]):
+        idx = self.row_by_key.get(key)
+        if idx is None:
+            return
+        for col, text in enumerate(cells, start=2):
+            if self.list.GetItemText(idx, col) != text:
+                self.list.SetItem(idx, col, text)
+
+class LatencyHistogramPanel(wx.Panel):
+    """Bar chart of an mb_diag histogram snapshot ({"buckets": [[edge_ms, count], ...]})."""
+    def __init__(self, parent):
+        super().__init__(parent=parent, id=wx.ID_ANY)
+        self.SetDoubleBuffered(True)
+        self.SetMinSize((-1, 160))
+        self.hist: Optional[dict] = None
+        self.Bind(wx.EVT_PAINT, self._on_paint)
+
+    def set_histogram(self, hist: Optional[dict]):
+        self.hist = hist
+        self.Refresh()
+
+    def _on_paint(self, _):
+        dc = wx.PaintDC(self)
+        dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+        dc.Clear()
+        buckets = (self.hist or {}).get("buckets") or []
+        if not buckets:
+            dc.DrawText("No transactions yet.", 8, 8)
+            return
+        w, h = self.GetClientSize()
+        label_h = dc.GetTextExtent("0")[1] + 4
+        top = max(c for _, c in buckets)
+        bar_w = max(1, (w - 16) // len(buckets))
+        dc.SetBrush(wx.Brush(wx.Colour(70, 130, 180)))
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        for i, (edge, count) in enumerate(buckets):
+            bar_h = int((h - 2 * label_h) * count / top) if top else 0
+            x = 8 + i * bar_w
+            dc.DrawRectangle(x, h - label_h - bar_h, max(1, bar_w - 2), bar_h)
+            if i % max(1, len(buckets) // 8) == 0:
+                dc.DrawText("inf" if edge is None else f"{edge:g}", x, h - label_h + 2)
+        dc.DrawText(f"latency ms: p50 {self.hist['p50']}  p90 {self.hist['p90']}  p99 {self.hist['p99']}", 8, 2)
+
+class PageDiagnostics(wx.Panel):
+    """Live bus statistics from the frame's mb_diag.Diagnostics, refreshed once a second."""
+    REFRESH_MS = 1000
+    COLUMNS = [("Bus", 110), ("Unit", 50), ("Function", 150), ("OK", 80), ("Timeout", 80),
+               ("CRC", 60), ("Exception", 110), ("Error", 60), ("Avg ms", 80)]
+
+    def __init__(self, parent):
+        super().__init__(parent=parent, id=wx.ID_ANY)
+        self.summary = wx.StaticText(self, wx.ID_ANY, "")
+        btn_reset = wx.Button(self, wx.ID_ANY, "Reset")
+        btn_export = wx.Button(self, wx.ID_ANY, "Export JSON...")
+        btn_reset.Bind(wx.EVT_BUTTON, self._on_reset)
+        btn_export.Bind(wx.EVT_BUTTON, self._on_export)
+        self.list = wx.ListCtrl(self, wx.ID_ANY, style=wx.LC_REPORT | wx.LC_HRULES)
+        for i, (title, width) in enumerate(self.COLUMNS):
+            self.list.InsertColumn(i, title, width=width)
+        self.histogram = LatencyHistogramPanel(self)
+
+        bar = wx.BoxSizer(wx.HORIZONTAL)
+        bar.Add(self.summary, 1, wx.ALIGN_CENTER_VERTICAL)
+        bar.Add(btn_reset, 0, wx.LEFT, 6)
+        bar.Add(btn_export, 0, wx.LEFT, 6)
+        s = wx.BoxSizer(wx.VERTICAL)
+        s.Add(bar, 0, wx.EXPAND | wx.ALL, 6)
+        s.Add(self.list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 6)
+        s.Add(self.histogram, 0, wx.EXPAND | wx.ALL, 6)
+        self.SetSizer(s)
+
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda _: self.refresh(), self.timer)
+        self.timer.Start(self.REFRESH_MS)
+        self.refresh()
+
+    def _frm(self): return self.GetTopLevelParent()
+
+    def refresh(self):
+        if not self.IsShownOnScreen():
+            return
+        snap = self._frm().diag.snapshot()
+        rows, parts = [], []
+        for bus, b in snap["buses"].items():
+            cyc = b["cycle_ms"]
+            parts.append(f"{bus}: {b['registers_per_s']:g} regs/s, {b['utilization_pct']:g} % busy, "
+                         f"cycle p50/p95/p99 {cyc.get('p50', '-')}/{cyc.get('p95', '-')}/{cyc.get('p99', '-')} ms")
+            for c in b["counters"]:
+                codes = ", ".join(f"{code}x{n}" for code, n in c["exception_codes"].items())
+                rows.append([bus, str(c["unit"]), mb_diag.FC_NAMES.get(c["fc"], f"FC{c['fc']:02d}"),
+                             str(c["ok"]), str(c["timeout"]), str(c["crc"]),
+                             f"{c['exception']} ({codes})" if codes else str(c["exception"]),
+                             str(c["error"]), "" if c["avg_ms"] is None else f"{c['avg_ms']:.1f}"])
+        self.summary.SetLabel("\n".join(parts) or "No bus traffic yet.")
+        if self.list.GetItemCount() != len(rows):
+            self.list.DeleteAllItems()
+            for row in rows:
+                self.list.InsertItem(self.list.GetItemCount(), row[0])
+        for idx, row in enumerate(rows):
+            for col, text in enumerate(row):
+                if self.list.GetItemText(idx, col) != text:
+                    self.list.SetItem(idx, col, text)
+        first = next(iter(snap["buses"].values()), None)
+        self.histogram.set_histogram(first["latency_ms"] if first else None)
+        self.Layout()
+
+    def _on_reset(self, _):
+        self._frm().diag.reset()
+        self.refresh()
+
+    def _on_export(self, _):
+        dlg = wx.FileDialog(self, "Export diagnostics as", wildcard="JSON (*.json)|*.json",
+                            defaultFile=time.strftime("modbus_diag_%Y%m%d_%H%M%S.json"),
+                            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+        if dlg.ShowModal() == wx.ID_OK:
+            path = dlg.GetPath()
+            try:
+                self._frm().diag.write_json(path)
+                self._frm().UpdatePageTerminal(f"Diagnostics written to {path}\n")
+            except OSError as e:
+                wx.MessageBox(str(e), "Export diagnostics", wx.OK | wx.ICON_ERROR)
+        dlg.Destroy()
+
 # ──────────────────────────────────────────────────────────────────────────────
 # NEW: Clean Machine Status page with controls
 class PageMachinestatus(wx.Panel):
@@ -414,72 +693,154 @@ class PageMachinestatus(wx.Panel):
 
         root.Add(soc, 0, wx.EXPAND | wx.ALL, 6)
 
-        self.SetSizer(root)
+        # ── Group 3: Profiles (all settings in one batched write + one read-back)
+        prof_box = wx.StaticBox(self, wx.ID_ANY, "Profiles")
+        prof = wx.StaticBoxSizer(prof_box, wx.HORIZONTAL)
+        btn_apply = wx.Button(self, label="Apply profile...")
+        btn_save = wx.Button(self, label="Save current as profile...")
+        prof.Add(btn_apply, 0, wx.ALL, 4)
+        prof.Add(btn_save, 0, wx.ALL, 4)
+        btn_apply.Bind(wx.EVT_BUTTON, self._on_apply_profile)
+        btn_save.Bind(wx.EVT_BUTTON, self._on_save_profile)
+        root.Add(prof, 0, wx.EXPAND | wx.ALL, 6)
 
-        # Auto-refresh once when tab is created
-        wx.CallAfter(self._read_eco, "eco")
-        wx.CallAfter(self._read_gen, "gen")
-        wx.CallAfter(self._read_mute, "mute")
-        wx.CallAfter(self._read_soc_stop, "soc_stop")
-        wx.CallAfter(self._read_soc_full, "soc_full")
+        self.SetSizer(root)
 
     # helpers to reach the frame
     def _frm(self): return self.GetTopLevelParent()
 
+    # Showing the tab loads every setting with one coalesced read on the worker;
+    # a result younger than CONFIG_CACHE_S is reused when switching back.
+    # Settings the slave refused to read show "—".
+    def on_shown(self):
+        frm = self._frm()
+        if frm.worker is None:
+            for key in self.status_boxes:
+                self._set_status_text(key, "—")
+            return
+        frm.mb_read_config(lambda values: self._show_loaded(values) if values is not None and self else None,
+                           max_age_s=frm.CONFIG_CACHE_S)
+
+    def _show_loaded(self, values: Dict[int, int]):
+        for key, reg in mb_registers.CONFIG_KEYS.items():
+            if reg.addr not in values:
+                self._set_status_text(key, "—")
+        self._show_config(values)
+
+    # Reads/writes are queued on the acquisition worker; results come back
+    # on the GUI thread through the callbacks below.
+    def _write(self, address, value, read_fn, key):
+        self._frm().mb_write_single(address, value, lambda ok: read_fn(key) if ok else None)
+
     # --------------- ECO ----------------
     def _read_eco(self, key):
-        v = self._frm().mb_read_u16(0xA02D)
-        self._set_status_text(key, "ON" if v == 1 else "OFF" if v is not None else "—")
+        self._frm().mb_read_u16(0xA02D, lambda v: self._set_status_text(
+            key, "ON" if v == 1 else "OFF" if v is not None else "—"))
 
     def _set_eco_on(self, key):
-        if self._frm().mb_write_single(0xA02D, 1): self._read_eco(key)
+        self._write(0xA02D, 1, self._read_eco, key)
 
     def _set_eco_off(self, key):
-        if self._frm().mb_write_single(0xA02D, 0): self._read_eco(key)
+        self._write(0xA02D, 0, self._read_eco, key)
 
     # ------------- Generator -------------
     def _read_gen(self, key):
-        v = self._frm().mb_read_u16(0xA02B)
-        txt = {0: "UPS (OFF)", 1: "APL", 2: "GEN (ON)"}.get(v, str(v)) if v is not None else "—"
-        self._set_status_text(key, txt)
+        def show(v):
+            txt = {0: "UPS (OFF)", 1: "APL", 2: "GEN (ON)"}.get(v, str(v)) if v is not None else "—"
+            self._set_status_text(key, txt)
+        self._frm().mb_read_u16(0xA02B, show)
 
     def _set_gen_on(self, key):
-        if self._frm().mb_write_single(0xA02B, 2): self._read_gen(key)  # 2=Generator
+        self._write(0xA02B, 2, self._read_gen, key)  # 2=Generator
 
     def _set_gen_off(self, key):
-        if self._frm().mb_write_single(0xA02B, 0): self._read_gen(key)  # 0=UPS (treat as OFF)
+        self._write(0xA02B, 0, self._read_gen, key)  # 0=UPS (treat as OFF)
 
     # --------------- Mute ----------------
     def _read_mute(self, key):
-        v = self._frm().mb_read_u16(0xA033)
-        self._set_status_text(key, "ON" if v == 1 else "OFF" if v is not None else "—")
+        self._frm().mb_read_u16(0xA033, lambda v: self._set_status_text(
+            key, "ON" if v == 1 else "OFF" if v is not None else "—"))
 
     def _set_mute_on(self, key):
-        if self._frm().mb_write_single(0xA033, 1): self._read_mute(key)
+        self._write(0xA033, 1, self._read_mute, key)
 
     def _set_mute_off(self, key):
-        if self._frm().mb_write_single(0xA033, 0): self._read_mute(key)
+        self._write(0xA033, 0, self._read_mute, key)
 
     # --------------- SOC -----------------
-    def _read_soc_stop(self, key):
-        v = self._frm().mb_read_u16(0xA09B)
+    def _show_soc(self, key, v):
         if v is not None:
             self._set_status_text(key, f"{v} %")
             self.spin_boxes[key].SetValue(int(v))
 
+    def _read_soc_stop(self, key):
+        self._frm().mb_read_u16(0xA09B, lambda v: self._show_soc(key, v))
+
     def _write_soc_stop(self, key):
         val = int(self.spin_boxes[key].GetValue())
-        if self._frm().mb_write_single(0xA09B, val): self._read_soc_stop(key)
+        self._write(0xA09B, val, self._read_soc_stop, key)
 
     def _read_soc_full(self, key):
-        v = self._frm().mb_read_u16(0xA09D)
-        if v is not None:
-            self._set_status_text(key, f"{v} %")
-            self.spin_boxes[key].SetValue(int(v))
+        self._frm().mb_read_u16(0xA09D, lambda v: self._show_soc(key, v))
 
     def _write_soc_full(self, key):
         val = int(self.spin_boxes[key].GetValue())
-        if self._frm().mb_write_single(0xA09D, val): self._read_soc_full(key)
+        self._write(0xA09D, val, self._read_soc_full, key)
+
+    # -------------- Profiles -------------
+    def _show_config(self, values: Dict[int, int]):
+        """Refresh the status boxes from {address: value} (a profile read-back)."""
+        shows = {"eco": self._show_on_off, "gen": self._show_gen, "mute": self._show_on_off,
+                 "soc_stop": self._show_soc, "soc_full": self._show_soc}
+        for key, reg in mb_registers.CONFIG_KEYS.items():
+            if reg.addr in values:
+                shows[key](key, values[reg.addr])
+
+    def _show_on_off(self, key, v):
+        self._set_status_text(key, "ON" if v == 1 else "OFF")
+
+    def _show_gen(self, key, v):
+        self._set_status_text(key, {0: "UPS (OFF)", 1: "APL", 2: "GEN (ON)"}.get(v, str(v)))
+
+    def _on_apply_profile(self, _):
+        dlg = wx.FileDialog(self, "Apply configuration profile", wildcard="Profile (*.json)|*.json",
+                            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST)
+        path = dlg.GetPath() if dlg.ShowModal() == wx.ID_OK else None
+        dlg.Destroy()
+        if not path:
+            return
+        try:
+            profile = mb_profile.load_profile(path)
+        except (OSError, ValueError) as e:
+            wx.MessageBox(str(e), "Apply profile", wx.OK | wx.ICON_ERROR)
+            return
+        self._frm().mb_apply_profile(profile, self._profile_applied)
+
+    def _profile_applied(self, result: Optional[mb_profile.ProfileResult]):
+        if result is None:
+            return
+        self._show_config(result.values())
+        if not result.ok:
+            wx.MessageBox("\n".join(result.lines()), "Apply profile", wx.OK | wx.ICON_WARNING)
+
+    def _on_save_profile(self, _):
+        dlg = wx.FileDialog(self, "Save configuration profile", wildcard="Profile (*.json)|*.json",
+                            defaultFile="profile.json", style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+        path = dlg.GetPath() if dlg.ShowModal() == wx.ID_OK else None
+        dlg.Destroy()
+        if path:
+            self._frm().mb_read_config(lambda values: self._save_profile(path, values))
+
+    def _save_profile(self, path: str, values: Optional[Dict[int, int]]):
+        if values is None:
+            return
+        self._show_config(values)
+        try:
+            mb_profile.save_profile(path, {r: values[r.addr] for r in mb_registers.CONFIG_DATA
+                                                if r.addr in values})
+            self._frm().UpdatePageTerminal(f"Profile saved to {path}\n")
+        except OSError as e:
+            wx.MessageBox(str(e), "Save profile", wx.OK | wx.ICON_ERROR)
 
     # Common UI helper
     def _set_status_text(self, key: str, text: str):
@@ -490,61 +851,19 @@ class PageMachinestatus(wx.Panel):
 # ──────────────────────────────────────────────────────────────────────────────
 # Main window
 class seWSNViewLayout(wx.Frame):
-    POLL_SECONDS_DEFAULT = 10
+    POLL_GAP_COST = mb_plan.DEFAULT_GAP_COST   # padding words worth one extra FC03
+    REQUEST_DEADLINE_S = 5.0                   # drop GUI requests still queued after this
+    GATEWAY_LANES = 2                          # parallel connections per Modbus TCP gateway
+    CONFIG_CACHE_S = 10.0                      # config page reads younger than this skip the bus
+    TERMINAL_LINES = mb_terminal.DEFAULT_CAPACITY   # Terminal View keeps this many lines
+    TERMINAL_SPILL_PATH: Optional[str] = None  # e.g. "log/terminal.log": keep lines scrolled out
+    SESSION_LOG_DIR: Optional[str] = "log"     # structured JSONL session log (None: off)
+    SESSION_LOG_KEEP = 168                     # closed segments kept: a week of hourly files
 
     # Popup behavior controls
     _NOT_CONNECTED_GRACE_S = 6.0   # don't show popup during the first N seconds
     _NOT_CONNECTED_COOLDOWN_S = 3.0  # show at most once every N seconds
 
-    # Alarm descriptions (partial)
-    FAULT_DESC: Dict[int, str] = {
-        1: "Battery under voltage warning",
-        2: "Battery under voltage protection ",
-        3: "Average battery discharge current over current protection",
-        4: "Instantaneous battery discharge over current protection",
-        5: "Battery not connected ",
-        6: "Battery over voltage ",
-        7: "BMS low battery alarm",
-        8: "BMS low battery protection",
-        9: "Bypass overload protection",
-        10: "Battery output overload protection",
-        11: "Battery inverter output short circuit",
-        12: "The AC output of the battery inverter over circuit",
-        13: "The DC component of the battery inverter voltage is abnormal",
-        14: "Bus over voltage software sampling protection",
-        15: "Bus over voltage hardware sampling protection",
-        16: "Bus under voltage protection",
-        17: "Bus short circuit protection",
-        18: "The PV input voltage is over voltage",
-        20: "PV over current protection",
-        22: "The PV heat sink is overheated",
-        23: "The AC heat sink is overheated.",
-        24: "The temperature of the main transformer is overheated",
-        25: "Ac input relay short circuit",
-        27: "Fan Failure",
-        30: "Type detection error",
-        33: "Parallel control can communication is faulty",
-        34: "Parallel control can communication is faulty",
-        35: "Parallel mode is faulty ",
-        36: "Parallel current sharing fault",
-        37: "Parallel ID setting error",
-        38: "Inconsistent Battery in parallel mode",
-        39: "Inconsistent AC input source in parallel mode",
-        40: "The parallel mode synchronization fails",
-        41: "Inconsistent system firmware version in parallel mode",
-        42: "The parallel communication cable is faulty",
-        43: "Serial number error",
-        49: "BMS communication error",
-        50: "BMS other alarm",
-        51: "BMS battery over temperature",
-        52: "BMS battery over current",
-        53: "BMS battery over voltage",
-        54: "BMS battery low voltage",
-        55: "BMS battery low temperature",
-        56: "PD communication error",
-        58: "BMS pack number mismatch",
-    }
-
     def __init__(self, *args, **kwds):
         super().__init__(*args, **kwds)
         self.SetTitle("REON Modbus GUI")
@@ -554,13 +873,42 @@ class seWSNViewLayout(wx.Frame):
         self.serial.timeout = 1.0
 
         self.settings = TerminalSetup()
-        self.mb: Optional[ModbusSerialClient] = None
-        self.mb_lock = threading.Lock()
-        self.modbus_slave_id = 1
-
-        self.poll_timer = wx.Timer(self)
-        self.poll_period_ms = self.POLL_SECONDS_DEFAULT * 500
-        self.Bind(wx.EVT_TIMER, self._on_poll_timer, self.poll_timer)
+        self.mb = None                        # client on the primary (auto-detected / configured) port
+        self._primary_bus: Optional[str] = None   # its bus name; Port Settings replaces only this bus
+        self.slave_ids: List[int] = [1]       # polled on every bus; more than one slave => fleet mode
+        self.modbus_slave_id = 1              # unit shown on Machine Monitor / used by config page
+        self._fleet_window: Dict[str, List] = {}   # bus -> recent (elapsed, wire_bytes, reads)
+        self._network_buses = set()           # TCP / RTU-over-TCP buses: no baud rate to measure against
+        # Merged data store: latest PollResult per (bus, unit) across all adapters,
+        # and every decoded register value per (bus, unit, address)
+        self.latest: Dict[tuple, mb_worker.PollResult] = {}
+        self.cache = mb_cache.RegisterCache()
+        self.diag = mb_diag.Diagnostics()     # per-transaction bus statistics (Diagnostics tab)
+        self.journal: Optional[mb_sessionlog.SessionLog] = None
+        if self.SESSION_LOG_DIR:
+            try:
+                self.journal = mb_sessionlog.SessionLog(self.SESSION_LOG_DIR, keep=self.SESSION_LOG_KEEP)
+                self.journal.event("session", event="start", app="seWSNView")
+            except OSError as e:
+                wx.CallAfter(self.UpdatePageTerminal, f"Session log disabled: {e}\n")
+        # Numeric history of everything polled periodically; created (and numpy
+        # imported) with the first poll result, stays None without numpy
+        self.history = None
+        self._history_ready = False
+        self._export_job = None
+        self._export_dlg: Optional[wx.ProgressDialog] = None
+        self._shown: Dict[int, tuple] = {}    # addr -> (text, bad) currently on Machine Monitor
+        self._shown_alarms: Optional[tuple] = None
+
+        self.poll_plan = mb_plan.plan_spans([item for item, _ in POLL_SCHEDULE],
+                                            gap_cost=self.POLL_GAP_COST)
+
+        # Polling runs on one AcquisitionWorker thread per bus; `worker` is the
+        # bus the Machine Monitor / config page / menu reads talk to.
+        self.pool = mb_worker.WorkerPool()
+        self.worker: Optional[mb_worker.AcquisitionWorker] = None
+        self._auto_poll = False
+        self._auto_timing = False
 
         # popup timing state
         self._app_started_at = time.time()
@@ -585,12 +933,19 @@ class seWSNViewLayout(wx.Frame):
         # Main notebook
         self.nb = wx.Notebook(p)
         self.pageNetMon = PageNetworkMonitor(self.nb)
-        self.pageMachineStatus = PageMachinestatus(self.nb)  # clean control page
-        self.pageTerminal = PageTerminalView(self.nb)
+        _startup_mark("frame: menubar + header")
+        self.pageMachineStatus = LazyPage(self.nb, PageMachinestatus)  # built on first show
+        self.terminal = mb_terminal.TerminalBuffer(self.TERMINAL_LINES, self.TERMINAL_SPILL_PATH)
+        self.pageTerminal = PageTerminalView(self.nb, self.terminal)
+        self.pageDiagnostics = LazyPage(self.nb, PageDiagnostics)
         self.nb.AddPage(self.pageNetMon, "Machine Monitor")
         self.nb.AddPage(self.pageMachineStatus, "Machine Configuration")
         self.nb.AddPage(self.pageTerminal, "Terminal View")
+        self.nb.AddPage(self.pageDiagnostics, "Diagnostics")
+        self.pageFleet: Optional[PageFleetMonitor] = None
         self._set_notebook_tab_font(point_size_increase=6)
+        self.nb.Bind(wx.EVT_NOTEBOOK_PAGE_CHANGED, self._on_page_changed)
+        _startup_mark("frame: notebook pages")
 
         # Layout: header on top, notebook fills the rest
         root_v = wx.BoxSizer(wx.VERTICAL)
@@ -626,7 +981,12 @@ class seWSNViewLayout(wx.Frame):
         b(wx.EVT_MENU, lambda e: self.read_and_show("Operation Hours"),        id=ID_READ_OPERATION_HOURS)
 
         self.Bind(wx.EVT_CLOSE, self.OnClose)
-        wx.CallAfter(self.autodetect_usb_and_connect)
+
+    def _on_page_changed(self, evt):
+        page = self.nb.GetPage(evt.GetSelection())
+        if isinstance(page, LazyPage):
+            page.shown()
+        evt.Skip()
 
     def _set_notebook_tab_font(self, point_size_increase=3):
         f = self.nb.GetFont()
@@ -651,31 +1011,25 @@ class seWSNViewLayout(wx.Frame):
 
     # UI helpers
     def UpdatePageTerminal(self, s):
-        try:
-            self.pageTerminal.text_ctrl_output.AppendText(str(s))
-        except Exception:
-            pass
+        self.terminal.write(str(s))         # shown on the Terminal View's next flush
 
     def OnExit(self, _): self.Close()
 
     def OnClose(self, _):
-        try:
-            if self.mb:
-                try:
-                    if getattr(self.mb, "connected", False):
-                        self.mb.close()
-                except Exception:
-                    self.mb.close()
-        except Exception:
-            pass
-        self.poll_timer.Stop()
+        self.pool.stop_all()
+        mb_client.close_client(self.mb)
+        self.pageTerminal.timer.Stop()
+        self.terminal.close()
+        if self.journal is not None:
+            self.journal.event("session", event="stop")
+            self.journal.close()
         self.Destroy()
 
     def OnHelp(self, _):
         message = (
             "Version Information:\n\n"
-            f"pymodbus: {getattr(pymodbus, '__version__', '?')}\n"
-            f"Framer:   {_FRAMER_KW}\n"
+            f"pymodbus: {mb_client.pymodbus_version()}\n"
+            f"Framer:   {mb_client.framer_kw()}\n"
             "Comments: Engineering build (Modbus RTU)\n"
         )
         wx.MessageBox(message, "Help About", wx.OK | wx.ICON_INFORMATION)
@@ -696,45 +1050,77 @@ class seWSNViewLayout(wx.Frame):
             pass
         return str(pyserial_parity or 'N')
 
+    def _port_str(self):
+        return getattr(self.serial, "portstr", None) or getattr(self.serial, "port", None)
+
+    def _make_client(self, port):
+        return mb_client.make_serial_client(
+            port,
+            baudrate=self.serial.baudrate,
+            bytesize=self.serial.bytesize,
+            parity=self._parity_char(self.serial.parity),
+            stopbits=self.serial.stopbits,
+            timeout=self.serial.timeout or 1.0,
+        )
+
     def mb_connect_from_current_settings(self):
-        try:
-            if self.mb:
-                try:
-                    if getattr(self.mb, "connected", False):
-                        self.mb.close()
-                except Exception:
-                    self.mb.close()
-        except Exception:
-            pass
+        # `worker` may follow another adapter or a gateway (Fleet tab); only
+        # the primary port's bus is replaced here
+        if self._primary_bus is not None:
+            self._remove_bus(self._primary_bus)
+            self._primary_bus = None
+        mb_client.close_client(self.mb)
 
-        port_str = getattr(self.serial, "portstr", None) or getattr(self.serial, "port", None)
-
-        if _HAS_FRAMER:
-            self.mb = ModbusSerialClient(
-                port=port_str,
-                framer=FramerType.RTU,
-                baudrate=self.serial.baudrate,
-                bytesize=self.serial.bytesize,
-                parity=self._parity_char(self.serial.parity),
-                stopbits=self.serial.stopbits,
-                timeout=self.serial.timeout or 1.0,
-            )
-        else:
-            self.mb = ModbusSerialClient(
-                method="rtu",
-                port=port_str,
-                baudrate=self.serial.baudrate,
-                bytesize=self.serial.bytesize,
-                parity=self._parity_char(self.serial.parity),
-                stopbits=self.serial.stopbits,
-                timeout=self.serial.timeout or 1.0,
-            )
+        port_str = self._port_str()
+        self._remove_bus(port_str)      # may have been running as an extra bus
+        self.mb = self._make_client(port_str)
 
         ok = self.mb.connect()
+        if ok:
+            self._primary_bus = port_str
+            self.worker = self._start_bus(port_str, self.mb)
+        self._refresh_fleet_page()
+        self._refresh_config_page()
         return bool(ok)
 
+    # ── Acquisition workers (one per bus) ─────────────────────────────────────
+    def _remove_bus(self, bus: str):
+        """Stop one bus; the Machine Monitor stops following it if it did."""
+        if self.worker is not None and self.worker.bus == bus:
+            self.worker = None
+        self.pool.remove(bus)
+
+    def _start_bus(self, bus: str, client, units: Optional[List[int]] = None, group: str = "",
+                   network: bool = False) -> mb_worker.AcquisitionWorker:
+        mb_client.bind(client)              # resolve the request signature once per client
+        self.cache.clear(bus=bus)           # may be other inverters now; identity data never expires
+        if self.journal is not None:        # pymodbus is loaded by now; the window did not wait for it
+            self.journal.event("session", event="bus", bus=bus, network=network,
+                               pymodbus=mb_client.pymodbus_version())
+        timing = mb_worker.FrameTiming(
+            self.serial.baudrate, self.serial.bytesize, self._parity_char(self.serial.parity),
+            self.serial.stopbits, auto=self._auto_timing,
+            fixed_gap_s=0.0 if network else None,   # the gateway keeps the RS-485 silences
+        )
+        worker = mb_worker.AcquisitionWorker(
+            client, POLL_SCHEDULE, units or self.slave_ids,
+            post=lambda result: wx.CallAfter(self._on_poll_result, result),
+            gap_cost=self.POLL_GAP_COST, timing=timing, bus=bus,
+            timeout_s=self.serial.timeout or 1.0, diag=self.diag, group=group, journal=self.journal,
+        )
+        worker.unit = self.modbus_slave_id
+        if network:
+            self._network_buses.add(bus)
+        else:
+            self._network_buses.discard(bus)
+        self.pool.add(worker)
+        if self._auto_poll:
+            worker.set_auto(True)
+        return worker
+
     def OnPortSettings(self, _=None):
         try:
+            import wxSerialConfigDialog
             dlg = wxSerialConfigDialog.SerialConfigDialog(
                 self, -1, "",
                 show=(wxSerialConfigDialog.SHOW_BAUDRATE
@@ -746,7 +1132,8 @@ class seWSNViewLayout(wx.Frame):
                 if self.mb_connect_from_current_settings():
                     self._update_title_connected()
                     self.UpdatePageTerminal("Modbus RTU connected.\n")
-                    self.UpdatePageTerminal(f"pymodbus {getattr(pymodbus, '__version__', '?')} using {_FRAMER_KW}\n")
+                    self.UpdatePageTerminal(f"pymodbus {mb_client.pymodbus_version()} using {mb_client.framer_kw()}, "
+                                            f"{mb_client.ops_for(self.mb).describe()}\n")
                 else:
                     wx.MessageBox("Failed to connect via Modbus RTU with the selected settings.",
                                   "Connection Error", wx.OK | wx.ICON_ERROR)
@@ -761,8 +1148,110 @@ class seWSNViewLayout(wx.Frame):
             f"[{self.serial.baudrate},{self.serial.bytesize}{self._parity_char(self.serial.parity)}{self.serial.stopbits}]"
         )
 
+    # ── Fleet mode (several unit IDs on one bus) ──────────────────────────────
+    def OnSlaveIds(self, _=None):
+        dlg = wx.TextEntryDialog(self, "Modbus unit IDs to poll (e.g. 1 or 1-6,9):",
+                                 "Slave IDs", mb_fleet.format_unit_ids(self.slave_ids))
+        if dlg.ShowModal() == wx.ID_OK:
+            try:
+                self._apply_slave_ids(mb_fleet.parse_unit_ids(dlg.GetValue()))
+            except ValueError as e:
+                wx.MessageBox(str(e), "Invalid unit IDs", wx.OK | wx.ICON_ERROR)
+        dlg.Destroy()
+
+    def _apply_slave_ids(self, ids: List[int]):
+        self.slave_ids = list(ids)
+        self.cache.clear()                  # every bus polls a new set of units
+        if self.modbus_slave_id not in self.slave_ids:
+            self.modbus_slave_id = self.slave_ids[0]
+        self.pool.set_units(self.slave_ids)
+        if self.worker:
+            self.worker.unit = self.modbus_slave_id
+        self._refresh_fleet_page()
+        self.UpdatePageTerminal(f"Polling unit IDs {mb_fleet.format_unit_ids(self.slave_ids)}; "
+                                f"Machine Monitor shows unit {self.modbus_slave_id}.\n")
+
+    def _fleet_keys(self) -> List[tuple]:
+        return self.pool.keys()
+
+    def _refresh_fleet_page(self):
+        keys = self._fleet_keys()
+        self._fleet_window = {}
+        self.latest = {k: v for k, v in self.latest.items() if k in keys}
+        fleet = len(keys) > 1
+        if fleet and not self.pageFleet:
+            self.pageFleet = PageFleetMonitor(self.nb)
+            self.pageFleet.list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self._on_fleet_activate)
+            self.nb.InsertPage(1, self.pageFleet, "Fleet")
+        elif not fleet and self.pageFleet:
+            self.nb.DeletePage(self.nb.FindPage(self.pageFleet))
+            self.pageFleet = None
+        if self.pageFleet:
+            self.pageFleet.set_rows(keys)
+
+    def _on_fleet_activate(self, evt):
+        key = self.pageFleet.key_at(evt.GetIndex()) if self.pageFleet else None
+        worker = self.pool.get(key[0]) if key else None
+        if not worker or (worker is self.worker and key[1] == self.modbus_slave_id):
+            return
+        self.worker = worker
+        self.modbus_slave_id = worker.unit = key[1]
+        self.OnClearAll()
+        self._refresh_config_page()
+        self.UpdatePageTerminal(f"Machine Monitor now shows unit {key[1]} on {key[0]}.\n")
+        self._fill_detail_from_cache()
+        latest = self.latest.get(key)
+        if latest and latest.alarm_ids is not None:
+            self._show_alarms(latest.alarm_ids, latest.alarm_details)
+
+    def _update_fleet(self, result: mb_worker.PollResult):
+        st = result.slave
+        cells = [
+            st.status if st else "",
+            f"{result.elapsed * 1000:.0f} ms",
+            str(st.cycles if st else ""),
+            str(st.failed_cycles if st else ""),
+        ]
+        for name in FLEET_COLUMNS:
+            entry = self.cache.get((result.bus, result.unit, REG_BY_NAME[name].addr))
+            cells.append(entry.text if entry else "")
+        if result.alarm_ids is None:
+            cells.append("")
+        else:
+            cells.append(", ".join(str(a) for a in result.alarm_ids) or "none")
+        self.pageFleet.update_row((result.bus, result.unit), cells)
+
+        # Bus utilization over the last full pass of each serial bus: time the
+        # frames actually occupied the wire vs. wall time spent polling. A
+        # network bus has no baud rate of its own, so it shows transactions/s.
+        window = self._fleet_window.setdefault(result.bus, [])
+        window.append((result.elapsed, result.wire_bytes, result.reads))
+        worker = self.pool.get(result.bus)
+        del window[:-len(worker.units if worker else self.slave_ids)]
+        char_bits = mb_plan.bits_per_char(self.serial.bytesize, self._parity_char(self.serial.parity),
+                                          self.serial.stopbits)
+        parts = []
+        for bus, win in sorted(self._fleet_window.items()):
+            elapsed = sum(e for e, _, _ in win)
+            if bus in self._network_buses:
+                rate = sum(n for _, _, n in win) / elapsed if elapsed else 0.0
+                parts.append(f"{bus}: pass {elapsed:.2f} s, n/a ({rate:.0f} tx/s)")
+                continue
+            wire = mb_plan.wire_time_s(sum(b for _, b, _ in win), self.serial.baudrate, char_bits)
+            util = 100.0 * wire / elapsed if elapsed else 0.0
+            parts.append(f"{bus}: pass {elapsed:.2f} s, {util:.0f} %")
+        serial = any(bus not in self._network_buses for bus in self._fleet_window)
+        self.pageFleet.summary.SetLabel(
+            f"{len(self._fleet_keys())} slaves" + (f" at {self.serial.baudrate} baud" if serial else "")
+            + " — bus utilization " + "; ".join(parts))
+
     # Auto-detect + connect
     def _choose_usb_port(self, ports):
+        candidates = self._usb_candidates(ports)
+        return candidates[0] if candidates else None
+
+    def _usb_candidates(self, ports):
+        """USB serial ports, best-scoring first."""
         candidates = []
         for p in ports:
             dev = (p.device or "").lower()
@@ -779,13 +1268,12 @@ class seWSNViewLayout(wx.Frame):
             if any(x in desc for x in ["ftdi", "cp210", "ch340", "ch341", "prolific", "silicon labs", "cdc", "usb serial"]): score += 30
             if getattr(p, "vid", None) is not None: score += 10
             candidates.append((score, p))
-        if not candidates:
-            return None
         candidates.sort(key=lambda t: t[0], reverse=True)
-        return candidates[0][1]
+        return [p for _, p in candidates]
 
     def autodetect_usb_and_connect(self):
         try:
+            from serial.tools import list_ports
             ports = list(list_ports.comports())
         except Exception as e:
             self.UpdatePageTerminal(f"Auto-detect: list_ports error: {e}\n")
@@ -809,10 +1297,102 @@ class seWSNViewLayout(wx.Frame):
         if self.mb_connect_from_current_settings():
             self._update_title_connected()
             self.UpdatePageTerminal("Modbus RTU connected (auto-detected).\n")
-            self.UpdatePageTerminal(f"pymodbus {getattr(pymodbus, '__version__', '?')} using {_FRAMER_KW}\n")
+            self.UpdatePageTerminal(f"pymodbus {mb_client.pymodbus_version()} using {mb_client.framer_kw()}, "
+                                    f"{mb_client.ops_for(self.mb).describe()}\n")
         else:
             self.UpdatePageTerminal("Auto-detect: failed to connect. Use Config → Port Settings…\n")
 
+    # Extra adapters: one more worker per USB port, same settings and slave IDs
+    def OnConnectAllUsb(self, _=None):
+        if not self.worker:
+            self.autodetect_usb_and_connect()
+            if not self.worker:
+                return
+        try:
+            from serial.tools import list_ports
+            ports = self._usb_candidates(list(list_ports.comports()))
+        except Exception as e:
+            self.UpdatePageTerminal(f"Auto-detect: list_ports error: {e}\n")
+            return
+        added = 0
+        for cand in ports:
+            if cand.device in self.pool:
+                continue
+            client = self._make_client(cand.device)
+            if client.connect():
+                self._start_bus(cand.device, client)
+                added += 1
+                self.UpdatePageTerminal(f"Added bus {cand.device} ({cand.description})\n")
+            else:
+                self.UpdatePageTerminal(f"Could not open {cand.device} ({cand.description})\n")
+        self._refresh_fleet_page()
+        self.UpdatePageTerminal(f"{len(self.pool)} bus(es) active, {added} added.\n")
+
+    # Ethernet-RS485 gateways: connected off the GUI thread, then one worker per lane
+    def OnAddGateway(self, _=None):
+        dlg = wx.TextEntryDialog(
+            self, "Gateway address:\n  tcp://host:502 for Modbus TCP\n"
+                  "  rtu+tcp://host:4001 for RTU frames over TCP", "Add Ethernet gateway", "tcp://")
+        text = dlg.GetValue() if dlg.ShowModal() == wx.ID_OK else ""
+        dlg.Destroy()
+        if not text:
+            return
+        try:
+            endpoint = mb_client.parse_endpoint(text)
+        except ValueError as e:
+            wx.MessageBox(str(e), "Add Ethernet gateway", wx.OK | wx.ICON_ERROR)
+            return
+        if not endpoint.is_network:
+            wx.MessageBox("Use Config → Port Settings for serial ports.", "Add Ethernet gateway",
+                          wx.OK | wx.ICON_INFORMATION)
+            return
+        # re-adding a gateway replaces its lanes; they are joined on the helper thread
+        old = self.pool.detach_group(str(endpoint))
+        if self.worker in old:
+            self.worker = None
+        if old:
+            self._refresh_fleet_page()
+        lanes = min(self.GATEWAY_LANES, len(self.slave_ids)) if endpoint.multiplexed else 1
+        self.UpdatePageTerminal(f"Connecting to {endpoint} ({lanes} connection(s))...\n")
+        threading.Thread(target=self._connect_gateway, args=(endpoint, lanes, old),
+                         name="gateway-connect", daemon=True).start()
+
+    def _connect_gateway(self, endpoint: mb_client.Endpoint, lanes: int, old=()):
+        """Runs on a helper thread: stopping old lanes and TCP connects can take a while."""
+        mb_worker.WorkerPool.retire(old)
+        clients = []
+        for lane in range(lanes):
+            try:
+                client = mb_client.POOL.acquire(endpoint, lane, timeout=self.serial.timeout or 1.0)
+                ok = client.connect()
+            except Exception as e:
+                client, ok = None, False
+                wx.CallAfter(self.UpdatePageTerminal, f"{endpoint}: {e}\n")
+            if not ok:
+                if client is not None:
+                    mb_client.POOL.release(client)
+                for c in clients:
+                    mb_client.POOL.release(c)
+                wx.CallAfter(self.UpdatePageTerminal, f"Could not connect to {endpoint}.\n")
+                return
+            clients.append(client)
+        wx.CallAfter(self._start_gateway, endpoint, clients)
+
+    def _start_gateway(self, endpoint: mb_client.Endpoint, clients: list):
+        if not self:
+            for c in clients:
+                mb_client.POOL.release(c)
+            return
+        shares = mb_worker.split_units(self.slave_ids, len(clients))
+        for lane, (client, units) in enumerate(zip(clients, shares)):
+            worker = self._start_bus(endpoint.lane_name(lane, len(clients)), client, units,
+                                     group=str(endpoint), network=True)
+            if self.worker is None and self.modbus_slave_id in units:
+                self.worker = worker        # no serial bus: the Machine Monitor follows the gateway
+        self._refresh_fleet_page()
+        self._refresh_config_page()
+        self.UpdatePageTerminal(f"Added gateway {endpoint}; {len(self.pool)} bus(es) active.\n")
+
     # ── Not-connected popup helpers ───────────────────────────────────────────
     def _maybe_warn_not_connected(self):
         now = time.time()
@@ -825,200 +1405,298 @@ class seWSNViewLayout(wx.Frame):
         wx.MessageBox("Modbus client is not connected.", "Error", wx.OK | wx.ICON_ERROR)
 
     # ── Modbus read/write wrappers ────────────────────────────────────────────
-    def _call_read(self, method_name, address, count, unit):
-        if not self.mb:
-            return None
-        fn = getattr(self.mb, method_name, None)
-        if not fn:
-            return None
-        try:
-            return fn(address=address, count=count, slave=unit)
-        except TypeError:
-            pass
-        try:
-            return fn(address=address, count=count, unit=unit)
-        except TypeError:
-            pass
-        try:
-            return fn(address=address, count=count)
-        except TypeError:
-            pass
-        try:
-            return fn(address=address)
-        except Exception:
+    # Every request is queued on the acquisition worker (which owns the client)
+    # and answered through a future; `on_done` runs on the GUI thread with the
+    # result, or None/False if the request failed, expired or was cancelled.
+    def _deliver(self, fut: Future, on_done) -> Future:
+        fut.add_done_callback(lambda f: wx.CallAfter(self._finish_request, f, on_done))
+        return fut
+
+    def _finish_request(self, fut: Future, on_done):
+        if not self:
+            return
+        value = None
+        if not fut.cancelled():
+            err = fut.exception()
+            if err is not None:
+                self.UpdatePageTerminal(f"{err}\n")
+            else:
+                value = fut.result()
+        if on_done:
+            on_done(value)
+
+    def _cache_key(self, address, unit=None) -> mb_cache.Key:
+        return (self.worker.bus if self.worker else "", unit or self.modbus_slave_id, address)
+
+    def mb_read_holding(self, address, count=1, on_done=None, unit=None,
+                        max_age_s: Optional[float] = None) -> Optional[Future]:
+        """
+        Queue an FC03 read. With max_age_s, a cached value younger than that
+        is handed to on_done (still via wx.CallAfter) without touching the bus.
+        """
+        if not self.worker:
+            self._maybe_warn_not_connected()
             return None
-
-    def _read_holding(self, address, count=1, unit=None):
-        unit = unit or self.modbus_slave_id
-        return self._call_read("read_holding_registers", address, count, unit)
-
-    def mb_read_holding(self, address, count=1, unit=None):
-        if not self.mb:
+        key = self._cache_key(address, unit)
+        if max_age_s is not None:
+            entry = self.cache.fresh(key, max_age_s, min_words=count)
+            if entry is not None:
+                if on_done:
+                    wx.CallAfter(on_done, entry.words[:count])
+                return None
+
+        def done(regs):
+            if regs is not None and max_age_s is not None:
+                self.cache.put(key, regs, text=" ".join(str(w) for w in regs), ttl_s=max_age_s)
+            if on_done:
+                on_done(regs)
+        fut = self.worker.read_holding(address, count, unit, deadline_s=self.REQUEST_DEADLINE_S)
+        return self._deliver(fut, done)
+
+    def mb_read_u16(self, address, on_done, unit=None) -> Optional[Future]:
+        return self.mb_read_holding(
+            address, 1, lambda regs: on_done(None if regs is None else int(regs[0] & 0xFFFF)), unit,
+            max_age_s=self.CONFIG_CACHE_S)
+
+    # write single (FC=06); operator writes jump ahead of queued reads and polls
+    def mb_write_single(self, address, value, on_done=None, unit=None) -> Optional[Future]:
+        if not self.worker:
             self._maybe_warn_not_connected()
             return None
-        with self.mb_lock:
-            rr = self._read_holding(address, count, unit)
-        if rr is None:
-            self.UpdatePageTerminal(f"Read failed (None) at 0x{address:04X}\n"); return None
-        try:
-            if rr.isError():
-                self.UpdatePageTerminal(f"Modbus error on 0x{address:04X}: {rr}\n"); return None
-        except Exception:
-            pass
-        if getattr(rr, "registers", None) is None:
-            self.UpdatePageTerminal(f"No data returned at 0x{address:04X}: {rr}\n"); return None
-        return rr.registers
 
-    def mb_read_u16(self, address, unit=None) -> Optional[int]:
-        regs = self.mb_read_holding(address, 1, unit)
-        if regs is None:
+        key = self._cache_key(address, unit)
+
+        def done(ok):
+            self.cache.invalidate(key)      # the re-read after a write must hit the bus
+            if ok:
+                self.UpdatePageTerminal(f"Wrote 0x{int(value) & 0xFFFF:04X} to 0x{address:04X}\n")
+            if on_done:
+                on_done(bool(ok))
+        fut = self.worker.write_register(address, value, unit, deadline_s=self.REQUEST_DEADLINE_S)
+        return self._deliver(fut, done)
+
+    # Machine Configuration: every setting in one coalesced FC03 (smaller reads
+    # if the slave refuses the words in between; see mb_profile.read_config).
+    # Values are cached per register, so mb_read_u16 on a single setting shares
+    # them; a setting the slave refused is missing from the dict.
+    def mb_read_config(self, on_done, unit=None, max_age_s: Optional[float] = None) -> Optional[Future]:
+        if not self.worker:
+            self._maybe_warn_not_connected()
             return None
-        return int(regs[0] & 0xFFFF)
-
-    # write single (FC=06)
-    def mb_write_single(self, address, value, unit=None) -> bool:
-        if not self.mb:
+        worker, unit = self.worker, unit or self.modbus_slave_id
+        keys = {r.addr: self._cache_key(r.addr, unit) for r in mb_registers.CONFIG_DATA}
+        if max_age_s is not None:
+            cached = {a: self.cache.fresh(k, max_age_s) for a, k in keys.items()}
+            if all(cached.values()):
+                wx.CallAfter(on_done, {a: e.words[0] for a, e in cached.items()})
+                return None
+
+        def fn(client):
+            values, err = mb_profile.read_config(client, unit, pause_s=worker.timing.gap_s,
+                                                 record=lambda *tx: worker.record(unit, *tx))
+            if values is None:
+                raise mb_client.ModbusRequestError(err)
+            return values
+
+        def done(values):
+            if values is not None and max_age_s is not None:
+                for a, k in keys.items():
+                    if a in values:
+                        self.cache.put(k, [values[a]], text=str(values[a]), ttl_s=max_age_s)
+            on_done(values)
+        fut = worker.submit(fn, mb_worker.PRIO_READ, self.REQUEST_DEADLINE_S, unit=unit,
+                            addr=mb_registers.CONFIG_DATA[0].addr)
+        return self._deliver(fut, done)
+
+    def _refresh_config_page(self):
+        """Reload the Machine Configuration tab if it is on screen (new bus or slave)."""
+        page = self.pageMachineStatus
+        if page.page is not None and self.nb.GetCurrentPage() is page:
+            page.page.on_shown()
+
+    # apply a configuration profile: batched writes, one read-back, per-field report
+    def mb_apply_profile(self, profile, on_done=None, unit=None) -> Optional[Future]:
+        if not self.worker:
             self._maybe_warn_not_connected()
-            return False
-        unit = unit or self.modbus_slave_id
-        try:
-            fn = getattr(self.mb, "write_register", None)
-            if not fn:
-                self.UpdatePageTerminal("write_register not available on Modbus client.\n")
-                return False
-            try:
-                rr = fn(address=address, value=int(value) & 0xFFFF, slave=unit)
-            except TypeError:
-                try:
-                    rr = fn(address=address, value=int(value) & 0xFFFF, unit=unit)
-                except TypeError:
-                    rr = fn(address=address, value=int(value) & 0xFFFF)
-        except Exception as e:
-            self.UpdatePageTerminal(f"Write error at 0x{address:04X}: {e}\n")
-            return False
-
-        try:
-            if rr is None or rr.isError():
-                self.UpdatePageTerminal(f"Modbus write error at 0x{address:04X}: {rr}\n")
-                return False
-        except Exception:
-            pass
-        self.UpdatePageTerminal(f"Wrote 0x{int(value) & 0xFFFF:04X} to 0x{address:04X}\n")
-        return True
+            return None
 
-    # Decoders / formatters
-    def _u16(self, w):  return int(w & 0xFFFF)
-    def _s16(self, w):
-        v = int(w & 0xFFFF)
-        return v - 0x10000 if v & 0x8000 else v
-
-    def _u32_be(self, hi, lo): return ((hi & 0xFFFF) << 16) | (lo & 0xFFFF)
-    def _s32_be(self, hi, lo):
-        u = self._u32_be(hi, lo)
-        return u - 0x1_0000_0000 if u & 0x8000_0000 else u
-
-    def _decode(self, regs, codec):
-        if not regs: return None
-        if codec == "ascii":
-            b = b"".join(int(r & 0xFFFF).to_bytes(2, "big") for r in regs)
-            return b.split(b"\x00", 1)[0].decode("ascii", errors="ignore")
-        if codec == "u16": return self._u16(regs[0])
-        if codec == "s16": return self._s16(regs[0])
-        if codec == "u32":
-            if len(regs) < 2: return None
-            return self._u32_be(regs[0], regs[1])
-        if codec == "s32":
-            if len(regs) < 2: return None
-            return self._s32_be(regs[0], regs[1])
-        return None
-
-    def _fmt_scaled(self, val, scale: float, unit: str) -> str:
-        if val is None: return ""
-        if isinstance(val, (int, float)) and scale != 1:
-            from decimal import Decimal
-            dec = max(0, -Decimal(str(scale)).as_tuple().exponent)
-            s = f"{val * scale:.{dec}f}"
-        elif isinstance(val, (int, float)):
-            s = f"{val:.0f}"
-        else:
-            s = str(val)
-        return f"{s} {unit}".strip()
+        def done(result):
+            for reg in profile:
+                self.cache.invalidate(self._cache_key(reg.addr, unit))
+            if result is not None:
+                for addr, value in result.values().items():     # the verified read-back is fresh
+                    self.cache.put(self._cache_key(addr, unit), [value], text=str(value),
+                                   ttl_s=self.CONFIG_CACHE_S)
+                self.UpdatePageTerminal("\n".join(result.lines()) + "\n")
+            if on_done:
+                on_done(result)
+        fut = mb_profile.submit(self.worker, profile, unit or self.modbus_slave_id,
+                                deadline_s=self.REQUEST_DEADLINE_S)
+        return self._deliver(fut, done)
 
     # ---- Active alarm helpers ----
-    def _read_active_alarm_ids(self) -> List[int]:
-        # 8x16 bits starting at 0x75A5 => alarms 1..128
-        regs = self.mb_read_holding(0x75A5, 8)
-        if regs is None:
-            return []
-        ids: List[int] = []
-        for w_idx, w in enumerate(regs):
-            for bit in range(16):
-                if w & (1 << bit):
-                    ids.append(w_idx * 16 + bit + 1)
-        return ids
-
-    def _update_alarm_box(self):
-        ids = self._read_active_alarm_ids()
+    def _show_alarms(self, ids: List[int], details: Dict[int, int]):
         if not hasattr(self.pageNetMon, "faults_text"):
             return
+        shown = (tuple(ids), tuple(sorted(details.items())))
+        if shown == self._shown_alarms:
+            return                          # same alarm set: leave the text box alone
+        self._shown_alarms = shown
         if not ids:
             self.pageNetMon.faults_text.SetValue("No active alarms.")
             return
-        lines = []
-        for a in ids:
-            label = self.FAULT_DESC.get(a, f"Alarm {a}")
-            detail = self.mb_read_holding(0x9A4C + (a - 1), 1)
-            if detail is not None and len(detail) == 1 and detail[0] != 0:
-                label += f" (detail={detail[0]})"
-            lines.append(f"[{a:02d}] {label}")
-        self.pageNetMon.faults_text.SetValue("\n".join(lines))
-
-    # Generic read + show
+        self.pageNetMon.faults_text.SetValue("\n".join(mb_registers.alarm_text(a, details.get(a)) for a in ids))
+
+    # Generic read + show (served from the cache while the polled value is fresh)
     def read_and_show(self, reg_name: str):
         reg = REG_BY_NAME.get(reg_name)
         if not reg:
             self.UpdatePageTerminal(f"Unknown register '{reg_name}'\n")
             return
-        regs = self.mb_read_holding(reg.addr, reg.words)
-        if regs is None:
+        key = self._cache_key(reg.addr)
+        entry = self.cache.fresh(key, min_words=reg.words)
+        if entry is not None:
+            self._set_field(reg, entry)
+            self.UpdatePageTerminal(f"{reg.name}: {entry.text} (cached, {entry.age_s:.1f}s old)\n")
             return
-        decoded = self._decode(regs, reg.codec)
-        text = self._fmt_scaled(decoded, reg.scale, reg.unit) if reg.codec != "ascii" else str(decoded)
+
+        def show(regs):
+            if regs is not None:
+                self._store_reg(key, reg, regs)
+                entry = self.cache.get(key)
+                if key == self._cache_key(reg.addr):
+                    self._set_field(reg, entry)
+                self.UpdatePageTerminal(f"{reg.name}: {entry.text}\n")
+        self.mb_read_holding(reg.addr, reg.words, show)
+
+    def _store_reg(self, key: mb_cache.Key, reg: Reg, words, ts: Optional[float] = None,
+                   decoded: Optional[tuple] = None) -> bool:
+        """Decode into the cache; True if the display text changed."""
+        value, text = decoded or mb_decode.decode(reg, words)
+        return self.cache.put(key, words, value, text, CACHE_TTL_S.get(reg.addr), ts)
+
+    def _set_field(self, reg: Reg, entry: Optional[mb_cache.CacheEntry]):
+        """Touch the Machine Monitor widget only if its text or quality changed."""
         ctrl = self.pageNetMon.field_by_name.get(reg.name)
-        if ctrl:
-            ctrl.SetValue(text)
-        self.UpdatePageTerminal(f"{reg.name}: {text}\n")
+        if not ctrl or entry is None:
+            return
+        shown = (entry.text, entry.failed)
+        if self._shown.get(reg.addr) == shown:
+            return
+        self._shown[reg.addr] = shown
+        ctrl.SetValue(entry.text)
+        ctrl.SetForegroundColour(
+            wx.SystemSettings.GetColour(wx.SYS_COLOUR_GRAYTEXT if entry.failed else wx.SYS_COLOUR_WINDOWTEXT))
+        ctrl.Refresh()
 
-    # Batch: Pull all data once
+    # Batch: Pull all data once (runs on the acquisition worker)
     def OnPullAll(self, _):
-        if not self.mb:
+        if not len(self.pool):
             self._maybe_warn_not_connected()
             return
-        self.UpdatePageTerminal("Pulling all data...\n")
-        for reg in DEVICE_DATA + RUNTIME_DATA + SUMMARY_DATA:
-            try:
-                self.read_and_show(reg.name)
-                time.sleep(0.02)
-            except Exception as e:
-                self.UpdatePageTerminal(f"Error during {reg.name}: {e}\n")
-        self._update_alarm_box()
-        self.UpdatePageTerminal("Done pulling all data.\n")
+        reads = len(self.poll_plan) * len(self._fleet_keys())
+        self.UpdatePageTerminal(f"Pulling all data ({reads} reads)...\n")
+        self.pool.poll_once()
+
+    # One batched PollResult per cycle, delivered via wx.CallAfter
+    def _on_poll_result(self, result: mb_worker.PollResult):
+        if not self:
+            return
+        key = (result.bus, result.unit)
+        self.latest[key] = result
+        changed = self._cache_result(result)
+        if self.pageFleet:
+            self._update_fleet(result)
+        prefix = ""
+        if len(self.pool) > 1:
+            prefix = f"{result.bus} unit {result.unit}: "
+        elif len(self.slave_ids) > 1:
+            prefix = f"Unit {result.unit}: "
+        lines = [f"{prefix}{msg}\n" for msg in result.log]
+        if self.worker and key == (self.worker.bus, self.modbus_slave_id):
+            lines += self._show_detail(result, changed)
+            lines.append(f"{prefix}Done pulling all data ({result.reads} reads, {result.failed} failed, "
+                         f"{result.elapsed * 1000:.0f} ms).\n")
+        if lines:
+            self.UpdatePageTerminal("".join(lines))
+
+    def _cache_result(self, result: mb_worker.PollResult) -> List[Reg]:
+        """Store a cycle in the cache; returns the registers whose text changed."""
+        changed = []
+        for addr, words in result.words.items():
+            reg = ALL_REGS.get(addr)
+            if reg and self._store_reg((result.bus, result.unit, addr), reg, words, result.started,
+                                       result.values.get(addr)):
+                changed.append(reg)
+        if not self._history_ready:
+            self._history_ready = True
+            import mb_history
+            self.history = mb_history.History() if mb_history.available() else None
+        if self.history is not None:
+            self._record_history(result)
+        for addr in result.missing:
+            self.cache.mark_bad((result.bus, result.unit, addr))
+        return changed
+
+    def _record_history(self, result: mb_worker.PollResult):
+        for addr, (value, _) in result.values.items():
+            reg = ALL_REGS.get(addr)
+            period = POLL_PERIOD_S.get(addr, mb_plan.ONCE)
+            if reg is None or period == mb_plan.ONCE or not isinstance(value, (int, float)):
+                continue
+            if not self.history.record((result.bus, result.unit, addr), result.started,
+                                       value * reg.scale, period) and self.history.refused == 1:
+                self.UpdatePageTerminal("History memory budget reached; further registers are not recorded.\n")
+
+    def _show_detail(self, result: mb_worker.PollResult, changed: List[Reg]) -> List[str]:
+        """Update the Machine Monitor page from one slave's cycle; returns terminal lines."""
+        for addr in list(result.words) + result.missing:
+            reg = ALL_REGS.get(addr)
+            if reg:
+                self._set_field(reg, self.cache.get((result.bus, result.unit, addr)))
+        if result.alarm_ids is not None:
+            self._show_alarms(result.alarm_ids, result.alarm_details)
+        lines = []
+        for reg in changed:
+            lines.append(f"{reg.name}: {self.cache.get((result.bus, result.unit, reg.addr)).text}\n")
+        return lines
+
+    def _fill_detail_from_cache(self):
+        for reg in ALL_REGS.values():
+            self._set_field(reg, self.cache.get(self._cache_key(reg.addr)))
 
     # Start/Stop/Clear
     def OnStartAuto(self, _=None):
-        if not self.poll_timer.IsRunning():
-            self.poll_timer.Start(self.poll_period_ms)
-            self.UpdatePageTerminal(f"Auto-poll started ({self.poll_period_ms/1000:.0f}s).\n")
+        if not self._auto_poll:
+            self._auto_poll = True
+            self.pool.set_auto(True)
+            self.UpdatePageTerminal(f"Auto-poll started (run-time {RUNTIME_PERIOD_S:g}s, "
+                                    f"summary {SUMMARY_PERIOD_S:g}s, device data once per connect).\n")
 
     def OnStopAuto(self, _=None):
-        if self.poll_timer.IsRunning():
-            self.poll_timer.Stop()
+        if self._auto_poll:
+            self._auto_poll = False
+            self.pool.set_auto(False)
             self.UpdatePageTerminal("Auto-poll stopped.\n")
-
-    def _on_poll_timer(self, _evt):
-        self.OnPullAll(None)
+            self.OnTimingReport()
+
+    def OnAutoTiming(self, evt):
+        self._auto_timing = evt.IsChecked()
+        for w in self.pool:
+            w.timing.auto = self._auto_timing
+        self.UpdatePageTerminal(f"Frame timing auto-tune {'on' if self._auto_timing else 'off'}.\n")
+
+    def OnTimingReport(self, _=None):
+        if not len(self.pool):
+            self.UpdatePageTerminal("No bus connected.\n")
+        for w in self.pool:
+            self.UpdatePageTerminal(f"{w.bus}: {w.timing.report()}\n")
+            for line in w.latency_report():
+                self.UpdatePageTerminal(f"  {line}\n")
 
     def OnClearAll(self, _=None):
+        self._shown.clear()
+        self._shown_alarms = None
         for ctrl in self.pageNetMon.field_by_name.values():
             ctrl.SetValue("")
         if hasattr(self.pageNetMon, "faults_text"):
@@ -1042,13 +1720,17 @@ class seWSNViewLayout(wx.Frame):
             ("Run-time Data", RUNTIME_DATA),
             ("Summary Data", SUMMARY_DATA),
         ]
-        rows = [("Name", "Value")]
+        rows = [("Name", "Value", "Read at", "Quality")]
         for title, reg_list in sections:
-            rows.append((title, ""))
+            rows.append((title, "", "", ""))
             for reg in reg_list:
-                ctrl = self.pageNetMon.field_by_name.get(reg.name)
-                rows.append((reg.name, ctrl.GetValue() if ctrl else ""))
-            rows.append(("", ""))
+                entry = self.cache.get(self._cache_key(reg.addr))
+                if entry is None:
+                    rows.append((reg.name, "", "", ""))
+                    continue
+                read_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.ts)) if entry.ts else ""
+                rows.append((reg.name, entry.text, read_at, entry.quality))
+            rows.append(("", "", "", ""))
 
         dlg = wx.FileDialog(
             self, "Save data as",
@@ -1064,23 +1746,98 @@ class seWSNViewLayout(wx.Frame):
         wb = Workbook()
         ws = wb.active
         ws.title = "Snapshot"
-        for r, (name, value) in enumerate(rows, start=1):
-            ws.cell(row=r, column=1, value=name)
-            ws.cell(row=r, column=2, value=value)
+        for r, row in enumerate(rows, start=1):
+            for c, value in enumerate(row, start=1):
+                ws.cell(row=r, column=c, value=value)
         ws.column_dimensions["A"].width = 28
         ws.column_dimensions["B"].width = 40
+        ws.column_dimensions["C"].width = 20
+        ws.column_dimensions["D"].width = 10
         ws.freeze_panes = "A2"
         wb.save(path)
         self.UpdatePageTerminal(f"Exported {len(rows)-1} rows to {path}\n")
 
+    # History export (streamed on a background thread)
+    def OnExportHistory(self, _=None):
+        if self.history is None or not len(self.history):
+            wx.MessageBox("No history recorded yet (history needs numpy and a running poll).",
+                          "Export history", wx.OK | wx.ICON_INFORMATION)
+            return
+        if self._export_job and self._export_job.is_alive():
+            self.UpdatePageTerminal("A history export is already running.\n")
+            return
+        import mb_export
+
+        dlg = wx.FileDialog(
+            self, "Export history as",
+            wildcard="CSV (*.csv)|*.csv|Parquet (*.parquet)|*.parquet|Excel files (*.xlsx)|*.xlsx",
+            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT
+        )
+        if dlg.ShowModal() != wx.ID_OK:
+            dlg.Destroy()
+            return
+        path = dlg.GetPath()
+        dlg.Destroy()
+        try:
+            mb_export.format_for(path)
+        except ValueError as e:
+            wx.MessageBox(str(e), "Export history", wx.OK | wx.ICON_ERROR)
+            return
+
+        names = {key: ALL_REGS[key[2]].name for key in self.history.keys() if key[2] in ALL_REGS}
+        self._export_dlg = wx.ProgressDialog(
+            "Export history", f"Writing {os.path.basename(path)}...", maximum=1000, parent=self,
+            style=wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME | wx.PD_AUTO_HIDE)
+        self._export_job = mb_export.ExportJob(
+            self.history, path, names,
+            on_progress=lambda done, total: wx.CallAfter(self._export_progress, done, total),
+            on_done=lambda rows, err: wx.CallAfter(self._export_done, path, rows, err))
+        self._export_job.start()
+        self.UpdatePageTerminal(f"Exporting history to {path}...\n")
+
+    def _export_progress(self, done, total):
+        dlg = self._export_dlg
+        if not dlg:
+            return
+        keep_going, _ = dlg.Update(min(999, int(1000 * done / total)), f"{done:,} / ~{total:,} rows")
+        if not keep_going and self._export_job:
+            self._export_job.cancel()
+
+    def _export_done(self, path, rows, err):
+        if self._export_dlg:
+            self._export_dlg.Destroy()
+            self._export_dlg = None
+        self._export_job = None
+        if err is None:
+            self.UpdatePageTerminal(f"Exported {rows:,} history rows to {path}\n")
+        else:
+            self.UpdatePageTerminal(f"History export {err}.\n")
+
 # App
 class MyApp(wx.App):
+    def __init__(self, *args, profile_startup=False, **kwargs):
+        self.profile_startup = profile_startup
+        super().__init__(*args, **kwargs)
+
     def OnInit(self):
+        _startup_mark("wx.App created")
         self.frame = seWSNViewLayout(None, -1, "")
+        _startup_mark("frame constructed")
         self.SetTopWindow(self.frame)
         self.frame.Show()
+        _startup_mark("window shown")
+        if self.profile_startup:
+            wx.CallAfter(self._report_startup)
+        # port scan + connect (and the pymodbus import) after the window is up
+        wx.CallAfter(self.frame.autodetect_usb_and_connect)
         return True
 
+    def _report_startup(self):
+        _startup_mark("first event loop pass")
+        report = startup_report()
+        print(report, end="", flush=True)
+        self.frame.UpdatePageTerminal(report)
+
 if __name__ == "__main__":
-    app = MyApp(False)
+    app = MyApp(False, profile_startup="--profile-startup" in sys.argv)
     app.MainLoop()
@@ -0,0 +1,48 @@
+# Unit tests for the mb_* Modbus stack. They drive it through
+# mb_sim.LoopbackClient, so neither wx, pymodbus nor a serial port is needed.
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mb_client  # noqa: E402
+import mb_sim  # noqa: E402
+
+
+@pytest.fixture
+def sim():
+    """Three simulated inverters with no latency; units 1..3."""
+    s = mb_sim.Simulator([1, 2, 3], latency_s=0.0, jitter_s=0.0, baud=0, seed=1)
+    yield s
+    s.stop()
+
+
+@pytest.fixture
+def strict_sim():
+    """Like `sim`, but a read touching an unmapped word gets exception 02."""
+    s = mb_sim.Simulator([1], latency_s=0.0, jitter_s=0.0, baud=0, strict=True, seed=1)
+    yield s
+    s.stop()
+
+
+def loopback(s, timeout: float = 0.05) -> mb_sim.LoopbackClient:
+    """A connected client on `s`, bound like the GUI and daemon bind theirs."""
+    client = mb_sim.LoopbackClient(s, timeout)
+    client.connect()
+    mb_client.bind(client)
+    return client
+
+
+@pytest.fixture
+def client(sim):
+    return loopback(sim)
+
+
+@pytest.fixture
+def strict_client(strict_sim):
+    return loopback(strict_sim)
@@ -0,0 +1,24 @@
+import json
+
+import mb_bench
+
+
+def test_quick_run_writes_every_metric(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    argv = ["--quick", "--latency", "0", "--baud", "115200", "--bauds", "115200",
+            "--cycles", "2", "--decode-rounds", "10", "--out", str(out)]
+    assert mb_bench.main(argv) == 0
+    doc = json.loads(out.read_text())
+    assert doc["schema"] == mb_bench.SCHEMA
+    names = set(doc["results"])
+    assert {"cycle.runtime", "cycle.summary", "decode", "request", "throughput.115200"} <= names
+    assert any(n.startswith("alarms.") for n in names)
+    assert "decode" in capsys.readouterr().out
+
+
+def test_compare_flags_only_slowdowns_beyond_tolerance():
+    base = {"cycle": mb_bench.metric(10.0, "ms"), "rate": mb_bench.metric(100.0, "registers/s", "higher")}
+    same = {"cycle": mb_bench.metric(11.0, "ms"), "rate": mb_bench.metric(90.0, "registers/s", "higher")}
+    worse = {"cycle": mb_bench.metric(12.0, "ms"), "rate": mb_bench.metric(80.0, "registers/s", "higher")}
+    assert mb_bench.compare(same, base, 0.15) == []
+    assert [line.split(":")[0] for line in mb_bench.compare(worse, base, 0.15)] == ["cycle", "rate"]
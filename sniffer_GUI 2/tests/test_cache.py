@@ -0,0 +1,79 @@
+import mb_cache
+import mb_client
+import mb_daemon
+from conftest import loopback
+
+KEY = ("COM1", 1, 0x7530)
+
+
+def age(cache, key, seconds):
+    cache.get(key).mono -= seconds
+
+
+def test_put_reports_text_changes_only():
+    cache = mb_cache.RegisterCache()
+    assert cache.put(KEY, [520], 520, "52.0 V")
+    assert not cache.put(KEY, [520], 520, "52.0 V")
+    assert cache.put(KEY, [521], 521, "52.1 V")
+
+
+def test_quality_goes_stale_after_ttl():
+    cache = mb_cache.RegisterCache(default_ttl_s=2.0)
+    cache.put(KEY, [1], 1, "1")
+    assert cache.get(KEY).quality == mb_cache.GOOD
+    assert cache.fresh(KEY) is not None
+    age(cache, KEY, 3.0)
+    assert cache.get(KEY).quality == mb_cache.STALE
+    assert cache.fresh(KEY) is None
+    assert cache.fresh(KEY, max_age_s=10.0) is not None
+
+
+def test_failed_read_keeps_last_good_value():
+    cache = mb_cache.RegisterCache()
+    cache.put(KEY, [7], 7, "7")
+    assert cache.mark_bad(KEY)
+    assert not cache.mark_bad(KEY)
+    entry = cache.get(KEY)
+    assert entry.quality == mb_cache.BAD and entry.words == [7]
+    assert cache.fresh(KEY) is None
+    assert cache.put(KEY, [7], 7, "7")          # good again: quality changed
+    assert cache.get(KEY).quality == mb_cache.GOOD
+
+
+def test_mark_bad_on_unknown_key_creates_placeholder():
+    cache = mb_cache.RegisterCache()
+    assert cache.mark_bad(KEY)
+    assert cache.get(KEY).quality == mb_cache.BAD
+
+
+def test_fresh_needs_enough_words():
+    cache = mb_cache.RegisterCache()
+    cache.put(KEY, [1, 2], ttl_s=60)
+    assert cache.fresh(KEY, min_words=2) is not None
+    assert cache.fresh(KEY, min_words=3) is None
+
+
+def test_items_and_clear_filter_by_bus_and_unit():
+    cache = mb_cache.RegisterCache()
+    for key in [("COM1", 1, 1), ("COM1", 2, 1), ("tcp://gw", 1, 1)]:
+        cache.put(key, [0])
+    assert {k for k, _ in cache.items(bus="COM1")} == {("COM1", 1, 1), ("COM1", 2, 1)}
+    cache.clear(unit=1)
+    assert {k for k, _ in cache.items()} == {("COM1", 2, 1)}
+    cache.invalidate(("COM1", 2, 1))
+    assert list(cache.items()) == []
+
+
+def test_daemon_connect_drops_what_was_cached_for_its_buses(sim, monkeypatch):
+    # Identity registers are read once and never expire, so a reopened bus
+    # must not keep answering with the previous inverter's serial number.
+    monkeypatch.setattr(mb_client, "POOL", mb_client.ClientPool(lambda ep, **kw: loopback(sim)))
+    d = mb_daemon.Daemon(mb_daemon.parse_args(["--port", "tcp://gw", "--units", "1", "--lanes", "1"]))
+    d.cache.put(("tcp://gw:502", 1, 0xC78F), [0x4F4C], "OLD", "OLD", ttl_s=float("inf"))
+    d.cache.put(("COM9", 1, 0xC78F), [0x4F4C], "OTHER", "OTHER")
+    try:
+        assert d.connect()
+        assert d.cache.get(("tcp://gw:502", 1, 0xC78F)) is None
+        assert d.cache.get(("COM9", 1, 0xC78F)) is not None
+    finally:
+        d.pool.stop_all()
@@ -0,0 +1,46 @@
+import pytest
+
+import mb_decode
+import mb_plan
+from mb_registers import ALL_REGS, REG_BY_NAME, Reg
+
+
+def test_unsigned_and_signed_words():
+    volts = REG_BY_NAME["AC Input Voltage"]          # u16, 0.1 V
+    amps = REG_BY_NAME["AC Input Current"]           # s16, 0.1 A
+    assert mb_decode.decode(volts, [2301]) == (2301, "230.1 V")
+    assert mb_decode.decode(amps, [0xFFF6]) == (-10, "-1.0 A")
+
+
+def test_u32_is_high_word_first():
+    total = REG_BY_NAME["PV Generation Total"]       # u32, 0.0001 kWh
+    value, text = mb_decode.decode(total, [0x0001, 0x0002])
+    assert value == 0x10002
+    assert text == "6.5538 kWh"
+    assert mb_decode.scaled(total, value) == 6.5538
+
+
+def test_ascii_stops_at_nul():
+    sn = REG_BY_NAME["Inverter SN"]
+    words = [0x5245, 0x4F4E, 0x3031] + [0] * (sn.words - 3)
+    assert mb_decode.decode(sn, words) == ("REON01", "REON01")
+
+
+def test_short_reply_decodes_to_nothing():
+    assert mb_decode.decode(REG_BY_NAME["Line Charge Total"], [1]) == (None, "")
+
+
+def test_decode_span_matches_per_register_decode():
+    regs = [r for r in ALL_REGS.values() if 0x7530 <= r.addr <= 0x7580]
+    span = mb_plan.plan_spans(regs, gap_cost=mb_plan.MAX_READ_WORDS)[0]
+    words = [(i * 37) & 0xFFFF for i in range(span.count)]
+    out = mb_decode.decode_span(span, words)
+    assert [r for r, _, _, _ in out] == list(span.regs)
+    for r, reg_words, value, text in out:
+        assert (value, text) == mb_decode.decode(r, reg_words)
+
+
+def test_unknown_codec_fails_when_compiled():
+    bad = Reg("Bogus", 0x1, 1, "f16", 1, "")
+    with pytest.raises(ValueError, match="Bogus"):
+        mb_decode.compile_reg(bad)
@@ -0,0 +1,54 @@
+import pytest
+
+import mb_history
+
+np = pytest.importorskip("numpy")
+
+
+def test_raw_ring_keeps_the_latest_samples_in_order():
+    s = mb_history.Series(period_s=1.0, raw_window_s=10.0)
+    cap = s.raw.capacity
+    for t in range(cap + 5):
+        s.append(float(t), float(t))
+    ts, val = s.raw_samples()
+    assert len(ts) == cap
+    assert ts[0] == 5.0 and ts[-1] == cap + 4.0
+    assert np.all(np.diff(ts) > 0)
+    assert s.last == (cap + 4.0, cap + 4.0)
+
+
+def test_buckets_fold_min_avg_max():
+    s = mb_history.Series(period_s=1.0, bucket_s=60.0)
+    for t, v in [(0, 1.0), (30, 3.0), (59, 2.0), (60, 10.0)]:
+        s.append(float(t), v)
+    ts, lo, avg, hi = s.rollup()
+    assert list(ts) == [0.0]
+    assert (lo[0], avg[0], hi[0]) == (1.0, 2.0, 3.0)
+
+
+def test_view_does_not_overlap_raw_and_buckets():
+    s = mb_history.Series(period_s=1.0, raw_window_s=60.0, bucket_s=60.0)
+    for t in range(600):
+        s.append(float(t), 1.0)
+    (b_ts, _, _, _), (raw_ts, _) = s.view()
+    assert len(b_ts) and len(raw_ts)
+    assert b_ts[-1] + 60.0 <= raw_ts[0]
+
+
+def test_history_refuses_series_beyond_budget():
+    need = mb_history.Series.estimate_bytes(1.0)
+    h = mb_history.History(budget_bytes=2 * need)
+    assert h.record(("COM1", 1, 1), 0.0, 1.0)
+    assert h.record(("COM1", 1, 2), 0.0, 1.0)
+    assert not h.record(("COM1", 1, 3), 0.0, 1.0)
+    assert h.refused == 1 and len(h) == 2
+    assert h.nbytes <= h.budget_bytes
+    h.drop(("COM1", 1, 1))
+    assert h.record(("COM1", 1, 3), 0.0, 1.0)
+
+
+def test_unknown_key_gives_empty_arrays():
+    h = mb_history.History()
+    ts, val = h.samples("nope")
+    assert len(ts) == 0 and len(val) == 0
+    assert h.view("nope") is None
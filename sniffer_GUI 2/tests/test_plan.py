@@ -0,0 +1,97 @@
+import pytest
+
+import mb_plan
+from mb_registers import Reg
+
+
+def reg(addr, words=1):
+    return Reg(f"r{addr:04X}", addr, words, "u16", 1, "")
+
+
+def test_plan_spans_bridges_small_gaps_only():
+    regs = [reg(0x100), reg(0x102), reg(0x140)]
+    spans = mb_plan.plan_spans(regs, gap_cost=4)
+    assert [(s.addr, s.count) for s in spans] == [(0x100, 3), (0x140, 1)]
+    assert spans[0].regs == (regs[0], regs[1])
+
+
+def test_plan_spans_respects_max_words():
+    spans = mb_plan.plan_spans([reg(0), reg(100, 20), reg(124, 2)], max_words=125, gap_cost=200)
+    assert [(s.addr, s.count) for s in spans] == [(0, 120), (124, 2)]
+    with pytest.raises(ValueError):
+        mb_plan.plan_spans([reg(0, 126)])
+
+
+def test_span_split_skips_registers_a_short_reply_misses():
+    span = mb_plan.plan_spans([reg(10), reg(11, 2)])[0]
+    assert span.split([1, 2, 3]) == [(span.regs[0], [1]), (span.regs[1], [2, 3])]
+    assert span.split([1, 2]) == [(span.regs[0], [1])]
+
+
+def test_scheduler_reads_only_what_is_due():
+    fast, slow = reg(0x10), reg(0x20)
+    sched = mb_plan.PollScheduler([(fast, 1.0), (slow, 10.0)], early_fraction=0.0)
+    assert {r for s in sched.due_spans(0.0) for r in s.regs} == {fast, slow}
+    sched.mark_read(fast, 0.0)
+    sched.mark_read(slow, 0.0)
+    assert sched.due_spans(0.5) == []
+    assert [s.regs for s in sched.due_spans(1.0)] == [(fast,)]
+    assert sched.next_due() == 1.0
+
+
+def test_scheduler_lets_nearly_due_registers_ride_along():
+    a, b = reg(0x10), reg(0x11)
+    sched = mb_plan.PollScheduler([(a, 1.0), (b, 1.0)])
+    sched.mark_read(a, 0.0)
+    sched.mark_read(b, 0.4)
+    assert [s.regs for s in sched.due_spans(1.0)] == [(a, b)]
+
+
+def test_scheduler_orders_spans_by_deadline():
+    a, b = reg(0x10), reg(0x900)
+    sched = mb_plan.PollScheduler([(a, 1.0), (b, 1.0)])
+    sched.mark_read(a, 0.5)
+    sched.mark_read(b, 0.0)
+    assert [s.regs for s in sched.due_spans(2.0)] == [(b,), (a,)]
+
+
+def test_failed_register_backs_off_instead_of_staying_due():
+    # Regression: a register the slave keeps rejecting stayed due, so the
+    # worker re-read it in a hot loop.
+    bad = reg(0x10)
+    sched = mb_plan.PollScheduler([(bad, 60.0)])
+    sched.due_spans(0.0)
+    sched.mark_failed(bad, 0.0)
+    assert sched.due_spans(0.0) == []
+    first = sched.next_due()
+    assert first == pytest.approx(mb_plan.RETRY_FRACTION * 60.0)
+    sched.mark_failed(bad, first)
+    assert sched.next_due() - first == pytest.approx(2 * mb_plan.RETRY_FRACTION * 60.0)
+    for _ in range(10):
+        now = sched.next_due()
+        sched.mark_failed(bad, now)
+    assert sched.next_due() - now == pytest.approx(60.0)       # capped at the period
+    sched.mark_read(bad, 100.0)
+    sched.mark_failed(bad, 200.0)
+    assert sched.next_due() == pytest.approx(200.0 + mb_plan.RETRY_FRACTION * 60.0)
+
+
+def test_failed_read_once_register_is_retried_with_bounded_backoff():
+    ident = reg(0xC783)
+    sched = mb_plan.PollScheduler([(ident, mb_plan.ONCE)])
+    for _ in range(20):
+        now = sched.next_due()
+        sched.mark_failed(ident, now)
+    assert sched.next_due() - now == pytest.approx(mb_plan.RETRY_MAX_S)
+    sched.mark_read(ident, now)
+    assert sched.next_due() == mb_plan.ONCE
+
+
+def test_failed_register_retry_never_faster_than_minimum():
+    fast = reg(0x10)
+    sched = mb_plan.PollScheduler([(fast, 0.1)])
+    sched.mark_failed(fast, 5.0)
+    assert sched.next_due() == pytest.approx(5.0 + 0.1)
+    sched = mb_plan.PollScheduler([(fast, 1.0)])
+    sched.mark_failed(fast, 5.0)
+    assert sched.next_due() == pytest.approx(5.0 + mb_plan.RETRY_MIN_S)
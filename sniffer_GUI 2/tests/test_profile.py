@@ -0,0 +1,150 @@
+import json
+
+import pytest
+
+import mb_client
+import mb_diag
+import mb_profile
+import mb_worker
+from conftest import loopback
+from mb_registers import CONFIG_DATA, CONFIG_KEYS, POLL_SCHEDULE
+
+CONFIG_ADDRS = [r.addr for r in CONFIG_DATA]
+
+
+def punch_holes(sim, unit=1):
+    """Make the strict slave refuse every word between the config settings."""
+    regs = sim.slaves[unit].regs
+    for a in range(min(CONFIG_ADDRS), max(CONFIG_ADDRS) + 1):
+        if a not in CONFIG_ADDRS:
+            regs.pop(a, None)
+
+
+def test_parse_profile_accepts_names_and_keys():
+    profile = mb_profile.parse_profile({"ECO Mode": 1, "soc_stop": 20})
+    assert profile == {CONFIG_KEYS["eco"]: 1, CONFIG_KEYS["soc_stop"]: 20}
+
+
+@pytest.mark.parametrize("obj, match", [
+    ({"nope": 1}, "unknown setting"),
+    ({"eco": "1"}, "not an integer"),
+    ({"eco": True}, "not an integer"),
+    ({"soc_stop": 1000}, "outside"),
+    ({}, "empty"),
+])
+def test_parse_profile_rejects(obj, match):
+    with pytest.raises(ValueError, match=match):
+        mb_profile.parse_profile(obj)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "p.json")
+    profile = mb_profile.parse_profile({"gen": 2, "soc_full": 95})
+    mb_profile.save_profile(path, profile)
+    with open(path) as f:
+        assert json.load(f) == {"gen": 2, "soc_full": 95}
+    assert mb_profile.load_profile(path) == profile
+
+
+def test_plan_writes_bridges_only_known_holes():
+    assert mb_profile.plan_writes({1: 10, 2: 20, 5: 50}) == [(1, [10, 20]), (5, [50])]
+    assert mb_profile.plan_writes({1: 10, 3: 30}, fill={2: 99}) == [(1, [10, 99, 30])]
+
+
+def test_apply_profile_writes_and_verifies(client, sim):
+    profile = mb_profile.parse_profile({"eco": 1, "mute": 1, "soc_stop": 20})
+    result = mb_profile.apply_profile(client, 1, profile)
+    assert result.ok, result.lines()
+    assert len(result.writes) == 3 and result.reads == 1
+    regs = sim.slaves[1].regs
+    assert [regs[r.addr] for r in profile] == [1, 1, 20]
+    assert result.values() == {r.addr: v for r, v in profile.items()}
+
+
+def test_apply_profile_bridges_gaps_with_current_values(client, sim):
+    profile = mb_profile.parse_profile({"gen": 2, "eco": 1})
+    result = mb_profile.apply_profile(client, 1, profile, bridge_gaps=1)
+    assert result.ok
+    assert result.writes == [(CONFIG_KEYS["gen"].addr, 3)]
+
+
+def test_refused_write_is_reported_with_read_back(client, sim):
+    profile = mb_profile.parse_profile({"eco": 1})
+    sim.slaves[1].write = lambda addr, values: 4         # slave device failure
+    result = mb_profile.apply_profile(client, 1, profile)
+    assert not result.ok and result.error
+    assert mb_client.failure_kind(result.error) == mb_client.EXCEPTION_RESPONSE
+    assert result.fields[0].actual == 0                 # read back anyway
+
+
+def test_config_read_is_one_transaction_when_allowed(client):
+    words, err, reads = mb_profile._read_words(client, 1, CONFIG_ADDRS, 0.0)
+    assert err == "" and reads == 1
+    assert sorted(words) == sorted(CONFIG_ADDRS)
+
+
+def test_config_read_falls_back_when_slave_refuses_holes(strict_client, strict_sim):
+    # Regression: the coalesced FC03 over A02B..A09D also covers unmapped
+    # words; firmware that refuses them left the config page blank.
+    punch_holes(strict_sim)
+    values, err = mb_profile.read_config(strict_client, 1)
+    assert err == ""
+    assert values == {a: strict_sim.slaves[1].regs[a] for a in CONFIG_ADDRS}
+
+
+def test_config_read_skips_a_refused_setting(strict_client, strict_sim):
+    punch_holes(strict_sim)
+    mute = CONFIG_KEYS["mute"].addr
+    strict_sim.slaves[1].regs.pop(mute)
+    values, err = mb_profile.read_config(strict_client, 1)
+    assert err == ""
+    assert set(values) == set(CONFIG_ADDRS) - {mute}
+
+
+def test_apply_profile_verifies_on_firmware_with_holes(strict_client, strict_sim):
+    punch_holes(strict_sim)
+    profile = mb_profile.parse_profile({"eco": 1, "soc_full": 90})
+    result = mb_profile.apply_profile(strict_client, 1, profile)
+    assert result.ok, result.lines()
+
+
+def test_config_read_of_silent_slave_fails(sim):
+    client = loopback(sim, timeout=0.001)
+    values, err = mb_profile.read_config(client, 9)
+    assert values is None
+    assert mb_client.failure_kind(err) == mb_client.NO_REPLY
+    result = mb_profile.apply_profile(client, 9, mb_profile.parse_profile({"eco": 1}))
+    assert not result.ok and result.reads == 0          # no read-back after no reply
+
+
+class _Journal:
+    def __init__(self):
+        self.tx, self.events = [], []
+
+    def transaction(self, bus, unit, fc, addr, count, elapsed_s, err=None):
+        self.tx.append((fc, addr, count))
+
+    def event(self, kind, **fields):
+        self.events.append(kind)
+
+
+def test_submitted_profile_reports_each_transaction_with_its_function_code(client):
+    # Regression: the whole batch was counted as one FC16, even when it sent
+    # FC06 writes and an FC03 read-back.
+    diag, journal = mb_diag.Diagnostics(), _Journal()
+    w = mb_worker.AcquisitionWorker(client, POLL_SCHEDULE, [1], post=lambda r: None, bus="sim",
+                                    timing=mb_worker.FrameTiming(fixed_gap_s=0.0), diag=diag, journal=journal)
+    w.start()
+    try:
+        result = mb_profile.submit(w, mb_profile.parse_profile({"eco": 1, "soc_stop": 20})).result(5)
+        bridged = mb_profile.submit(w, mb_profile.parse_profile({"gen": 2, "eco": 0}), bridge_gaps=1).result(5)
+    finally:
+        w.stop(2)
+    assert result.ok and bridged.ok
+    eco, soc, gen = (CONFIG_KEYS[k].addr for k in ("eco", "soc_stop", "gen"))
+    assert [fc for fc, _, _ in journal.tx] == [6, 6, 3, 3, 16, 3]
+    assert journal.tx[:2] == [(6, eco, 1), (6, soc, 1)]
+    assert journal.tx[4] == (16, gen, 3)
+    assert journal.events == ["profile", "profile"]
+    counters = {c["fc"]: c["ok"] for c in diag.snapshot()["buses"]["sim"]["counters"]}
+    assert counters == {3: 3, 6: 2, 16: 1}
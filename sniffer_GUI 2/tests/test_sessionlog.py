@@ -0,0 +1,117 @@
+import gzip
+import json
+import os
+import time
+
+import mb_plan
+import mb_sessionlog
+import mb_worker
+from mb_registers import ALARM_BLOCK, POLL_SCHEDULE
+
+
+def records(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def segments(directory):
+    return sorted((os.path.join(directory, n) for n in os.listdir(directory)), key=os.path.getmtime)
+
+
+def test_records_and_deltas(tmp_path, client):
+    log = mb_sessionlog.SessionLog(str(tmp_path), flush_s=0.05)
+    w = mb_worker.AcquisitionWorker(client, POLL_SCHEDULE, [1], post=lambda r: None,
+                                    timing=mb_worker.FrameTiming(fixed_gap_s=0.0), journal=log, bus="sim")
+    w.poll_cycle(1, w.plan)
+    w.poll_cycle(1, w.plan)
+    log.event("session", state="stop")
+    log.close()
+    (path,) = segments(str(tmp_path))
+    assert path.endswith(".jsonl.gz")
+    recs = records(path)
+    assert recs[0]["t"] == "segment" and recs[0]["schema"] == mb_sessionlog.SCHEMA
+    polls = [r for r in recs if r["t"] == "poll"]
+    assert polls[0]["full"] and "Inverter SN" in polls[0]["values"]
+    assert "full" not in polls[1] and "Inverter SN" not in polls[1]["values"]
+    assert sum(r["t"] == "tx" for r in recs) == 2 * len(w.plan)
+    assert {"t": "session", "state": "stop"}.items() <= recs[-1].items()
+    assert log.dropped == 0
+
+
+def test_rotation_keeps_bounded_compressed_segments(tmp_path):
+    log = mb_sessionlog.SessionLog(str(tmp_path), prefix="rot", max_bytes=2000, keep=2, flush_s=0.02)
+    for i in range(60):
+        log.event("x", i=i, pad="y" * 100)
+        time.sleep(0.005)
+    log.close()
+    files = segments(str(tmp_path))
+    assert len(files) == 2 and all(f.endswith(".jsonl.gz") for f in files)
+    assert log.segments > 2
+    seqs = [records(f)[0]["seq"] for f in files]
+    assert seqs == [log.segments - 1, log.segments]
+
+
+def test_overflow_is_counted_not_blocking(tmp_path):
+    log = mb_sessionlog.SessionLog(str(tmp_path), compression=None, max_pending=10, flush_s=5.0)
+    for i in range(25):
+        log.event("x", i=i)
+    log.close()
+    assert log.dropped == 15
+    recs = records(segments(str(tmp_path))[0])
+    assert {"t": "dropped", "n": 15}.items() <= recs[-1].items()
+
+
+def test_every_segment_repeats_active_alarms(tmp_path, client, sim):
+    # Regression: after a rotation the alarm state carried over, so a new
+    # file never mentioned alarms that were already active.
+    sim.slaves[1].alarms = {5: 0x42}
+    sim.slaves[1]._put_alarms()
+    log = mb_sessionlog.SessionLog(str(tmp_path), compression=None, max_bytes=1, flush_s=0.02)
+    w = mb_worker.AcquisitionWorker(client, POLL_SCHEDULE, [1], post=lambda r: None,
+                                    timing=mb_worker.FrameTiming(fixed_gap_s=0.0), journal=log, bus="sim")
+    spans = mb_plan.plan_spans([ALARM_BLOCK])
+    for _ in range(3):
+        w.poll_cycle(1, spans)
+        time.sleep(0.1)                 # one flush, hence one segment, per cycle
+    log.close()
+    files = segments(str(tmp_path))
+    assert len(files) == 3
+    for f in files:
+        alarms = [r for r in records(f) if r["t"] == "alarm"]
+        assert len(alarms) == 1
+        assert alarms[0]["active"] == [5]
+        assert [a["id"] for a in alarms[0]["raised"]] == [5]
+
+
+def test_rotation_counts_encoded_bytes(tmp_path):
+    log = mb_sessionlog.SessionLog(str(tmp_path), compression=None, max_bytes=1000, flush_s=0.02)
+    log.event("x", text="é" * 600)          # 600 characters, 1200 bytes
+    time.sleep(0.2)
+    log.event("y")
+    log.close()
+    assert log.segments == 2
+    assert sorted(os.path.getsize(f) for f in segments(str(tmp_path)))[-1] >= 1200
+
+
+class _FullDisk:
+    def write(self, data):
+        raise OSError(28, "No space left on device")
+
+    def close(self):
+        pass
+
+
+def test_failed_segment_header_does_not_stop_the_writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(mb_sessionlog, "open", lambda *a, **kw: _FullDisk(), raising=False)
+    log = mb_sessionlog.SessionLog(str(tmp_path), compression=None, flush_s=0.02)
+    log.event("lost")
+    time.sleep(0.2)
+    assert log.is_alive()
+    assert "No space" in log.error and log.dropped == 1
+    monkeypatch.undo()
+    log.event("kept")
+    log.close()
+    recs = records(segments(str(tmp_path))[-1])
+    assert [r["t"] for r in recs] == ["segment", "kept", "dropped"]
+    assert recs[-1]["n"] == 1
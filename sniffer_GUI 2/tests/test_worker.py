@@ -0,0 +1,154 @@
+import time
+
+import mb_fleet
+import mb_plan
+import mb_worker
+from conftest import loopback
+from mb_registers import ALARM_BLOCK, POLL_SCHEDULE, REG_BY_NAME, RUNTIME_DATA
+
+
+def make_worker(client, units=(1,), **kw):
+    return mb_worker.AcquisitionWorker(client, POLL_SCHEDULE, list(units), post=lambda r: None,
+                                       timing=mb_worker.FrameTiming(fixed_gap_s=0.0), **kw)
+
+
+def test_refused_span_falls_back_to_single_registers(strict_client, strict_sim):
+    hole = REG_BY_NAME["Battery SOC"].addr + 1
+    assert hole not in {r.addr for r in RUNTIME_DATA}
+    strict_sim.slaves[1].regs.pop(hole, None)
+    strict_sim.slaves[1].regs.pop(REG_BY_NAME["Output Frequency"].addr)
+    w = make_worker(strict_client)
+    r = w.poll_cycle(1, mb_plan.plan_spans(RUNTIME_DATA, gap_cost=mb_plan.MAX_READ_WORDS))
+    assert r.missing == [REG_BY_NAME["Output Frequency"].addr]
+    assert len(r.values) == len(RUNTIME_DATA) - 1
+
+
+def test_full_cycle_decodes_every_register(client, sim):
+    w = make_worker(client)
+    r = w.poll_cycle(1, w.plan)
+    assert r.failed == 0 and not r.missing
+    assert r.reads == len(w.plan)
+    soc = REG_BY_NAME["Battery SOC"]
+    assert r.words[soc.addr] == [sim.slaves[1].regs[soc.addr]]
+    assert r.values[REG_BY_NAME["Inverter SN"].addr][0] == "REONSIM001"
+    assert r.alarm_ids == []
+    assert r.slave.online and r.slave.status == "online"
+
+
+def test_requests_are_served_by_the_thread(client):
+    w = make_worker(client)
+    w.start()
+    try:
+        assert w.write_register(0xA09B, 15).result(2)
+        assert w.read_holding(0xA09B, 1).result(2) == [15]
+    finally:
+        w.stop(2)
+    assert not w.is_alive()
+
+
+def test_auto_poll_posts_results_for_every_unit(client):
+    results = []
+    w = mb_worker.AcquisitionWorker(client, POLL_SCHEDULE, [1, 2], post=results.append,
+                                    timing=mb_worker.FrameTiming(fixed_gap_s=0.0))
+    w.start()
+    w.set_auto(True)
+    deadline = time.monotonic() + 3.0
+    while {r.unit for r in results} != {1, 2} and time.monotonic() < deadline:
+        time.sleep(0.01)
+    w.stop(2)
+    assert {r.unit for r in results} == {1, 2}
+    assert all(r.slave.online for r in results)
+
+
+def test_rejected_register_is_not_reread_every_cycle(strict_client, strict_sim):
+    # Regression: a register the slave refuses stayed due, so the auto-poll
+    # loop read it again at once, over and over.
+    hours = REG_BY_NAME["Operation Hours"]
+    battery = REG_BY_NAME["Battery Voltage"]
+    strict_sim.slaves[1].regs.pop(hours.addr)
+    results = []
+    w = mb_worker.AcquisitionWorker(strict_client, [(hours, 1.0), (battery, 1.0)], [1],
+                                    post=results.append, timing=mb_worker.FrameTiming(fixed_gap_s=0.0))
+    w.start()
+    w.set_auto(True)
+    time.sleep(1.2)
+    w.stop(2)
+    tries = sum(hours.addr in r.missing for r in results)
+    # period 1 s: tried at once, then after RETRY_MIN_S and again a period later
+    assert 1 <= tries <= 3
+    assert sum(battery.addr in r.values for r in results) <= 3
+
+
+def test_alarm_block_is_planned_as_one_span():
+    spans = mb_plan.plan_spans([item for item, _ in POLL_SCHEDULE])
+    alarm = [s for s in spans if ALARM_BLOCK in s.regs]
+    assert len(alarm) == 1 and alarm[0].count >= ALARM_BLOCK.words
+
+
+def test_new_alarms_read_their_detail_words_once(client, sim):
+    slave = sim.slaves[1]
+    slave.alarms = {3: 0x11, 20: 0x22}
+    slave._put_alarms()
+    w = make_worker(client)
+    spans = mb_plan.plan_spans([ALARM_BLOCK])
+    first = w.poll_cycle(1, spans)
+    assert first.alarm_ids == [3, 20]
+    assert first.alarm_details == {3: 0x11, 20: 0x22}
+    again = w.poll_cycle(1, spans)
+    assert again.reads == 1                         # details carried over, not re-read
+    assert again.alarm_details == first.alarm_details
+
+
+def test_exception_replies_do_not_trip_the_breaker(strict_client, strict_sim):
+    # Regression: cycles in which every read got an exception reply counted
+    # as lost, so a live slave with unmapped registers went "offline".
+    for r in RUNTIME_DATA:
+        strict_sim.slaves[1].regs.pop(r.addr, None)
+    w = make_worker(strict_client)
+    spans = mb_plan.plan_spans(RUNTIME_DATA)
+    for _ in range(mb_fleet.BREAKER_THRESHOLD + 2):
+        r = w.poll_cycle(1, spans)
+        assert r.failed == r.reads and r.no_reply == 0
+    assert r.slave.online and not r.slave.breaker_open
+    assert r.slave.consecutive_failures == 0
+
+
+def test_silent_slave_trips_the_breaker(sim):
+    client = loopback(sim, timeout=0.001)
+    w = make_worker(client, units=(9,), retries=0)     # unit 9 is not simulated
+    spans = mb_plan.plan_spans(RUNTIME_DATA)
+    for _ in range(mb_fleet.BREAKER_THRESHOLD):
+        r = w.poll_cycle(9, spans)
+        assert r.no_reply == r.reads
+    assert r.slave.breaker_open
+    assert r.slave.status.startswith("offline")
+    assert w._next_due(9) == r.slave.next_probe
+
+
+def test_breaker_closes_on_first_answer():
+    st = mb_fleet.SlaveState(1)
+    lost = mb_worker.PollResult(unit=1, started=0.0, reads=2, failed=2, no_reply=2)
+    for _ in range(mb_fleet.BREAKER_THRESHOLD):
+        st.update(lost)
+    assert st.breaker_open and st.probe_interval_s == mb_fleet.PROBE_MIN_S
+    st.update(lost)
+    assert st.probe_interval_s == 2 * mb_fleet.PROBE_MIN_S
+    refused = mb_worker.PollResult(unit=1, started=0.0, reads=2, failed=2)
+    st.update(refused)
+    assert st.online and not st.breaker_open and st.consecutive_failures == 0
+
+
+def test_detached_gateway_lanes_leave_the_pool_at_once(sim):
+    pool = mb_worker.WorkerPool()
+    lanes = [make_worker(loopback(sim), units=(u,), bus=f"tcp://gw:502#{u}", group="tcp://gw:502")
+             for u in (1, 2)]
+    other = make_worker(loopback(sim), units=(3,), bus="COM1")
+    for w in lanes + [other]:
+        pool.add(w)
+    old = pool.detach_group("tcp://gw:502")
+    assert set(old) == set(lanes)
+    assert pool.buses() == ["COM1"]
+    mb_worker.WorkerPool.retire(old)
+    assert not any(w.is_alive() for w in lanes)
+    pool.stop_all()
+    assert not other.is_alive()